@@ -0,0 +1,240 @@
+"""
+Benchmark suite for the College Management System hot paths.
+
+Builds (and caches) synthetic databases of the requested sizes with
+modules.datagen, then times the main module operations against a fresh copy
+of each one. Results (throughput and latency percentiles) are written as
+JSON and can be compared with a stored baseline; a slowdown beyond the
+threshold is reported as a regression and makes the run exit with status 1.
+Runs fully offline.
+
+    python benchmark.py --sizes tiny,small --output bench.json
+    python benchmark.py --sizes small --save-baseline
+    python benchmark.py --sizes small --baseline bench_baseline.json --threshold 0.25
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+from database import Database
+from modules.datagen import SCALES, DataGenerator
+from modules.ai import get_all_data_from_db
+from modules.analytics import Analytics
+from modules.events import Event
+from modules.feedback import Feedback
+from modules.library import Library
+from modules.students import Student
+
+DATA_DIR = "bench_data"
+DEFAULT_BASELINE = "bench_baseline.json"
+ANCHOR = datetime.date(2026, 1, 15)
+
+ANALYTICS_METHODS = [
+    "get_total_students", "get_students_by_course", "get_students_by_gender",
+    "get_student_enrollment_trends", "get_total_courses", "get_course_popularity",
+    "get_total_teachers", "get_teachers_by_department", "get_total_books",
+    "get_total_borrowed_books", "get_most_borrowed_books", "get_total_events",
+    "get_upcoming_events", "get_average_feedback_rating_by_course",
+    "get_average_feedback_rating_by_teacher",
+]
+
+# Dumping every table into the AI prompt context is only feasible on small data
+AI_CONTEXT_SCALES = {"tiny", "small"}
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies):
+    ordered = sorted(latencies)
+    total = sum(ordered)
+    return {
+        "iterations": len(ordered),
+        "ops_per_second": round(len(ordered) / total, 2) if total else None,
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 4),
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 4),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 4),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 4),
+        "max_ms": round(ordered[-1] * 1000, 4),
+    }
+
+
+def timed(operation, iterations, max_seconds, min_iterations=3):
+    """Run operation(i) until the iteration count or the time budget is used up"""
+    latencies = []
+    deadline = time.perf_counter() + max_seconds
+    for i in range(iterations):
+        started = time.perf_counter()
+        operation(i)
+        latencies.append(time.perf_counter() - started)
+        if time.perf_counter() > deadline and len(latencies) >= min_iterations:
+            break
+    return summarize(latencies)
+
+
+def dataset(scale, seed):
+    """Path of a cached generated database for the scale, building it if needed"""
+    os.makedirs(DATA_DIR, exist_ok=True)
+    path = os.path.join(DATA_DIR, f"{scale}-seed{seed}.db")
+    if not os.path.exists(path):
+        building = path + ".building"
+        if os.path.exists(building):
+            os.remove(building)
+        db = Database(building)
+        DataGenerator(db, seed=seed, anchor=ANCHOR).generate(scale)
+        db.close()
+        os.replace(building, path)
+    return path
+
+
+def build_benchmarks(db, db_path, scale, seed):
+    """Return (name, operation, iterations) for every benchmarked hot path"""
+    rng = random.Random(seed)
+    counts = SCALES[scale]
+    student, library, feedback = Student(db), Library(db), Feedback(db)
+    event, analytics = Event(db), Analytics(db)
+
+    names = [row[0].split()[0] for row in db.fetch_all("SELECT name FROM students LIMIT 200")]
+    open_issues = [row[0] for row in db.fetch_all(
+        "SELECT issue_id FROM book_issues WHERE status = 'issued' ORDER BY issue_id")]
+    rng.shuffle(open_issues)
+
+    def add_student(i):
+        student.add_student(f"Bench Student {i}", 20, "Other", "0000000000", f"bench{i}@bench.example",
+                            "Bench Road", "Bench Course", 1)
+
+    def issue_book(i):
+        library.issue_book(rng.randint(1, counts["books"]), rng.randint(1, counts["students"]))
+
+    def return_book(i):
+        if i < len(open_issues):
+            library.return_book(open_issues[i])
+
+    def submit_feedback(i):
+        feedback.submit_feedback(rng.randint(1, counts["students"]), rng.randint(1, counts["teachers"]),
+                                 f"Bench Course {i}", rng.randint(1, 5), "Benchmark feedback")
+
+    benchmarks = [
+        ("students.add_student", add_student, 200),
+        ("students.search_students", lambda i: student.search_students(names[i % len(names)]), 50),
+        ("library.get_all_books", lambda i: library.get_all_books(), 20),
+        ("library.issue_book", issue_book, 200),
+        ("library.return_book", return_book, min(200, max(len(open_issues), 1))),
+        ("feedback.submit_feedback", submit_feedback, 200),
+        ("feedback.get_teacher_feedback",
+         lambda i: feedback.get_teacher_feedback(rng.randint(1, counts["teachers"])), 100),
+        ("events.update_event_statuses", lambda i: event.update_event_statuses(), 50),
+    ]
+    for method in ANALYTICS_METHODS:
+        benchmarks.append((f"analytics.{method}", (lambda m: lambda i: getattr(analytics, m)())(method), 30))
+    if scale in AI_CONTEXT_SCALES:
+        benchmarks.append(("ai.get_all_data_from_db", lambda i: get_all_data_from_db(db_path), 5))
+    return benchmarks
+
+
+def run_scale(scale, seed, iterations, max_seconds, only):
+    source = dataset(scale, seed)
+    workdir = tempfile.mkdtemp(prefix="cms-bench-")
+    db_path = os.path.join(workdir, "bench.db")
+    shutil.copyfile(source, db_path)
+    results = {}
+    try:
+        db = Database(db_path)
+        for name, operation, default_iterations in build_benchmarks(db, db_path, scale, seed):
+            if only and not any(name.startswith(prefix) for prefix in only):
+                continue
+            count = min(iterations, default_iterations) if iterations else default_iterations
+            results[name] = timed(operation, count, max_seconds)
+            print(f"{scale:>7} {name:<55} p50 {results[name]['p50_ms']:>10.3f} ms", file=sys.stderr)
+        db.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def compare(report, baseline, threshold, min_delta_ms):
+    """List benchmarks whose median latency grew by more than threshold"""
+    regressions = []
+    for scale, benches in report["results"].items():
+        for name, stats in benches.items():
+            before = baseline.get("results", {}).get(scale, {}).get(name)
+            if not before or not before.get("p50_ms"):
+                continue
+            ratio = stats["p50_ms"] / before["p50_ms"]
+            # Sub-millisecond operations jitter by more than any sane threshold
+            if ratio > 1 + threshold and stats["p50_ms"] - before["p50_ms"] > min_delta_ms:
+                regressions.append({"scale": scale, "benchmark": name, "baseline_p50_ms": before["p50_ms"],
+                                    "p50_ms": stats["p50_ms"], "ratio": round(ratio, 2)})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the College Management System hot paths")
+    parser.add_argument("--sizes", default="tiny,small", help=f"comma-separated scales from {', '.join(SCALES)}")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--iterations", type=int, help="cap the iterations of every benchmark")
+    parser.add_argument("--max-seconds", type=float, default=5.0, help="time budget per benchmark")
+    parser.add_argument("--only", action="append", help="run benchmarks whose name starts with this prefix")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", help="compare against this results file")
+    parser.add_argument("--save-baseline", action="store_true", help=f"also write results to {DEFAULT_BASELINE}")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed p50 slowdown (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5,
+                        help="ignore slowdowns smaller than this many milliseconds")
+    args = parser.parse_args(argv)
+
+    sizes = [size.strip() for size in args.sizes.split(",") if size.strip()]
+    unknown = [size for size in sizes if size not in SCALES]
+    if unknown:
+        parser.error(f"unknown sizes: {', '.join(unknown)}")
+
+    report = {
+        "meta": {
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "seed": args.seed,
+        },
+        "results": {},
+    }
+    # Module classes print status messages for every call; keep them out of the way
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for size in sizes:
+            report["results"][size] = run_scale(size, args.seed, args.iterations, args.max_seconds, args.only)
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+    if args.save_baseline:
+        with open(DEFAULT_BASELINE, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {DEFAULT_BASELINE}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.threshold, args.min_delta_ms)
+        for regression in regressions:
+            print(f"REGRESSION {regression['scale']} {regression['benchmark']}: "
+                  f"{regression['baseline_p50_ms']} ms -> {regression['p50_ms']} ms (x{regression['ratio']})")
+        if regressions:
+            return 1
+        print("No regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
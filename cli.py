@@ -0,0 +1,916 @@
+"""
+Non-interactive command-line interface for the College Management System.
+
+Every invocation opens a single database connection, runs one operation and
+prints its result on stdout (tab-separated by default, JSON with --json).
+The modules' own status messages go to stderr so the output can be piped.
+
+Exit codes: 0 on success, 1 when the operation failed, 2 on usage errors.
+
+Examples:
+    python cli.py students add --name "Asha" --email asha@example.com --course BCA
+    python cli.py students import students.csv
+    python cli.py feedback import survey.csv --on-duplicate upsert
+    python cli.py library overdue --json
+    python cli.py analytics snapshot --json
+    python cli.py menu
+"""
+import argparse
+import contextlib
+import csv
+import datetime
+import json
+import os
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+
+from database import WriteError
+from modules.college import STARTUP_BUDGET_MS, College
+from modules.datagen import SCALES
+from modules.instrumentation import TIMING_LOG_ENV
+
+EXIT_OK = 0
+EXIT_FAILURE = 1
+EXIT_USAGE = 2
+
+ANALYTICS_METRICS = [
+    "total_students", "students_by_course", "students_by_gender", "student_enrollment_trends",
+    "total_courses", "course_popularity", "total_teachers", "teachers_by_department",
+    "total_books", "total_borrowed_books", "most_borrowed_books", "total_events",
+    "upcoming_events", "average_feedback_rating_by_course", "average_feedback_rating_by_teacher",
+    "teacher_rankings", "course_rankings", "feedback_trends", "book_circulation_trends",
+]
+
+
+def rows_to_dicts(columns, rows):
+    """Name the columns of tuple rows returned by the module classes"""
+    return [dict(zip(columns, row)) for row in rows]
+
+
+# ---------------------------------------------------------------- students
+
+def students_add(college, args):
+    return college.student.add_student(args.name, args.age, args.gender, args.contact,
+                                       args.email, args.address, args.course, args.semester)
+
+
+def students_get(college, args):
+    return college.student.get_student(args.id)
+
+
+def students_list(college, args):
+    return college.student.get_all_students()
+
+
+def students_search(college, args):
+    return college.student.search_students(args.term)
+
+
+def students_update(college, args):
+    return college.student.update_student(args.id, name=args.name, age=args.age, gender=args.gender,
+                                          contact=args.contact, email=args.email, address=args.address,
+                                          course=args.course, semester=args.semester)
+
+
+def students_delete(college, args):
+    return college.student.delete_student(args.id)
+
+
+def students_eligible(college, args):
+    return rows_to_dicts(["course_id", "title"], college.course.eligible_courses(args.id))
+
+
+def students_events(college, args):
+    return college.event.get_student_registrations(args.id)
+
+
+def students_courses(college, args):
+    status = None if args.all else "active"
+    return rows_to_dicts(["course_id", "title", "status", "enrolled_on"],
+                         college.student.get_courses(args.id, status))
+
+
+def students_import(college, args):
+    source = sys.stdin if args.file == "-" else open(args.file, newline="", encoding="utf-8")
+    with source:
+        records = []
+        for row in csv.DictReader(source):
+            for field in ("age", "semester"):
+                row[field] = int(row[field]) if row.get(field) else None
+            records.append(row)
+    return college.student.import_students(records)
+
+
+# ---------------------------------------------------------------- teachers
+
+def teachers_add(college, args):
+    return college.teacher.add_teacher(args.name, args.gender, args.contact, args.email,
+                                       args.department, args.qualification)
+
+
+def teachers_get(college, args):
+    return college.teacher.get_teacher(args.id)
+
+
+def teachers_list(college, args):
+    return college.teacher.get_all_teachers()
+
+
+def teachers_search(college, args):
+    return college.teacher.search_teachers(args.term)
+
+
+def teachers_delete(college, args):
+    return college.teacher.delete_teacher(args.id)
+
+
+# ---------------------------------------------------------------- admins
+
+def admins_add(college, args):
+    return college.admin.add_admin(args.name, args.contact, args.email, args.position, args.department)
+
+
+def admins_get(college, args):
+    return college.admin.get_admin(args.id)
+
+
+def admins_list(college, args):
+    return college.admin.get_all_admins()
+
+
+def admins_search(college, args):
+    return college.admin.search_admins(args.term)
+
+
+# ---------------------------------------------------------------- library
+
+def library_add(college, args):
+    return college.library.add_book(args.title, args.author, args.isbn, args.publisher,
+                                    args.year, args.copies)
+
+
+def library_get(college, args):
+    return college.library.get_book(args.id)
+
+
+def library_list(college, args):
+    return college.library.get_all_books()
+
+
+def library_search(college, args):
+    return college.library.search_books(args.term)
+
+
+def library_issue(college, args):
+    return college.library.issue_book(args.book_id, args.student_id)
+
+
+def library_return(college, args):
+    return college.library.return_book(args.issue_id)
+
+
+def library_overdue(college, args):
+    return college.library.get_overdue_issues(args.as_of)
+
+
+def library_history(college, args):
+    return college.library.get_issue_history(args.student_id, args.book_id, args.include_archived)
+
+
+# ---------------------------------------------------------------- events
+
+def events_add(college, args):
+    return college.event.add_event(args.name, args.description, args.date, args.time,
+                                   args.venue, args.organizer, args.end_time, args.on_conflict, args.capacity)
+
+
+def events_capacity(college, args):
+    return college.event.set_capacity(args.id, args.capacity)
+
+
+def events_register(college, args):
+    return college.event.register(args.id, args.student_id, args.priority)
+
+
+def events_unregister(college, args):
+    return college.event.cancel_registration(args.id, args.student_id)
+
+
+def events_registrations(college, args):
+    return college.event.get_registrations(args.id, args.status)
+
+
+def events_get(college, args):
+    return college.event.get_event(args.id)
+
+
+def events_list(college, args):
+    return college.event.get_all_events(args.status, args.start, args.end, args.include_archived)
+
+
+def events_series_add(college, args):
+    weekdays = [int(day) for day in args.weekdays.split(",")] if args.weekdays else None
+    return college.event.add_series(args.name, args.description, args.start_date, args.time, args.venue,
+                                    args.organizer, args.frequency, args.every, weekdays, args.until, args.count,
+                                    args.end_time, args.on_conflict)
+
+
+def events_series_get(college, args):
+    return college.event.get_series(args.id)
+
+
+def events_series_cancel(college, args):
+    return college.event.cancel_series(args.id)
+
+
+def events_skip(college, args):
+    return college.event.skip_occurrence(args.id, args.date)
+
+
+def events_occurrence_update(college, args):
+    return college.event.update_occurrence(args.id, args.date, args.end_time, args.on_conflict,
+                                           name=args.name, date=args.new_date, time=args.time,
+                                           venue=args.venue, status=args.status)
+
+
+def events_conflicts(college, args):
+    return college.event.find_conflicts(args.start, args.end)
+
+
+def events_update_statuses(college, args):
+    return college.event.update_event_statuses()
+
+
+# ---------------------------------------------------------------- feedback
+
+def feedback_submit(college, args):
+    return college.feedback.submit_feedback(args.student_id, args.teacher_id, args.course,
+                                            args.rating, args.comments)
+
+
+def feedback_import(college, args):
+    source = sys.stdin if args.file == "-" else open(args.file, newline="", encoding="utf-8")
+    with source:
+        records = list(csv.DictReader(source))
+    return college.feedback.bulk_submit_feedback(records, args.on_duplicate)
+
+
+def feedback_teacher(college, args):
+    columns = ["feedback_id", "student_name", "course", "rating", "comments", "date_submitted"]
+    return rows_to_dicts(columns, college.feedback.get_teacher_feedback(args.id, args.sentiment, args.topic,
+                                                                            args.include_archived))
+
+
+def feedback_student(college, args):
+    columns = ["feedback_id", "teacher_name", "course", "rating", "comments", "date_submitted"]
+    return rows_to_dicts(columns, college.feedback.get_student_feedback(args.id, args.include_archived))
+
+
+def feedback_course(college, args):
+    columns = ["feedback_id", "student_name", "teacher_name", "rating", "comments", "date_submitted"]
+    return rows_to_dicts(columns, college.feedback.get_course_feedback(args.course, args.sentiment, args.topic,
+                                                                           args.include_archived))
+
+
+def feedback_rating(college, args):
+    return {"teacher_id": args.id, "average_rating": college.feedback.calculate_teacher_rating(args.id)}
+
+
+def feedback_stats(college, args):
+    if args.course:
+        return college.feedback.get_course_rating_stats(args.course)
+    return college.feedback.get_teacher_rating_stats(args.teacher_id)
+
+
+def feedback_rebuild_stats(college, args):
+    return college.feedback.rebuild_rating_stats()
+
+
+def feedback_analyze(college, args):
+    return college.comment_analysis.run(args.workers, args.chunk_size)
+
+
+def feedback_tags(college, args):
+    return college.feedback.get_tag_summary(args.teacher_id, args.course)
+
+
+# ---------------------------------------------------------------- courses
+
+def courses_add(college, args):
+    return college.course.add_course(args.title, args.description, args.duration)
+
+
+def courses_get(college, args):
+    return college.course.get_course(args.id)
+
+
+def courses_list(college, args):
+    return rows_to_dicts(["course_id", "title", "description", "duration"], college.course.get_all_courses())
+
+
+def courses_roster(college, args):
+    status = None if args.all else "active"
+    return rows_to_dicts(["student_id", "name", "email", "status", "enrolled_on"],
+                         college.course.get_roster(args.id, status))
+
+
+def courses_enroll(college, args):
+    return college.course.enroll_student(args.student_id, args.id)
+
+
+def courses_drop(college, args):
+    return college.course.drop_student(args.student_id, args.id)
+
+
+def courses_complete(college, args):
+    return college.course.complete_enrollment(args.student_id, args.id)
+
+
+def courses_prereq_add(college, args):
+    return college.course.add_prerequisite(args.id, args.prerequisite_id)
+
+
+def courses_prereq_remove(college, args):
+    return college.course.remove_prerequisite(args.id, args.prerequisite_id)
+
+
+def courses_prereqs(college, args):
+    return rows_to_dicts(["course_id", "title"], college.course.get_prerequisites(args.id, args.transitive))
+
+
+def courses_plan(college, args):
+    return rows_to_dicts(["course_id", "title"], college.course.get_study_plan(args.id, args.student_id))
+
+
+def courses_order(college, args):
+    return rows_to_dicts(["course_id", "title"], college.course.get_course_order())
+
+
+# ---------------------------------------------------------------- timetable
+
+def parse_slot(text):
+    """'day:period' with 1-based numbers, e.g. 1:3 for Monday third period"""
+    day, _, period = text.partition(":")
+    return int(day) - 1, int(period) - 1
+
+
+def timetable_venue_add(college, args):
+    return college.timetable.add_venue(args.name, args.capacity)
+
+
+def timetable_venues_import(college, args):
+    return college.timetable.import_event_venues(args.capacity)
+
+
+def timetable_section_add(college, args):
+    return college.timetable.add_section(args.course_id, args.teacher_id, args.sessions, args.size, args.name)
+
+
+def timetable_availability(college, args):
+    return college.timetable.set_teacher_availability(args.id, [parse_slot(slot) for slot in args.slots])
+
+
+def timetable_generate(college, args):
+    return college.timetable.generate(args.department, args.time_limit, args.seed, not args.dry_run)
+
+
+def timetable_check(college, args):
+    day, period = parse_slot(args.slot)
+    clashes = college.timetable.check_placement(args.id, day, period, args.venue_id, args.session)
+    for clash in clashes:
+        print(f"Clash: {clash}")
+    return not clashes
+
+
+def timetable_move(college, args):
+    day, period = parse_slot(args.slot)
+    return college.timetable.move_session(args.id, args.session, day, period, args.venue_id)
+
+
+def timetable_show(college, args):
+    from modules.timetable import DAY_NAMES
+    rows = college.timetable.get_timetable(args.teacher_id, args.venue_id, args.course_id)
+    return [{"day": DAY_NAMES[day], "period": period + 1, "section_id": section_id, "session": session,
+             "course": course, "teacher": teacher, "venue": venue}
+            for day, period, section_id, session, course, teacher, venue in rows]
+
+
+# ---------------------------------------------------------------- analytics
+
+def analytics_value(analytics, metric):
+    """Compute one analytics figure in a JSON-friendly shape"""
+    value = getattr(analytics, f"get_{metric}")()
+    if metric == "most_borrowed_books":
+        value = rows_to_dicts(["title", "borrow_count"], value)
+    elif metric == "upcoming_events":
+        value = rows_to_dicts(["name", "date", "venue"], value)
+    elif metric == "teacher_rankings":
+        value = rows_to_dicts(["teacher_id", "name", "ratings", "average", "score"], value)
+    elif metric == "course_rankings":
+        value = rows_to_dicts(["course", "ratings", "average", "score"], value)
+    return value
+
+
+def analytics_snapshot(college, args):
+    return {metric: analytics_value(college.analytics, metric) for metric in args.metrics or ANALYTICS_METRICS}
+
+
+def analytics_trend(college, args):
+    trends = {
+        "enrollments": college.analytics.get_student_enrollment_trends,
+        "feedback": college.analytics.get_feedback_trends,
+        "circulation": college.analytics.get_book_circulation_trends,
+    }
+    return trends[args.series](args.grain)
+
+
+def analytics_refresh_rollups(college, args):
+    if args.rebuild:
+        return college.analytics.rollups.rebuild()
+    return college.analytics.rollups.refresh()
+
+
+# ---------------------------------------------------------------- archive
+
+def archive_run(college, args):
+    return college.archive.archive(args.tables, args.retention_days, args.batch_size, args.as_of)
+
+
+def archive_status(college, args):
+    return [dict(table=table, **counts) for table, counts in college.archive.get_counts().items()]
+
+
+# ---------------------------------------------------------------- integrity
+
+def integrity_delete(college, args):
+    ids = list(args.ids)
+    if args.ids_file:
+        source = sys.stdin if args.ids_file == "-" else open(args.ids_file, encoding="utf-8")
+        with source:
+            ids.extend(int(line) for line in source if line.strip())
+    policies = {}
+    for item in args.policies or []:
+        child, _, policy = item.partition("=")
+        policies[tuple(child.split(".", 1)) if "." in child else child] = policy
+    return college.integrity.delete(args.table, ids, policies)
+
+
+def integrity_cleanup(college, args):
+    report = college.integrity.cleanup_orphans(args.dry_run)
+    if report is None:
+        return None
+    return [dict(relation=relation, **entry) for relation, entry in report.items()]
+
+
+# ---------------------------------------------------------------- change journal
+
+def journal_read(college, args):
+    return college.journal.read(args.after, args.limit, args.tables)
+
+
+def journal_subscribe(college, args):
+    return {"consumer": args.consumer, "last_seq": college.journal.subscribe(args.consumer, args.from_seq)}
+
+
+def journal_consume(college, args):
+    changes = college.journal.fetch(args.consumer, args.limit)
+    if changes and not college.journal.commit(args.consumer, changes[-1]["seq"]):
+        return None
+    return changes
+
+
+def journal_consumers(college, args):
+    return college.journal.get_consumers()
+
+
+def journal_unsubscribe(college, args):
+    return college.journal.unsubscribe(args.consumer)
+
+
+def journal_compact(college, args):
+    return college.journal.compact()
+
+
+# ---------------------------------------------------------------- backups
+
+def backup_run(college, args):
+    return college.backup.backup(args.path, args.step_pages, args.compress, not args.no_verify)
+
+
+def backup_snapshot(college, args):
+    return college.backup.snapshot(args.keep, not args.no_compress, args.step_pages, not args.no_verify)
+
+
+def backup_list(college, args):
+    return college.backup.list_snapshots()
+
+
+def backup_verify(college, args):
+    integrity = college.backup.verify(args.path)
+    if integrity is None:
+        return None
+    print(f"Integrity: {integrity}")
+    return integrity == "ok"
+
+
+def backup_restore(college, args):
+    return college.backup.restore(args.path)
+
+
+# ---------------------------------------------------------------- data generation
+
+def generate_data(college, args):
+    from modules.datagen import DataGenerator
+    anchor = datetime.date.fromisoformat(args.anchor) if args.anchor else None
+    generator = DataGenerator(college.db, seed=args.seed, anchor=anchor, years=args.years)
+    overrides = {table: getattr(args, table) for table in SCALES[args.scale]}
+    return generator.generate(args.scale, **overrides)
+
+
+# ---------------------------------------------------------------- startup
+
+STARTUP_PROBE = """
+from modules.college import College
+college = College({db!r})
+college.student.get_student(0)
+college.close()
+"""
+
+
+def startup_check(args):
+    """Time cold starts in fresh interpreters and compare with the budget"""
+    probe = STARTUP_PROBE.format(db=args.db)
+    root = os.path.dirname(os.path.abspath(__file__))
+    timings = []
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", probe], cwd=root, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append((time.perf_counter() - started) * 1000)
+    median = statistics.median(timings)
+    return {"runs": args.runs, "median_ms": round(median, 1), "max_ms": round(max(timings), 1),
+            "budget_ms": args.budget_ms, "within_budget": median <= args.budget_ms}
+
+
+# ---------------------------------------------------------------- output
+
+def format_text(result):
+    """Render a result as tab-separated lines for shell pipelines"""
+    def cell(value):
+        if isinstance(value, (dict, list, tuple)):
+            return json.dumps(value, default=str)
+        return "" if value is None else str(value)
+
+    if isinstance(result, list):
+        if not result:
+            return ""
+        if isinstance(result[0], dict):
+            columns = list(result[0].keys())
+            lines = ["\t".join(columns)]
+            lines += ["\t".join(cell(row.get(c)) for c in columns) for row in result]
+            return "\n".join(lines)
+        return "\n".join("\t".join(cell(v) for v in row) if isinstance(row, (list, tuple)) else cell(row)
+                         for row in result)
+    if isinstance(result, dict):
+        return "\n".join(f"{key}\t{cell(value)}" for key, value in result.items())
+    return cell(result)
+
+
+def emit(result, as_json, out):
+    """Write a command result to the real stdout"""
+    if as_json:
+        json.dump(result, out, default=str)
+        out.write("\n")
+    else:
+        text = format_text(result)
+        if text:
+            out.write(text + "\n")
+
+
+# ---------------------------------------------------------------- parser
+
+def build_parser():
+    """Build the argparse tree for every subcommand"""
+    output = argparse.ArgumentParser(add_help=False)
+    output.add_argument("--json", action="store_true", help="print JSON instead of tab-separated text")
+
+    parser = argparse.ArgumentParser(prog="cms", description="College Management System command line")
+    parser.add_argument("--db", default="college_management.db", help="database file (default: %(default)s)")
+    parser.add_argument("--campuses", help="JSON map of campus names to database files")
+    parser.add_argument("--campus", help="use this campus's database; without it analytics cover every campus")
+    parser.add_argument("--timing-log", metavar="PATH", help="log every menu action and module call to this file")
+    groups = parser.add_subparsers(dest="group", metavar="<group>")
+    groups.required = True
+
+    def group(name, help_text):
+        sub = groups.add_parser(name, help=help_text).add_subparsers(dest="command", metavar="<command>")
+        sub.required = True
+        return sub
+
+    def command(subparsers, name, handler, help_text, *arguments):
+        cmd = subparsers.add_parser(name, help=help_text, parents=[output])
+        for args, kwargs in arguments:
+            cmd.add_argument(*args, **kwargs)
+        cmd.set_defaults(handler=handler)
+        return cmd
+
+    def arg(*args, **kwargs):
+        return args, kwargs
+
+    entity_id = arg("id", type=int)
+    term = arg("term")
+
+    students = group("students", "student records")
+    command(students, "add", students_add, "add a student",
+            arg("--name", required=True), arg("--age", type=int), arg("--gender"), arg("--contact"),
+            arg("--email", required=True), arg("--address"), arg("--course"), arg("--semester", type=int))
+    command(students, "get", students_get, "show one student", entity_id)
+    command(students, "list", students_list, "list all students")
+    command(students, "search", students_search, "search by name, email or course", term)
+    command(students, "update", students_update, "update a student", entity_id,
+            arg("--name"), arg("--age", type=int), arg("--gender"), arg("--contact"),
+            arg("--email"), arg("--address"), arg("--course"), arg("--semester", type=int))
+    command(students, "delete", students_delete, "delete a student", entity_id)
+    command(students, "courses", students_courses, "courses a student is enrolled in", entity_id,
+            arg("--all", action="store_true", help="include dropped and completed enrollments"))
+    command(students, "eligible", students_eligible, "courses a student can take next", entity_id)
+    command(students, "events", students_events, "events a student is registered or waitlisted for", entity_id)
+    command(students, "import", students_import, "bulk import students from CSV ('-' for stdin)",
+            arg("file"))
+
+    teachers = group("teachers", "teacher records")
+    command(teachers, "add", teachers_add, "add a teacher",
+            arg("--name", required=True), arg("--gender"), arg("--contact"), arg("--email", required=True),
+            arg("--department"), arg("--qualification"))
+    command(teachers, "get", teachers_get, "show one teacher", entity_id)
+    command(teachers, "list", teachers_list, "list all teachers")
+    command(teachers, "search", teachers_search, "search teachers", term)
+    command(teachers, "delete", teachers_delete, "delete a teacher", entity_id)
+
+    admins = group("admins", "administrator records")
+    command(admins, "add", admins_add, "add an administrator",
+            arg("--name", required=True), arg("--contact"), arg("--email", required=True),
+            arg("--position"), arg("--department"))
+    command(admins, "get", admins_get, "show one administrator", entity_id)
+    command(admins, "list", admins_list, "list all administrators")
+    command(admins, "search", admins_search, "search administrators", term)
+
+    library = group("library", "books and issues")
+    command(library, "add", library_add, "add a book",
+            arg("--title", required=True), arg("--author"), arg("--isbn", required=True), arg("--publisher"),
+            arg("--year", type=int), arg("--copies", type=int, default=1))
+    command(library, "get", library_get, "show one book", entity_id)
+    command(library, "list", library_list, "list all books")
+    command(library, "search", library_search, "search books", term)
+    command(library, "issue", library_issue, "issue a book to a student",
+            arg("book_id", type=int), arg("student_id", type=int))
+    command(library, "return", library_return, "return an issued book", arg("issue_id", type=int))
+    command(library, "overdue", library_overdue, "list overdue issues",
+            arg("--as-of", help="reference date YYYY-MM-DD (default: today)"))
+    include_archived = arg("--include-archived", action="store_true", help="also search the archive database")
+    command(library, "history", library_history, "issues of a student or book, newest first",
+            arg("--student-id", type=int), arg("--book-id", type=int), include_archived)
+
+    events = group("events", "college events")
+    end_time = arg("--end-time", help="HH:MM (default: two hours)")
+    on_conflict = arg("--on-conflict", choices=["reject", "flag"], default="reject",
+                      help="refuse a venue double booking, or add it with a warning")
+    command(events, "add", events_add, "add an event",
+            arg("--name", required=True), arg("--description"), arg("--date", required=True),
+            arg("--time"), arg("--venue"), arg("--organizer"), end_time, on_conflict,
+            arg("--capacity", type=int, help="seat limit (default: unlimited)"))
+    command(events, "capacity", events_capacity, "change the seat limit, promoting from the waitlist",
+            entity_id, arg("--capacity", type=int, help="seat limit; omit for unlimited"))
+    event_student = arg("--student-id", type=int, required=True)
+    command(events, "register", events_register, "register a student, or waitlist them when full",
+            entity_id, event_student, arg("--priority", type=int, default=0, help="higher is promoted first"))
+    command(events, "unregister", events_unregister, "cancel a registration", entity_id, event_student)
+    command(events, "registrations", events_registrations, "registrations and waitlist of an event", entity_id,
+            arg("--status", choices=["registered", "waitlisted", "cancelled"]))
+    command(events, "series-add", events_series_add, "add a recurring event",
+            arg("--name", required=True), arg("--description"), arg("--start-date", required=True),
+            arg("--time"), arg("--venue"), arg("--organizer"), end_time, on_conflict,
+            arg("--frequency", choices=["daily", "weekly", "monthly"], default="weekly"),
+            arg("--every", type=int, default=1, help="repeat every N days, weeks or months"),
+            arg("--weekdays", help="weekly days as 0-6 from Monday, e.g. 0,2,4"),
+            arg("--until", help="last date YYYY-MM-DD"), arg("--count", type=int, help="number of occurrences"))
+    command(events, "series-get", events_series_get, "show a recurring event", entity_id)
+    command(events, "series-cancel", events_series_cancel, "cancel every occurrence of a series", entity_id)
+    occurrence = arg("--date", required=True, help="original date of the occurrence")
+    command(events, "skip", events_skip, "drop one occurrence of a series", entity_id, occurrence)
+    command(events, "occurrence-update", events_occurrence_update, "change one occurrence of a series",
+            entity_id, occurrence, arg("--name"), arg("--new-date"), arg("--time"), arg("--venue"),
+            arg("--status", choices=["upcoming", "cancelled"]), end_time, on_conflict)
+    command(events, "get", events_get, "show one event", entity_id)
+    date_window = (arg("--from", dest="start", help="first date YYYY-MM-DD"),
+                   arg("--to", dest="end", help="last date (recurring events default to 180 days ahead)"))
+    command(events, "list", events_list, "list events, including occurrences of recurring events",
+            arg("--status", choices=["upcoming", "ongoing", "completed", "cancelled", "all"]), *date_window,
+            include_archived)
+    command(events, "conflicts", events_conflicts, "overlapping bookings of the same venue", *date_window)
+    command(events, "update-statuses", events_update_statuses, "mark past and current events")
+
+    feedback = group("feedback", "student feedback")
+    command(feedback, "submit", feedback_submit, "submit feedback",
+            arg("--student-id", type=int, required=True), arg("--teacher-id", type=int, required=True),
+            arg("--course", required=True), arg("--rating", type=int, required=True), arg("--comments", default=""))
+    command(feedback, "import", feedback_import, "bulk submit feedback from CSV ('-' for stdin)",
+            arg("file"), arg("--on-duplicate", choices=["reject", "upsert"], default="reject"))
+    sentiment = arg("--sentiment", choices=["positive", "neutral", "negative"])
+    topic = arg("--topic", help="only comments tagged with this topic")
+    command(feedback, "teacher", feedback_teacher, "feedback received by a teacher", entity_id, sentiment, topic,
+            include_archived)
+    command(feedback, "student", feedback_student, "feedback given by a student", entity_id, include_archived)
+    command(feedback, "course", feedback_course, "feedback for a course", arg("course"), sentiment, topic,
+            include_archived)
+    command(feedback, "rating", feedback_rating, "average rating of a teacher", entity_id)
+    command(feedback, "stats", feedback_stats, "rating count, average, variance and star distribution",
+            arg("--teacher-id", type=int), arg("--course"))
+    command(feedback, "rebuild-stats", feedback_rebuild_stats, "recompute rating aggregates from scratch")
+    command(feedback, "analyze", feedback_analyze, "tag new and edited comments with sentiment and topics",
+            arg("--workers", type=int, help="worker processes (default: CPU count)"),
+            arg("--chunk-size", type=int, default=2000))
+    command(feedback, "tags", feedback_tags, "sentiment and topic summary for a teacher or course",
+            arg("--teacher-id", type=int), arg("--course"))
+
+    courses = group("courses", "course catalogue")
+    command(courses, "add", courses_add, "add a course",
+            arg("--title", required=True), arg("--description"), arg("--duration"))
+    command(courses, "get", courses_get, "show one course", entity_id)
+    command(courses, "list", courses_list, "list all courses")
+    include_all = arg("--all", action="store_true", help="include dropped and completed enrollments")
+    command(courses, "roster", courses_roster, "students enrolled in a course", entity_id, include_all)
+    student_id = arg("--student-id", type=int, required=True)
+    command(courses, "enroll", courses_enroll, "enroll a student in a course", entity_id, student_id)
+    command(courses, "drop", courses_drop, "drop a student from a course", entity_id, student_id)
+    command(courses, "complete", courses_complete, "mark a student's enrollment completed", entity_id, student_id)
+    prerequisite_id = arg("--prerequisite-id", type=int, required=True)
+    command(courses, "prereq-add", courses_prereq_add, "add a prerequisite (cycles are refused)",
+            entity_id, prerequisite_id)
+    command(courses, "prereq-remove", courses_prereq_remove, "remove a prerequisite", entity_id, prerequisite_id)
+    command(courses, "prereqs", courses_prereqs, "prerequisites of a course", entity_id,
+            arg("--transitive", action="store_true", help="include indirect prerequisites, in study order"))
+    command(courses, "plan", courses_plan, "ordered courses needed to reach a course", entity_id,
+            arg("--student-id", type=int, help="skip courses this student completed"))
+    command(courses, "order", courses_order, "all courses in prerequisite order")
+
+    timetable = group("timetable", "rooms, sections and the weekly timetable")
+    slot = arg("--slot", required=True, help="day:period, 1-based (e.g. 2:4 is Tuesday fourth period)")
+    venue_id = arg("--venue-id", type=int, required=True)
+    command(timetable, "venue-add", timetable_venue_add, "add a room or venue",
+            arg("--name", required=True), arg("--capacity", type=int))
+    command(timetable, "venues-import", timetable_venues_import, "add the venues named in events",
+            arg("--capacity", type=int))
+    command(timetable, "section-add", timetable_section_add, "add a section of a course",
+            arg("--course-id", type=int, required=True), arg("--teacher-id", type=int, required=True),
+            arg("--sessions", type=int, default=3, help="sessions per week"), arg("--size", type=int, default=30),
+            arg("--name"))
+    command(timetable, "availability", timetable_availability, "set the slots a teacher can teach in",
+            entity_id, arg("slots", nargs="*", help="day:period slots; none means always available"))
+    command(timetable, "generate", timetable_generate, "build a clash-free timetable",
+            arg("--department", help="only sections taught by this department"),
+            arg("--time-limit", type=float, default=10.0, help="seconds of search (default: %(default)s)"),
+            arg("--seed", type=int, default=0),
+            arg("--dry-run", action="store_true", help="report the result without saving it"))
+    command(timetable, "check", timetable_check, "list clashes a placement would cause", entity_id, slot, venue_id,
+            arg("--session", type=int, help="session being moved, so it does not clash with itself"))
+    command(timetable, "move", timetable_move, "place one session by hand", entity_id,
+            arg("--session", type=int, required=True), slot, venue_id)
+    command(timetable, "show", timetable_show, "placed sessions, optionally for one teacher, venue or course",
+            arg("--teacher-id", type=int), arg("--venue-id", type=int), arg("--course-id", type=int))
+
+    analytics = group("analytics", "reports")
+    command(analytics, "snapshot", analytics_snapshot, "all analytics figures in one document",
+            arg("--metric", dest="metrics", action="append", choices=ANALYTICS_METRICS,
+                help="limit the snapshot to this metric (repeatable)"))
+    command(analytics, "trend", analytics_trend, "time series from the rollup tables",
+            arg("series", choices=["enrollments", "feedback", "circulation"]),
+            arg("--grain", choices=["day", "week", "month", "semester"], default="month"))
+    command(analytics, "refresh-rollups", analytics_refresh_rollups, "fold new and changed rows into the rollups",
+            arg("--rebuild", action="store_true", help="recompute every rollup from scratch"))
+
+    archive = group("archive", "move closed records to the archive database")
+    command(archive, "run", archive_run, "archive returned issues, past events and old feedback",
+            arg("--table", dest="tables", action="append", choices=["book_issues", "events", "feedback"],
+                help="only this table (repeatable)"),
+            arg("--retention-days", type=int, help="keep this many days hot (default: per table)"),
+            arg("--batch-size", type=int, default=5000, help="rows moved per transaction"),
+            arg("--as-of", help="reference date YYYY-MM-DD (default: today)"))
+    command(archive, "status", archive_status, "hot and archived row counts")
+
+    integrity = group("integrity", "deletes with cascade, restrict and archive policies")
+    command(integrity, "delete", integrity_delete, "delete many rows and their dependents in one transaction",
+            arg("table", choices=["students", "teachers", "books", "courses", "events"]),
+            arg("ids", type=int, nargs="*"),
+            arg("--ids-file", help="file with one id per line ('-' for stdin)"),
+            arg("--policy", dest="policies", action="append", metavar="CHILD[.COLUMN]=POLICY",
+                help="cascade, restrict or archive for one child table (repeatable)"))
+    command(integrity, "cleanup", integrity_cleanup, "archive or delete rows whose parent is gone",
+            arg("--dry-run", action="store_true", help="only report the orphans"))
+
+    journal = group("journal", "change journal for downstream consumers")
+    consumer = arg("consumer", help="consumer name")
+    limit = arg("--limit", type=int, default=1000, help="changes per batch")
+    command(journal, "read", journal_read, "changes after a sequence number",
+            arg("--after", type=int, default=0), limit,
+            arg("--table", dest="tables", action="append", help="only changes to this table (repeatable)"))
+    command(journal, "subscribe", journal_subscribe, "register a consumer", consumer,
+            arg("--from-seq", type=int, help="start after this sequence number (default: the current head)"))
+    command(journal, "consume", journal_consume, "next batch for a consumer, committing its offset", consumer, limit)
+    command(journal, "consumers", journal_consumers, "consumers with their offsets and lag")
+    command(journal, "unsubscribe", journal_unsubscribe, "remove a consumer", consumer)
+    command(journal, "compact", journal_compact, "delete changes every consumer has committed")
+
+    backup = group("backup", "online backups and snapshots")
+    step_pages = arg("--step-pages", type=int, default=256,
+                     help="pages copied per step; the database is locked for one step at a time")
+    no_verify = arg("--no-verify", action="store_true", help="skip the integrity check of the copy")
+    command(backup, "run", backup_run, "back up the live database to a file", arg("path"), step_pages, no_verify,
+            arg("--compress", action="store_true", help="gzip the copy"))
+    command(backup, "snapshot", backup_snapshot, "timestamped compressed backup in the backups directory",
+            step_pages, no_verify, arg("--keep", type=int, default=7, help="snapshots to keep"),
+            arg("--no-compress", action="store_true"))
+    command(backup, "list", backup_list, "snapshots, newest first")
+    command(backup, "verify", backup_verify, "integrity check of a backup file", arg("path"))
+    command(backup, "restore", backup_restore, "replace the database with a backup", arg("path"))
+
+    menu = groups.add_parser("menu", help="start the interactive menu")
+    menu.set_defaults(handler=None)
+
+    generate = groups.add_parser("generate", parents=[output],
+                                 help="fill an empty database with synthetic data")
+    generate.add_argument("--scale", choices=list(SCALES), default="small")
+    generate.add_argument("--seed", type=int, default=42)
+    generate.add_argument("--anchor", help="date treated as today, YYYY-MM-DD (default: today)")
+    generate.add_argument("--years", type=int, default=5, help="years of history to spread dates over")
+    for table in SCALES["small"]:
+        generate.add_argument(f"--{table.replace('_', '-')}", dest=table, type=int,
+                              help=f"override the number of {table.replace('_', ' ')}")
+    generate.set_defaults(handler=generate_data)
+
+    startup = groups.add_parser("startup-check", parents=[output],
+                                help="measure cold start against the startup budget")
+    startup.add_argument("--runs", type=int, default=5)
+    startup.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS)
+
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.timing_log:
+        os.environ[TIMING_LOG_ENV] = args.timing_log
+
+    if args.group == "menu":
+        from main import run_menu
+        run_menu(College(args.db))
+        return EXIT_OK
+
+    if args.group == "startup-check":
+        report = startup_check(args)
+        emit(report, args.json, sys.stdout)
+        return EXIT_OK if report["within_budget"] else EXIT_FAILURE
+
+    campuses = None
+    if args.campuses:
+        from modules.sharding import ShardedCollege, load_campuses
+        try:
+            campuses = load_campuses(args.campuses)
+        except (OSError, ValueError, sqlite3.Error) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return EXIT_FAILURE
+        if args.campus:
+            if args.campus not in campuses:
+                print(f"Error: Unknown campus '{args.campus}'.", file=sys.stderr)
+                return EXIT_USAGE
+            args.db, campuses = campuses[args.campus], None
+        elif args.handler not in (analytics_snapshot, analytics_trend):
+            print("Error: Pick a campus with --campus; only analytics snapshot and trend span campuses.",
+                  file=sys.stderr)
+            return EXIT_USAGE
+
+    out = sys.stdout
+    # Module classes report progress with print(); keep stdout for results only
+    with contextlib.redirect_stdout(sys.stderr):
+        college = ShardedCollege(campuses) if campuses else College(args.db)
+        try:
+            result = args.handler(college, args)
+        except (OSError, ValueError, sqlite3.Error) as e:
+            print(f"Error: {e}")
+            return EXIT_FAILURE
+        finally:
+            college.close()
+
+    if result is None or result is False or isinstance(result, WriteError):
+        return EXIT_FAILURE
+    if result is not True:
+        emit(result, args.json, out)
+    return EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
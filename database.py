@@ -1,5 +1,920 @@
 
+import hashlib
+import re
 import sqlite3
+import time
+from contextlib import contextmanager
+
+from modules.metrics import DB_ERRORS, DB_QUERY_SECONDS
+
+# Statement templates for the rating aggregate tables; {table} is
+# teacher_rating_stats or course_rating_stats and {key} its feedback column.
+# The rebuild reads {source}: feedback, or both tiers of it (modules/archive.py).
+RATING_STATS_ADD = '''
+        INSERT INTO {table} ({key}, n, total, total_sq, s1, s2, s3, s4, s5)
+        SELECT NEW.{key}, 1, NEW.rating, NEW.rating * NEW.rating, NEW.rating = 1, NEW.rating = 2,
+               NEW.rating = 3, NEW.rating = 4, NEW.rating = 5
+        WHERE NEW.rating IS NOT NULL AND NEW.{key} IS NOT NULL
+        ON CONFLICT ({key}) DO UPDATE SET
+            n = n + 1, total = total + excluded.total, total_sq = total_sq + excluded.total_sq,
+            s1 = s1 + excluded.s1, s2 = s2 + excluded.s2, s3 = s3 + excluded.s3,
+            s4 = s4 + excluded.s4, s5 = s5 + excluded.s5;'''
+RATING_STATS_REMOVE = '''
+        UPDATE {table} SET
+            n = n - 1, total = total - OLD.rating, total_sq = total_sq - OLD.rating * OLD.rating,
+            s1 = s1 - (OLD.rating = 1), s2 = s2 - (OLD.rating = 2), s3 = s3 - (OLD.rating = 3),
+            s4 = s4 - (OLD.rating = 4), s5 = s5 - (OLD.rating = 5)
+        WHERE {key} = OLD.{key} AND OLD.rating IS NOT NULL;'''
+RATING_STATS_REBUILD = '''
+    INSERT INTO {table} ({key}, n, total, total_sq, s1, s2, s3, s4, s5)
+    SELECT {key}, COUNT(*), SUM(rating), SUM(rating * rating), SUM(rating = 1), SUM(rating = 2),
+           SUM(rating = 3), SUM(rating = 4), SUM(rating = 5)
+    FROM {source} WHERE rating IS NOT NULL AND {key} IS NOT NULL {condition}
+    GROUP BY {key}
+    '''
+
+# Watermark of the rollup refresh for a source table; changes to rows at or
+# below it are logged to rollup_log, newer rows are picked up by id.
+ROLLUP_WATERMARK = "(SELECT CAST(value AS INTEGER) FROM system_state WHERE key = 'rollup_watermark:{table}')"
+
+# Set in system_state only inside the archiver's transactions (modules/archive.py):
+# rows moved to the archive still count in rollups and rating aggregates.
+NOT_ARCHIVING = "NOT EXISTS (SELECT 1 FROM system_state WHERE key = 'archiving')"
+
+# Tables whose rows move to the archive tier: AUTOINCREMENT keeps SQLite from
+# handing an archived row's id to a new row (table -> primary key)
+AUTOINCREMENT_KEYS = {"book_issues": "issue_id", "events": "event_id", "feedback": "feedback_id"}
+
+# Tables whose writes are recorded in change_journal (modules/journal.py):
+# table -> (primary key, columns compared by the update trigger). Columns
+# added to these tables later belong here too.
+JOURNALED_TABLES = {
+    "students": ("student_id", ["name", "age", "gender", "contact", "email", "address", "course",
+                                "enrollment_date", "semester"]),
+    "administrators": ("admin_id", ["name", "contact", "email", "position", "department"]),
+    "teachers": ("teacher_id", ["name", "gender", "contact", "email", "department", "qualification",
+                                "date_joined"]),
+    "books": ("book_id", ["title", "author", "isbn", "publisher", "year_published", "total_copies",
+                          "available_copies"]),
+    "book_issues": ("issue_id", ["book_id", "student_id", "issue_date", "return_date", "actual_return_date",
+                                 "fine_amount", "status"]),
+    "events": ("event_id", ["name", "description", "date", "time", "venue", "organizer", "status",
+                            "start_at", "end_at", "capacity", "seats_available"]),
+    "feedback": ("feedback_id", ["student_id", "teacher_id", "course", "rating", "comments", "date_submitted"]),
+    "courses": ("course_id", ["title", "description", "duration"]),
+}
+
+
+def journal_triggers(table):
+    """DDL for the insert, update and delete triggers appending to change_journal"""
+    key, columns = JOURNALED_TABLES[table]
+    columns = [key] + columns
+    changed = " OR ".join(f"OLD.{column} IS NOT NEW.{column}" for column in columns)
+    names = " || ".join(f"CASE WHEN OLD.{column} IS NOT NEW.{column} THEN '{column},' ELSE '' END"
+                        for column in columns)
+    return [
+        f"DROP TRIGGER IF EXISTS journal_{table}_insert",
+        f'''
+    CREATE TRIGGER journal_{table}_insert AFTER INSERT ON {table}
+    BEGIN
+        INSERT INTO change_journal (table_name, pk, op) VALUES ('{table}', NEW.{key}, 'I');
+    END
+    ''',
+        f"DROP TRIGGER IF EXISTS journal_{table}_update",
+        f'''
+    CREATE TRIGGER journal_{table}_update AFTER UPDATE ON {table}
+    WHEN {changed}
+    BEGIN
+        INSERT INTO change_journal (table_name, pk, op, columns)
+        VALUES ('{table}', NEW.{key}, 'U', rtrim({names}, ','));
+    END
+    ''',
+        f"DROP TRIGGER IF EXISTS journal_{table}_delete",
+        # Rows moved by the archiver are journaled as 'A', not as deletions
+        f'''
+    CREATE TRIGGER journal_{table}_delete AFTER DELETE ON {table}
+    BEGIN
+        INSERT INTO change_journal (table_name, pk, op)
+        VALUES ('{table}', OLD.{key}, CASE WHEN {NOT_ARCHIVING} THEN 'D' ELSE 'A' END);
+    END
+    ''',
+    ]
+
+
+PREREQUISITES_VERSION_BUMP = '''
+        INSERT INTO system_state (key, value) VALUES ('prerequisites_version', 1)
+        ON CONFLICT (key) DO UPDATE SET value = value + 1;'''
+
+# Events without explicit start/end get them from date and time: a two hour
+# booking, or the whole day when no time is set. Raw inserts (imports, the
+# data generator) rely on this as much as the Event module does.
+EVENT_DEFAULT_INTERVAL = '''
+        UPDATE events SET
+            start_at = strftime('%Y-%m-%d %H:%M', date || ' ' || COALESCE(NULLIF(time, ''), '00:00')),
+            end_at = strftime('%Y-%m-%d %H:%M', date || ' ' || COALESCE(NULLIF(time, ''), '00:00'),
+                              CASE WHEN NULLIF(time, '') IS NULL THEN '+1 day' ELSE '+2 hours' END)
+        WHERE {condition}'''
+# Mirror one event into the event_intervals R*Tree: one point on the venue
+# axis and the booked minutes (end exclusive) on the time axis. Cancelled
+# events and events without a venue or interval hold no booking.
+EVENT_INTERVAL_INDEX = '''
+        INSERT OR IGNORE INTO venues (name) SELECT NEW.venue WHERE NEW.venue IS NOT NULL AND NEW.venue != '';
+        INSERT OR REPLACE INTO event_intervals (event_id, venue_min, venue_max, start_min, end_min)
+        SELECT NEW.event_id, venue_id, venue_id, unixepoch(NEW.start_at) / 60,
+               MAX(unixepoch(NEW.start_at) / 60, unixepoch(NEW.end_at) / 60 - 1)
+        FROM venues
+        WHERE name = NEW.venue AND NEW.status IS NOT 'cancelled' AND unixepoch(NEW.end_at) > unixepoch(NEW.start_at);'''
+
+
+SCHEMA = [
+    # Students table
+    '''
+    CREATE TABLE IF NOT EXISTS students (
+        student_id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        age INTEGER,
+        gender TEXT,
+        contact TEXT,
+        email TEXT UNIQUE,
+        address TEXT,
+        course TEXT,
+        enrollment_date TEXT,
+        semester INTEGER
+    )
+    ''',
+
+    # Administrators table
+    '''
+    CREATE TABLE IF NOT EXISTS administrators (
+        admin_id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        contact TEXT,
+        email TEXT UNIQUE,
+        position TEXT,
+        department TEXT
+    )
+    ''',
+
+    # Teachers table
+    '''
+    CREATE TABLE IF NOT EXISTS teachers (
+        teacher_id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        gender TEXT,
+        contact TEXT,
+        email TEXT UNIQUE,
+        department TEXT,
+        qualification TEXT,
+        date_joined TEXT
+    )
+    ''',
+
+    # Library table
+    '''
+    CREATE TABLE IF NOT EXISTS books (
+        book_id INTEGER PRIMARY KEY,
+        title TEXT NOT NULL,
+        author TEXT,
+        isbn TEXT UNIQUE,
+        publisher TEXT,
+        year_published INTEGER,
+        total_copies INTEGER,
+        available_copies INTEGER
+    )
+    ''',
+
+    # Book issues table
+    '''
+    CREATE TABLE IF NOT EXISTS book_issues (
+        issue_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        book_id INTEGER,
+        student_id INTEGER,
+        issue_date TEXT,
+        return_date TEXT,
+        actual_return_date TEXT,
+        fine_amount REAL,
+        status TEXT,
+        FOREIGN KEY (book_id) REFERENCES books (book_id),
+        FOREIGN KEY (student_id) REFERENCES students (student_id)
+    )
+    ''',
+
+    # Events table
+    '''
+    CREATE TABLE IF NOT EXISTS events (
+        event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        description TEXT,
+        date TEXT,
+        time TEXT,
+        venue TEXT,
+        organizer TEXT,
+        status TEXT
+    )
+    ''',
+
+    # Feedback table
+    '''
+    CREATE TABLE IF NOT EXISTS feedback (
+        feedback_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        student_id INTEGER,
+        teacher_id INTEGER,
+        course TEXT,
+        rating INTEGER,
+        comments TEXT,
+        date_submitted TEXT,
+        FOREIGN KEY (student_id) REFERENCES students (student_id),
+        FOREIGN KEY (teacher_id) REFERENCES teachers (teacher_id)
+    )
+    ''',
+
+    # Courses table
+    '''
+    CREATE TABLE IF NOT EXISTS courses (
+        course_id INTEGER PRIMARY KEY,
+        title TEXT,
+        description TEXT,
+        duration TEXT
+    )
+    ''',
+
+    # Running rating aggregates per teacher and per course, kept exact by the
+    # feedback triggers below: count, sum, sum of squares and a star histogram
+    '''
+    CREATE TABLE IF NOT EXISTS teacher_rating_stats (
+        teacher_id INTEGER PRIMARY KEY,
+        n INTEGER NOT NULL DEFAULT 0,
+        total INTEGER NOT NULL DEFAULT 0,
+        total_sq INTEGER NOT NULL DEFAULT 0,
+        s1 INTEGER NOT NULL DEFAULT 0,
+        s2 INTEGER NOT NULL DEFAULT 0,
+        s3 INTEGER NOT NULL DEFAULT 0,
+        s4 INTEGER NOT NULL DEFAULT 0,
+        s5 INTEGER NOT NULL DEFAULT 0
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS course_rating_stats (
+        course TEXT PRIMARY KEY,
+        n INTEGER NOT NULL DEFAULT 0,
+        total INTEGER NOT NULL DEFAULT 0,
+        total_sq INTEGER NOT NULL DEFAULT 0,
+        s1 INTEGER NOT NULL DEFAULT 0,
+        s2 INTEGER NOT NULL DEFAULT 0,
+        s3 INTEGER NOT NULL DEFAULT 0,
+        s4 INTEGER NOT NULL DEFAULT 0,
+        s5 INTEGER NOT NULL DEFAULT 0
+    )
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS feedback_rating_stats_insert AFTER INSERT ON feedback
+    BEGIN
+        {RATING_STATS_ADD.format(table="teacher_rating_stats", key="teacher_id")}
+        {RATING_STATS_ADD.format(table="course_rating_stats", key="course")}
+    END
+    ''',
+    # Dropped first so databases created before the archive gate get it
+    '''
+    DROP TRIGGER IF EXISTS feedback_rating_stats_delete
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS feedback_rating_stats_delete AFTER DELETE ON feedback
+    WHEN {NOT_ARCHIVING}
+    BEGIN
+        {RATING_STATS_REMOVE.format(table="teacher_rating_stats", key="teacher_id")}
+        {RATING_STATS_REMOVE.format(table="course_rating_stats", key="course")}
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS feedback_rating_stats_update AFTER UPDATE OF teacher_id, course, rating ON feedback
+    BEGIN
+        {RATING_STATS_REMOVE.format(table="teacher_rating_stats", key="teacher_id")}
+        {RATING_STATS_REMOVE.format(table="course_rating_stats", key="course")}
+        {RATING_STATS_ADD.format(table="teacher_rating_stats", key="teacher_id")}
+        {RATING_STATS_ADD.format(table="course_rating_stats", key="course")}
+    END
+    ''',
+
+    # Backfill the aggregates the first time they are created
+    RATING_STATS_REBUILD.format(table="teacher_rating_stats", key="teacher_id", source="feedback",
+                                condition="AND NOT EXISTS (SELECT 1 FROM teacher_rating_stats)"),
+    RATING_STATS_REBUILD.format(table="course_rating_stats", key="course", source="feedback",
+                                condition="AND NOT EXISTS (SELECT 1 FROM course_rating_stats)"),
+
+    # Internal key/value state such as pipeline watermarks
+    '''
+    CREATE TABLE IF NOT EXISTS system_state (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    )
+    ''',
+
+    # Comment analysis tags (modules/comment_analysis.py)
+    '''
+    CREATE TABLE IF NOT EXISTS feedback_tags (
+        feedback_id INTEGER PRIMARY KEY,
+        sentiment TEXT,
+        score REAL,
+        keywords TEXT,
+        analyzed_at TEXT,
+        FOREIGN KEY (feedback_id) REFERENCES feedback (feedback_id)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS feedback_topics (
+        topic TEXT,
+        feedback_id INTEGER,
+        PRIMARY KEY (topic, feedback_id)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_feedback_topics_feedback ON feedback_topics (feedback_id)
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS feedback_tags_pending (
+        feedback_id INTEGER PRIMARY KEY
+    )
+    ''',
+
+    # Edited comments lose their tags and are queued for the next analysis run
+    '''
+    CREATE TRIGGER IF NOT EXISTS feedback_tags_stale AFTER UPDATE OF comments ON feedback
+    WHEN OLD.comments IS NOT NEW.comments
+    BEGIN
+        DELETE FROM feedback_tags WHERE feedback_id = OLD.feedback_id;
+        DELETE FROM feedback_topics WHERE feedback_id = OLD.feedback_id;
+        INSERT OR IGNORE INTO feedback_tags_pending (feedback_id) VALUES (NEW.feedback_id);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS feedback_tags_delete AFTER DELETE ON feedback
+    BEGIN
+        DELETE FROM feedback_tags WHERE feedback_id = OLD.feedback_id;
+        DELETE FROM feedback_topics WHERE feedback_id = OLD.feedback_id;
+        DELETE FROM feedback_tags_pending WHERE feedback_id = OLD.feedback_id;
+    END
+    ''',
+    # A row inserted at or below the analysis watermark (a reused id) is queued, not skipped
+    '''
+    CREATE TRIGGER IF NOT EXISTS feedback_tags_insert AFTER INSERT ON feedback
+    WHEN NEW.feedback_id <= (SELECT CAST(value AS INTEGER) FROM system_state WHERE key = 'comment_analysis_watermark')
+    BEGIN
+        INSERT OR IGNORE INTO feedback_tags_pending (feedback_id) VALUES (NEW.feedback_id);
+    END
+    ''',
+
+    # Time-bucketed counts and totals (modules/rollups.py)
+    '''
+    CREATE TABLE IF NOT EXISTS rollups (
+        metric TEXT NOT NULL,
+        grain TEXT NOT NULL,
+        bucket TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        total INTEGER NOT NULL,
+        PRIMARY KEY (metric, grain, bucket)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS rollup_log (
+        log_id INTEGER PRIMARY KEY,
+        metric TEXT NOT NULL,
+        day TEXT,
+        count INTEGER NOT NULL,
+        total INTEGER NOT NULL
+    )
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS rollup_students_update AFTER UPDATE OF enrollment_date ON students
+    WHEN OLD.student_id <= {ROLLUP_WATERMARK.format(table="students")}
+        AND OLD.enrollment_date IS NOT NEW.enrollment_date
+    BEGIN
+        INSERT INTO rollup_log (metric, day, count, total) VALUES
+            ('enrollments', date(OLD.enrollment_date), -1, -1),
+            ('enrollments', date(NEW.enrollment_date), 1, 1);
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS rollup_students_delete AFTER DELETE ON students
+    WHEN OLD.student_id <= {ROLLUP_WATERMARK.format(table="students")}
+    BEGIN
+        INSERT INTO rollup_log (metric, day, count, total) VALUES ('enrollments', date(OLD.enrollment_date), -1, -1);
+    END
+    ''',
+    # Rows inserted at or below the watermark (a reused id) are not picked up by id
+    f'''
+    CREATE TRIGGER IF NOT EXISTS rollup_students_insert AFTER INSERT ON students
+    WHEN NEW.student_id <= {ROLLUP_WATERMARK.format(table="students")}
+    BEGIN
+        INSERT INTO rollup_log (metric, day, count, total) VALUES ('enrollments', date(NEW.enrollment_date), 1, 1);
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS rollup_book_issues_update AFTER UPDATE OF issue_date, actual_return_date ON book_issues
+    WHEN OLD.issue_id <= {ROLLUP_WATERMARK.format(table="book_issues")}
+        AND (OLD.issue_date IS NOT NEW.issue_date OR OLD.actual_return_date IS NOT NEW.actual_return_date)
+    BEGIN
+        INSERT INTO rollup_log (metric, day, count, total) VALUES
+            ('book_issues', date(OLD.issue_date), -1, -1),
+            ('book_issues', date(NEW.issue_date), 1, 1),
+            ('book_returns', date(OLD.actual_return_date), -1, -1),
+            ('book_returns', date(NEW.actual_return_date), 1, 1);
+    END
+    ''',
+    '''
+    DROP TRIGGER IF EXISTS rollup_book_issues_delete
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS rollup_book_issues_delete AFTER DELETE ON book_issues
+    WHEN OLD.issue_id <= {ROLLUP_WATERMARK.format(table="book_issues")} AND {NOT_ARCHIVING}
+    BEGIN
+        INSERT INTO rollup_log (metric, day, count, total) VALUES
+            ('book_issues', date(OLD.issue_date), -1, -1),
+            ('book_returns', date(OLD.actual_return_date), -1, -1);
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS rollup_book_issues_insert AFTER INSERT ON book_issues
+    WHEN NEW.issue_id <= {ROLLUP_WATERMARK.format(table="book_issues")}
+    BEGIN
+        INSERT INTO rollup_log (metric, day, count, total) VALUES
+            ('book_issues', date(NEW.issue_date), 1, 1),
+            ('book_returns', date(NEW.actual_return_date), 1, 1);
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS rollup_feedback_update AFTER UPDATE OF rating, date_submitted ON feedback
+    WHEN OLD.feedback_id <= {ROLLUP_WATERMARK.format(table="feedback")}
+        AND (OLD.rating IS NOT NEW.rating OR OLD.date_submitted IS NOT NEW.date_submitted)
+    BEGIN
+        INSERT INTO rollup_log (metric, day, count, total) VALUES
+            ('feedback', date(OLD.date_submitted), -1, -OLD.rating),
+            ('feedback', date(NEW.date_submitted), 1, NEW.rating);
+    END
+    ''',
+    '''
+    DROP TRIGGER IF EXISTS rollup_feedback_delete
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS rollup_feedback_delete AFTER DELETE ON feedback
+    WHEN OLD.feedback_id <= {ROLLUP_WATERMARK.format(table="feedback")} AND {NOT_ARCHIVING}
+    BEGIN
+        INSERT INTO rollup_log (metric, day, count, total) VALUES ('feedback', date(OLD.date_submitted), -1, -OLD.rating);
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS rollup_feedback_insert AFTER INSERT ON feedback
+    WHEN NEW.feedback_id <= {ROLLUP_WATERMARK.format(table="feedback")}
+    BEGIN
+        INSERT INTO rollup_log (metric, day, count, total) VALUES ('feedback', date(NEW.date_submitted), 1, NEW.rating);
+    END
+    ''',
+
+    # Student-course enrollments; status is active, dropped or completed
+    '''
+    CREATE TABLE IF NOT EXISTS enrollments (
+        student_id INTEGER NOT NULL,
+        course_id INTEGER NOT NULL,
+        status TEXT NOT NULL DEFAULT 'active',
+        enrolled_on TEXT,
+        updated_on TEXT,
+        PRIMARY KEY (student_id, course_id),
+        FOREIGN KEY (student_id) REFERENCES students (student_id),
+        FOREIGN KEY (course_id) REFERENCES courses (course_id)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_enrollments_course ON enrollments (course_id, status, student_id)
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS enrollment_history (
+        history_id INTEGER PRIMARY KEY,
+        student_id INTEGER NOT NULL,
+        course_id INTEGER NOT NULL,
+        status TEXT NOT NULL,
+        changed_on TEXT
+    )
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_enrollment_history_student ON enrollment_history (student_id, course_id)
+    ''',
+    # Course titles are unique (add_course upserts on them); older databases
+    # may hold duplicates, which are renamed apart before the index is built
+    '''
+    UPDATE courses SET title = title || ' (' || course_id || ')'
+    WHERE title IS NOT NULL AND course_id NOT IN (SELECT MIN(course_id) FROM courses GROUP BY title)
+    ''',
+    '''
+    DROP INDEX IF EXISTS idx_courses_title
+    ''',
+    '''
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_courses_title_unique ON courses (title)
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_feedback_course ON feedback (course, date_submitted)
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS enrollment_history_insert AFTER INSERT ON enrollments
+    BEGIN
+        INSERT INTO enrollment_history (student_id, course_id, status, changed_on)
+        VALUES (NEW.student_id, NEW.course_id, NEW.status, NEW.updated_on);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS enrollment_history_update AFTER UPDATE OF status ON enrollments
+    WHEN OLD.status IS NOT NEW.status
+    BEGIN
+        INSERT INTO enrollment_history (student_id, course_id, status, changed_on)
+        VALUES (NEW.student_id, NEW.course_id, NEW.status, NEW.updated_on);
+    END
+    ''',
+
+    # students.course stays as the student's programme; every write path keeps
+    # a matching enrollment, creating the course row for an unknown title
+    '''
+    CREATE TRIGGER IF NOT EXISTS students_course_enroll AFTER INSERT ON students
+    WHEN NEW.course IS NOT NULL AND NEW.course != ''
+    BEGIN
+        INSERT INTO courses (title) SELECT NEW.course
+        WHERE NOT EXISTS (SELECT 1 FROM courses WHERE title = NEW.course);
+        INSERT OR IGNORE INTO enrollments (student_id, course_id, status, enrolled_on, updated_on)
+        SELECT NEW.student_id, MIN(course_id), 'active', NEW.enrollment_date, NEW.enrollment_date
+        FROM courses WHERE title = NEW.course;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS students_course_change AFTER UPDATE OF course ON students
+    WHEN OLD.course IS NOT NEW.course
+    BEGIN
+        UPDATE enrollments SET status = 'dropped', updated_on = date('now')
+        WHERE student_id = OLD.student_id AND status = 'active'
+          AND course_id IN (SELECT course_id FROM courses WHERE title = OLD.course);
+        INSERT INTO courses (title) SELECT NEW.course
+        WHERE NEW.course IS NOT NULL AND NEW.course != ''
+          AND NOT EXISTS (SELECT 1 FROM courses WHERE title = NEW.course);
+        INSERT INTO enrollments (student_id, course_id, status, enrolled_on, updated_on)
+        SELECT NEW.student_id, MIN(course_id), 'active', date('now'), date('now')
+        FROM courses WHERE title = NEW.course AND NEW.course != '' GROUP BY title
+        ON CONFLICT (student_id, course_id) DO UPDATE SET status = 'active', updated_on = excluded.updated_on;
+    END
+    ''',
+
+    # One-off migration of the free-text students.course values
+    '''
+    INSERT INTO courses (title)
+    SELECT DISTINCT course FROM students
+    WHERE course IS NOT NULL AND course != ''
+      AND course NOT IN (SELECT title FROM courses WHERE title IS NOT NULL)
+      AND NOT EXISTS (SELECT 1 FROM enrollments)
+    ''',
+    '''
+    INSERT OR IGNORE INTO enrollments (student_id, course_id, status, enrolled_on, updated_on)
+    SELECT s.student_id, c.course_id, 'active', s.enrollment_date, s.enrollment_date
+    FROM students s
+    JOIN (SELECT title, MIN(course_id) AS course_id FROM courses GROUP BY title) c ON c.title = s.course
+    WHERE NOT EXISTS (SELECT 1 FROM enrollments)
+    ''',
+
+    # Prerequisite edges: course_id requires prerequisite_id. Any change bumps
+    # prerequisites_version so cached closures and orderings are rebuilt.
+    '''
+    CREATE TABLE IF NOT EXISTS course_prerequisites (
+        course_id INTEGER NOT NULL,
+        prerequisite_id INTEGER NOT NULL,
+        PRIMARY KEY (course_id, prerequisite_id),
+        FOREIGN KEY (course_id) REFERENCES courses (course_id),
+        FOREIGN KEY (prerequisite_id) REFERENCES courses (course_id)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_course_prerequisites_prerequisite ON course_prerequisites (prerequisite_id)
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS course_prerequisites_insert AFTER INSERT ON course_prerequisites
+    BEGIN
+        {PREREQUISITES_VERSION_BUMP}
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS course_prerequisites_delete AFTER DELETE ON course_prerequisites
+    BEGIN
+        {PREREQUISITES_VERSION_BUMP}
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS courses_delete_prerequisites AFTER DELETE ON courses
+    BEGIN
+        DELETE FROM course_prerequisites WHERE course_id = OLD.course_id OR prerequisite_id = OLD.course_id;
+    END
+    ''',
+
+    # Timetabling (modules/timetable.py): rooms and venues, course sections,
+    # teacher availability per (day, period) and the placed sessions. The
+    # unique indexes make a venue or teacher double booking impossible.
+    '''
+    CREATE TABLE IF NOT EXISTS venues (
+        venue_id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE,
+        capacity INTEGER
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS course_sections (
+        section_id INTEGER PRIMARY KEY,
+        course_id INTEGER NOT NULL,
+        teacher_id INTEGER NOT NULL,
+        name TEXT,
+        sessions_per_week INTEGER NOT NULL DEFAULT 3,
+        size INTEGER NOT NULL DEFAULT 30,
+        FOREIGN KEY (course_id) REFERENCES courses (course_id),
+        FOREIGN KEY (teacher_id) REFERENCES teachers (teacher_id)
+    )
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_course_sections_teacher ON course_sections (teacher_id)
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS teacher_availability (
+        teacher_id INTEGER NOT NULL,
+        day INTEGER NOT NULL,
+        period INTEGER NOT NULL,
+        PRIMARY KEY (teacher_id, day, period)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS timetable (
+        section_id INTEGER NOT NULL,
+        session INTEGER NOT NULL,
+        day INTEGER NOT NULL,
+        period INTEGER NOT NULL,
+        venue_id INTEGER NOT NULL,
+        teacher_id INTEGER NOT NULL,
+        PRIMARY KEY (section_id, session),
+        FOREIGN KEY (section_id) REFERENCES course_sections (section_id),
+        FOREIGN KEY (venue_id) REFERENCES venues (venue_id)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_timetable_venue_slot ON timetable (venue_id, day, period)
+    ''',
+    '''
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_timetable_teacher_slot ON timetable (teacher_id, day, period)
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS course_sections_unschedule AFTER UPDATE OF teacher_id ON course_sections
+    WHEN OLD.teacher_id IS NOT NEW.teacher_id
+    BEGIN
+        DELETE FROM timetable WHERE section_id = OLD.section_id;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS course_sections_delete AFTER DELETE ON course_sections
+    BEGIN
+        DELETE FROM timetable WHERE section_id = OLD.section_id;
+    END
+    ''',
+
+    # Structured event times (see EVENT_DEFAULT_INTERVAL) and a per-venue
+    # interval index used to refuse or flag double bookings. Column entries
+    # are (table, column definition) pairs added with ALTER TABLE when missing.
+    ("events", "start_at TEXT"),
+    ("events", "end_at TEXT"),
+    '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS event_intervals USING rtree_i32 (
+        event_id, venue_min, venue_max, start_min, end_min
+    )
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS events_interval_default AFTER INSERT ON events
+    WHEN NEW.start_at IS NULL
+    BEGIN
+        {EVENT_DEFAULT_INTERVAL.format(condition="event_id = NEW.event_id")};
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS events_interval_insert AFTER INSERT ON events
+    BEGIN
+        {EVENT_INTERVAL_INDEX}
+    END
+    ''',
+    # Moving date or time alone shifts the booking and keeps its length
+    '''
+    CREATE TRIGGER IF NOT EXISTS events_interval_reschedule AFTER UPDATE OF date, time ON events
+    WHEN NEW.start_at IS OLD.start_at AND NEW.end_at IS OLD.end_at
+    BEGIN
+        UPDATE events SET
+            start_at = strftime('%Y-%m-%d %H:%M', NEW.date || ' ' || COALESCE(NULLIF(NEW.time, ''), '00:00')),
+            end_at = strftime('%Y-%m-%d %H:%M', NEW.date || ' ' || COALESCE(NULLIF(NEW.time, ''), '00:00'),
+                              '+' || COALESCE(unixepoch(OLD.end_at) - unixepoch(OLD.start_at), 7200) || ' seconds')
+        WHERE event_id = NEW.event_id;
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS events_interval_update AFTER UPDATE OF venue, start_at, end_at, status ON events
+    BEGIN
+        DELETE FROM event_intervals WHERE event_id = OLD.event_id;
+        {EVENT_INTERVAL_INDEX}
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS events_interval_delete AFTER DELETE ON events
+    BEGIN
+        DELETE FROM event_intervals WHERE event_id = OLD.event_id;
+    END
+    ''',
+    EVENT_DEFAULT_INTERVAL.format(condition="start_at IS NULL AND date IS NOT NULL"),
+
+    # Pending status transitions (EventStatusScheduler): the next start of an
+    # upcoming event and the next end of an unfinished one, as index lookups
+    '''
+    CREATE INDEX IF NOT EXISTS idx_events_upcoming_start ON events (start_at) WHERE status = 'upcoming'
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_events_open_end ON events (end_at) WHERE status IN ('upcoming', 'ongoing')
+    ''',
+
+    # Recurring events: one row per series, expanded into occurrences on read.
+    # Exceptions drop a date; overrides change one occurrence (NULL = inherit).
+    '''
+    CREATE TABLE IF NOT EXISTS event_series (
+        series_id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        description TEXT,
+        venue TEXT,
+        organizer TEXT,
+        start_date TEXT NOT NULL,
+        time TEXT,
+        duration_minutes INTEGER NOT NULL,
+        frequency TEXT NOT NULL CHECK (frequency IN ('daily', 'weekly', 'monthly')),
+        every INTEGER NOT NULL DEFAULT 1,
+        weekdays TEXT,
+        until TEXT,
+        count INTEGER,
+        status TEXT NOT NULL DEFAULT 'active'
+    )
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_event_series_start ON event_series (start_date)
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS event_series_exceptions (
+        series_id INTEGER NOT NULL,
+        occurrence_date TEXT NOT NULL,
+        PRIMARY KEY (series_id, occurrence_date),
+        FOREIGN KEY (series_id) REFERENCES event_series (series_id)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS event_series_overrides (
+        series_id INTEGER NOT NULL,
+        occurrence_date TEXT NOT NULL,
+        name TEXT,
+        description TEXT,
+        date TEXT,
+        time TEXT,
+        duration_minutes INTEGER,
+        venue TEXT,
+        organizer TEXT,
+        status TEXT,
+        PRIMARY KEY (series_id, occurrence_date),
+        FOREIGN KEY (series_id) REFERENCES event_series (series_id)
+    ) WITHOUT ROWID
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_events_date ON events (date, time)
+    ''',
+
+    # Event registrations. seats_available is decremented conditionally (see
+    # modules/write_queue.py) so concurrent registrations never oversell;
+    # NULL capacity means unlimited. Full events put students on a waitlist.
+    ("events", "capacity INTEGER"),
+    ("events", "seats_available INTEGER"),
+    '''
+    CREATE TABLE IF NOT EXISTS event_registrations (
+        registration_id INTEGER PRIMARY KEY,
+        event_id INTEGER NOT NULL,
+        student_id INTEGER NOT NULL,
+        status TEXT NOT NULL CHECK (status IN ('registered', 'waitlisted', 'cancelled')),
+        priority INTEGER NOT NULL DEFAULT 0,
+        registered_at TEXT,
+        UNIQUE (event_id, student_id),
+        FOREIGN KEY (event_id) REFERENCES events (event_id),
+        FOREIGN KEY (student_id) REFERENCES students (student_id)
+    )
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_event_registrations_student ON event_registrations (student_id, status)
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_event_waitlist ON event_registrations (event_id, priority DESC, registration_id)
+    WHERE status = 'waitlisted'
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS events_registrations_delete AFTER DELETE ON events
+    BEGIN
+        DELETE FROM event_registrations WHERE event_id = OLD.event_id;
+    END
+    ''',
+
+    # Child side of the foreign keys without an index yet. With enforcement on
+    # (see Database.connect) every parent delete looks its children up, and
+    # modules/integrity.py cascades and archives by these columns.
+    '''
+    CREATE INDEX IF NOT EXISTS idx_book_issues_student ON book_issues (student_id, status)
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_book_issues_book ON book_issues (book_id, status)
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_feedback_teacher ON feedback (teacher_id)
+    ''',
+    '''
+    CREATE INDEX IF NOT EXISTS idx_course_sections_course ON course_sections (course_id)
+    ''',
+
+    # Change-data-capture journal: one compact row per write to a journaled
+    # table, read in seq order by consumers that each keep a durable offset.
+    # AUTOINCREMENT keeps seq increasing even after compaction empties it.
+    '''
+    CREATE TABLE IF NOT EXISTS change_journal (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name TEXT NOT NULL,
+        pk INTEGER NOT NULL,
+        op TEXT NOT NULL CHECK (op IN ('I', 'U', 'D', 'A')),
+        columns TEXT
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS change_consumers (
+        consumer TEXT PRIMARY KEY,
+        last_seq INTEGER NOT NULL DEFAULT 0,
+        updated_at TEXT
+    )
+    ''',
+    *[statement for table in JOURNALED_TABLES for statement in journal_triggers(table)],
+
+    # One feedback per student, teacher and course: the unique index is the
+    # duplicate check of submit_feedback. Older databases may hold duplicates,
+    # of which the first submitted is kept.
+    '''
+    DELETE FROM feedback
+    WHERE course IS NOT NULL AND feedback_id NOT IN (
+        SELECT MIN(feedback_id) FROM feedback GROUP BY student_id, teacher_id, course
+    )
+    ''',
+    '''
+    DROP INDEX IF EXISTS idx_feedback_student_teacher_course
+    ''',
+    '''
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_feedback_student_teacher_course_unique
+        ON feedback (student_id, teacher_id, course)
+    ''',
+]
+
+# Fingerprint of the DDL above, stored in PRAGMA user_version. Startup skips
+# the CREATE statements entirely while the stored value matches.
+SCHEMA_VERSION = int(hashlib.sha1("".join(map(str, SCHEMA)).encode("utf-8")).hexdigest()[:7], 16)
+
+
+class WriteError:
+    """Falsy result of a refused write; kind is duplicate, not_found, invalid or error"""
+
+    def __init__(self, kind, message):
+        self.kind = kind
+        self.message = message
+
+    def __bool__(self):
+        return False
+
+    def __repr__(self):
+        return f"WriteError({self.kind!r}, {self.message!r})"
+
+    def report(self, prefix="Error"):
+        """Print the message the way the modules report errors, and return self"""
+        print(f"{prefix}: {self.message}")
+        return self
+
+    def to_dict(self):
+        return {"error": self.kind, "message": self.message}
+
+
+class RowStream:
+    """Rows of a query still open on its own cursor, read a batch at a time as they are sent"""
+
+    def __init__(self, columns, cursor):
+        self.columns = columns
+        self.cursor = cursor
+
+    def batches(self, size):
+        """Yield lists of up to size row dicts, closing the cursor when done or abandoned"""
+        try:
+            while True:
+                rows = self.cursor.fetchmany(size)
+                if not rows:
+                    return
+                yield [dict(zip(self.columns, row)) for row in rows]
+        finally:
+            self.cursor.close()
+
 
 class Database:
     def __init__(self, db_name="college_management.db"):
@@ -7,14 +922,19 @@ class Database:
         self.db_name = db_name
         self.conn = None
         self.cursor = None
+        # Running totals read by the instrumentation to attribute SQL cost
+        self.sql_count = 0
+        self.sql_time = 0.0
         self.connect()
         if self.conn: # Only create tables if connection was successful
-            self.create_tables()
+            self.ensure_schema()
     
     def connect(self):
         """Connect to the SQLite database"""
         try:
             self.conn = sqlite3.connect(self.db_name)
+            # Off by default in SQLite; per connection, and a no-op inside a transaction
+            self.conn.execute("PRAGMA foreign_keys = ON")
             self.cursor = self.conn.cursor()
             print(f"Connected to database: {self.db_name}")
         except sqlite3.Error as e:
@@ -31,148 +951,165 @@ class Database:
     def create_tables(self):
         """Create necessary tables if they don't exist"""
         try:
-            # Students table
-            self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS students (
-                student_id INTEGER PRIMARY KEY,
-                name TEXT NOT NULL,
-                age INTEGER,
-                gender TEXT,
-                contact TEXT,
-                email TEXT UNIQUE,
-                address TEXT,
-                course TEXT,
-                enrollment_date TEXT,
-                semester INTEGER
-            )
-            ''')
-            
-            # Administrators table
-            self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS administrators (
-                admin_id INTEGER PRIMARY KEY,
-                name TEXT NOT NULL,
-                contact TEXT,
-                email TEXT UNIQUE,
-                position TEXT,
-                department TEXT
-            )
-            ''')
-            
-            # Teachers table
-            self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS teachers (
-                teacher_id INTEGER PRIMARY KEY,
-                name TEXT NOT NULL,
-                gender TEXT,
-                contact TEXT,
-                email TEXT UNIQUE,
-                department TEXT,
-                qualification TEXT,
-                date_joined TEXT
-            )
-            ''')
-            
-            # Library table
-            self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS books (
-                book_id INTEGER PRIMARY KEY,
-                title TEXT NOT NULL,
-                author TEXT,
-                isbn TEXT UNIQUE,
-                publisher TEXT,
-                year_published INTEGER,
-                total_copies INTEGER,
-                available_copies INTEGER
-            )
-            ''')
-            
-            # Book issues table
-            self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS book_issues (
-                issue_id INTEGER PRIMARY KEY,
-                book_id INTEGER,
-                student_id INTEGER,
-                issue_date TEXT,
-                return_date TEXT,
-                actual_return_date TEXT,
-                fine_amount REAL,
-                status TEXT,
-                FOREIGN KEY (book_id) REFERENCES books (book_id),
-                FOREIGN KEY (student_id) REFERENCES students (student_id)
-            )
-            ''')
-            
-            # Events table
-            self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS events (
-                event_id INTEGER PRIMARY KEY,
-                name TEXT NOT NULL,
-                description TEXT,
-                date TEXT,
-                time TEXT,
-                venue TEXT,
-                organizer TEXT,
-                status TEXT
-            )
-            ''')
-            
-            # Feedback table
-            self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS feedback (
-                feedback_id INTEGER PRIMARY KEY,
-                student_id INTEGER,
-                teacher_id INTEGER,
-                course TEXT,
-                rating INTEGER,
-                comments TEXT,
-                date_submitted TEXT,
-                FOREIGN KEY (student_id) REFERENCES students (student_id),
-                FOREIGN KEY (teacher_id) REFERENCES teachers (teacher_id)
-            )
-            ''')
-
-            # Courses table
-            self.cursor.execute('''
-            create table if not exists courses (
-                                course_id INTEGER PRIMARY KEY,
-                                title text,
-                                description text,
-                                duration text
-            )
-            
-
-            ''')
-            
+            self.add_autoincrement()
+            for statement in SCHEMA:
+                if isinstance(statement, tuple):
+                    self.add_column(*statement)
+                else:
+                    self.cursor.execute(statement)
+            self.cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
             self.conn.commit()
             print("All tables created successfully.")
         except sqlite3.Error as e:
             print(f"Error creating tables: {e}")
+
+    def add_autoincrement(self):
+        """Rebuild tables created before their keys were AUTOINCREMENT; the schema loop recreates indexes and triggers"""
+        for table, key in AUTOINCREMENT_KEYS.items():
+            row = self.cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                      (table,)).fetchone()
+            if not row or "AUTOINCREMENT" in row[0].upper():
+                continue
+            ddl = re.sub(rf"\b{key}\s+INTEGER\s+PRIMARY\s+KEY", f"{key} INTEGER PRIMARY KEY AUTOINCREMENT",
+                         row[0], count=1, flags=re.IGNORECASE)
+            ddl = re.sub(r"^CREATE\s+TABLE\s+\S+", f"CREATE TABLE {table}_rebuild", ddl, count=1,
+                         flags=re.IGNORECASE)
+            self.conn.commit()
+            # Dropping the old table must not cascade to, or be refused by, its children
+            self.conn.execute("PRAGMA foreign_keys = OFF")
+            self.conn.execute("PRAGMA legacy_alter_table = ON")
+            try:
+                with self.transaction() as cursor:
+                    cursor.execute("BEGIN IMMEDIATE")
+                    cursor.execute(ddl)
+                    cursor.execute(f"INSERT INTO {table}_rebuild SELECT * FROM {table}")
+                    cursor.execute(f"DROP TABLE {table}")
+                    cursor.execute(f"ALTER TABLE {table}_rebuild RENAME TO {table}")
+            finally:
+                self.conn.execute("PRAGMA legacy_alter_table = OFF")
+                self.conn.execute("PRAGMA foreign_keys = ON")
+            print(f"Rebuilt {table} with AUTOINCREMENT ids.")
+
+    def add_column(self, table, definition):
+        """ALTER TABLE ADD COLUMN unless the table already has that column"""
+        column = definition.split()[0]
+        existing = {row[1] for row in self.cursor.execute(f"PRAGMA table_info({table})")}
+        if column not in existing:
+            self.cursor.execute(f"ALTER TABLE {table} ADD COLUMN {definition}")
+
+    def ensure_schema(self):
+        """Run the schema DDL only when the stored fingerprint is out of date"""
+        try:
+            stored = self.cursor.execute("PRAGMA user_version").fetchone()[0]
+        except sqlite3.Error as e:
+            print(f"Error reading schema version: {e}")
+            stored = None
+        if stored != SCHEMA_VERSION:
+            self.create_tables()
     
+    def _execute(self, query, parameters=()):
+        """Run one statement on the shared cursor, keeping the SQL counters"""
+        started = time.perf_counter()
+        try:
+            return self.cursor.execute(query, parameters)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.sql_count += 1
+            self.sql_time += elapsed
+            DB_QUERY_SECONDS.observe(elapsed)
+
     def execute_query(self, query, parameters=()):
         """Execute a query with optional parameters"""
         try:
-            self.cursor.execute(query, parameters)
+            self._execute(query, parameters)
             self.conn.commit()
             return True
         except sqlite3.Error as e:
+            DB_ERRORS.labels("execute").inc()
             print(f"Query execution error: {e}")
             return False
     
+    def execute_returning(self, query, parameters=()):
+        """Execute one write with a RETURNING clause and commit it.
+
+        Returns the first returned row as a dict, None when the statement
+        wrote nothing (no row matched, or ON CONFLICT DO NOTHING skipped it),
+        or a WriteError when a constraint or SQLite refused the write; a
+        failed foreign key means a referenced row does not exist.
+        """
+        try:
+            self._execute(query, parameters)
+            rows = self.cursor.fetchall()
+            columns = [column[0] for column in self.cursor.description]
+            self.conn.commit()
+        except sqlite3.IntegrityError as e:
+            self.conn.rollback()
+            DB_ERRORS.labels("execute").inc()
+            kind = ("duplicate" if str(e).startswith("UNIQUE")
+                    else "not_found" if str(e).startswith("FOREIGN KEY") else "invalid")
+            return WriteError(kind, str(e)).report("Write rejected")
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            DB_ERRORS.labels("execute").inc()
+            return WriteError("error", str(e)).report("Query execution error")
+        return dict(zip(columns, rows[0])) if rows else None
+
+    def execute_many(self, query, seq_of_parameters):
+        """Execute a query for every parameter set and commit once"""
+        started = time.perf_counter()
+        try:
+            self.cursor.executemany(query, seq_of_parameters)
+            self.conn.commit()
+            return True
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            DB_ERRORS.labels("execute_many").inc()
+            print(f"Query execution error: {e}")
+            return False
+        finally:
+            elapsed = time.perf_counter() - started
+            self.sql_count += 1
+            self.sql_time += elapsed
+            DB_QUERY_SECONDS.observe(elapsed)
+
+    @contextmanager
+    def transaction(self):
+        """Group several statements into one transaction, rolling back on error"""
+        try:
+            yield self.cursor
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+
     def fetch_all(self, query, parameters=()):
         """Execute a query and fetch all results"""
         try:
-            self.cursor.execute(query, parameters)
+            self._execute(query, parameters)
             return self.cursor.fetchall()
         except sqlite3.Error as e:
+            DB_ERRORS.labels("fetch_all").inc()
             print(f"Fetch error: {e}")
             return []
     
+    def stream(self, columns, query, parameters=()):
+        """Execute a query on a cursor of its own and return a RowStream over it, not the fetched rows"""
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(query, parameters)
+        except sqlite3.Error as e:
+            cursor.close()
+            DB_ERRORS.labels("fetch_all").inc()
+            print(f"Fetch error: {e}")
+            return []
+        return RowStream(columns, cursor)
+
     def fetch_one(self, query, parameters=()):
         """Execute a query and fetch one result"""
         try:
-            self.cursor.execute(query, parameters)
+            self._execute(query, parameters)
             return self.cursor.fetchone()
         except sqlite3.Error as e:
+            DB_ERRORS.labels("fetch_one").inc()
             print(f"Fetch error: {e}")
             return None
\ No newline at end of file
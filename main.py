@@ -1,13 +1,11 @@
+import os
+
 from modules.college import College
-from database import Database
+from modules.metrics import MetricsFileExporter
 
-if __name__ == "__main__":
-    college = College()
-    db = Database()
-    db.connect()
-    db.create_tables()
-    db.close()
 
+def run_menu(college):
+    """Run the interactive main menu until the user exits"""
     while True:
         try:
             print("\n" + "="*60)
@@ -52,4 +50,13 @@ if __name__ == "__main__":
             else:
                 print("❌ Invalid choice. Please try again.")
         except Exception as e:
-            print(f"\n⚠️  An error occurred: {e}\nReturning to main menu...")
\ No newline at end of file
+            print(f"\n⚠️  An error occurred: {e}\nReturning to main menu...")
+
+if __name__ == "__main__":
+    college = College()
+    # CMS_METRICS_FILE=metrics.prom exposes this session's metrics to a file scraper
+    metrics_file = os.environ.get("CMS_METRICS_FILE")
+    exporter = MetricsFileExporter(metrics_file).start() if metrics_file else None
+    run_menu(college)
+    if exporter:
+        exporter.stop()
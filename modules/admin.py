@@ -1,4 +1,4 @@
-from database import Database
+from database import Database, WriteError
 
 class Administrator:
     def __init__(self, db):
@@ -6,66 +6,58 @@ class Administrator:
         self.db = db
     
     def add_admin(self, name, contact, email, position, department):
-        """Add a new administrator to the database"""
-        # Check if email already exists
-        exists = self.db.fetch_one("SELECT email FROM administrators WHERE email = ?", (email,))
-        if exists:
-            print(f"Error: Administrator with email {email} already exists.")
-            return False
-        
+        """Add a new administrator; returns the created record, or a WriteError if the email is taken"""
+        # The UNIQUE email constraint is the duplicate check
         query = """
         INSERT INTO administrators (name, contact, email, position, department)
         VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (email) DO NOTHING
+        RETURNING *
         """
         params = (name, contact, email, position, department)
         
-        if self.db.execute_query(query, params):
+        admin = self.db.execute_returning(query, params)
+        if admin is None:
+            return WriteError("duplicate", f"Administrator with email {email} already exists.").report()
+        if admin:
             print(f"Administrator {name} added successfully.")
-            return True
-        return False
+        return admin
     
     def update_admin(self, admin_id, **kwargs):
-        """Update administrator information"""
+        """Update administrator information; returns the updated record or a WriteError"""
         valid_fields = ['name', 'contact', 'email', 'position', 'department']
         
         # Filter out invalid fields
         updates = {k: v for k, v in kwargs.items() if k in valid_fields and v is not None}
         
         if not updates:
-            print("No valid fields to update.")
-            return False
-
-        # Check if admin_id exists before trying to update
-        check_exists = self.db.fetch_one("SELECT admin_id FROM administrators WHERE admin_id = ?", (admin_id,))
-        if not check_exists:
-            print(f"Error: Administrator with ID {admin_id} does not exist. Cannot update.")
-            return False
+            return WriteError("invalid", "No valid fields to update.").report()
         
-        # Construct update query
+        # Construct update query; no matching row means the administrator does not exist
         set_clause = ", ".join([f"{field} = ?" for field in updates.keys()])
-        query = f"UPDATE administrators SET {set_clause} WHERE admin_id = ?"
+        query = f"UPDATE administrators SET {set_clause} WHERE admin_id = ? RETURNING *"
         
         # Parameters for the query
         params = list(updates.values()) + [admin_id]
         
-        if self.db.execute_query(query, tuple(params)):
+        admin = self.db.execute_returning(query, tuple(params))
+        if admin is None:
+            message = f"Administrator with ID {admin_id} does not exist. Cannot update."
+            return WriteError("not_found", message).report()
+        if admin:
             print(f"Administrator ID {admin_id} updated successfully.")
-            return True
-        return False
+        return admin
     
     def delete_admin(self, admin_id):
         """Delete an administrator from the database"""
-        # Check if admin exists
-        exists = self.db.fetch_one("SELECT admin_id FROM administrators WHERE admin_id = ?", (admin_id,))
-        if not exists:
-            print(f"Error: Administrator with ID {admin_id} does not exist.")
-            return False
-        
-        query = "DELETE FROM administrators WHERE admin_id = ?"
-        if self.db.execute_query(query, (admin_id,)):
+        deleted = self.db.execute_returning("DELETE FROM administrators WHERE admin_id = ? RETURNING admin_id",
+                                            (admin_id,))
+        if deleted is None:
+            return WriteError("not_found", f"Administrator with ID {admin_id} does not exist.").report()
+        if deleted:
             print(f"Administrator ID {admin_id} deleted successfully.")
             return True
-        return False
+        return deleted
     
     def get_admin(self, admin_id):
         """Get administrator details by ID"""
@@ -1,6 +1,8 @@
 import sqlite3
-from ollama import chat
-from ollama import ChatResponse
+import time
+
+from modules.metrics import AI_REQUESTS, AI_SECONDS
+
 
 def get_all_data_from_db(db_path: str) -> str:
     conn = sqlite3.connect(db_path)
@@ -61,35 +63,46 @@ def get_all_data_from_db(db_path: str) -> str:
 
 
 def generateResponse(prompt: str) -> str:
-    # Extract all DB data as context
-    context = get_all_data_from_db('college_management.db')
-
-    # Stream the response from Ollama
-    stream = chat(
-        model="llama3.2",
-        messages=[
-            {
-                'role': 'system',
-                'content': """You are an administrator of a college named "Caset College of Computer Science". 
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        # Imported here so that loading this module (e.g. for context building)
+        # does not pay for the ollama client
+        from ollama import chat
+
+        # Extract all DB data as context
+        context = get_all_data_from_db('college_management.db')
+
+        # Stream the response from Ollama
+        stream = chat(
+            model="llama3.2",
+            messages=[
+                {
+                    'role': 'system',
+                    'content': """You are an administrator of a college named "Caset College of Computer Science". 
                 Answer the questions that are related to the college and the given context. 
                 If anyone asks anything beyond the college database just say "I am not authorized to talk beyond the college." Don't mention any technical details in the response. """
-            },
-            {
-                'role': 'user',
-                'content': f'Here is all the data from the sqlite database:\n{context}'
-            },
-            {
-                'role': 'user',
-                'content': prompt
-            }
-        ],
-        stream=True
-    )
-
-    response_text = ""
-    for chunk in stream:
-        content = chunk.get('message', {}).get('content', '')
-        print(content, end='', flush=True)  # Stream to CLI
-        response_text += content
-    print()  # Newline after streaming
-    return response_text
\ No newline at end of file
+                },
+                {
+                    'role': 'user',
+                    'content': f'Here is all the data from the sqlite database:\n{context}'
+                },
+                {
+                    'role': 'user',
+                    'content': prompt
+                }
+            ],
+            stream=True
+        )
+
+        response_text = ""
+        for chunk in stream:
+            content = chunk.get('message', {}).get('content', '')
+            print(content, end='', flush=True)  # Stream to CLI
+            response_text += content
+        print()  # Newline after streaming
+        outcome = "ok"
+        return response_text
+    finally:
+        AI_REQUESTS.labels(outcome).inc()
+        AI_SECONDS.observe(time.perf_counter() - started)
@@ -1,8 +1,15 @@
 from database import Database
+from modules.archive import tiered
+from modules.events import Event
+from modules.rollups import Rollups
+import datetime
+import heapq
 
 class Analytics:
     def __init__(self, db_name="college_management.db"):
         self.db = db_name
+        self.rollups = Rollups(db_name)
+        self.events = Event(db_name)
         print("Analytics module initialized.")
 
     def get_total_students(self):
@@ -11,8 +18,15 @@ class Analytics:
         return result[0] if result else 0
 
     def get_students_by_course(self):
-        """Queries the students table and groups by the course column."""
-        results = self.db.fetch_all("SELECT course, COUNT(*) FROM students GROUP BY course")
+        """Counts active enrollments per course title."""
+        results = self.db.fetch_all("""
+            SELECT c.title, COUNT(*)
+            FROM enrollments e
+            JOIN courses c ON c.course_id = e.course_id
+            WHERE e.status = 'active'
+            GROUP BY e.course_id
+            ORDER BY c.title
+        """)
         return {course: count for course, count in results} if results else {}
 
     def get_students_by_gender(self):
@@ -20,10 +34,24 @@ class Analytics:
         results = self.db.fetch_all("SELECT gender, COUNT(*) FROM students GROUP BY gender")
         return {gender: count for gender, count in results} if results else {}
 
-    def get_student_enrollment_trends(self):
-        """Queries the students table and groups by enrollment year-month."""
-        results = self.db.fetch_all("SELECT SUBSTR(enrollment_date, 1, 7), COUNT(*) FROM students GROUP BY SUBSTR(enrollment_date, 1, 7) ORDER BY SUBSTR(enrollment_date, 1, 7)")
-        return {period: count for period, count in results} if results else {}
+    def get_student_enrollment_trends(self, grain="month"):
+        """Reads enrollments per period (day, week, month or semester) from the rollups."""
+        results = self.rollups.get_series("enrollments", grain)
+        return {period: count for period, count, _ in results} if results else {}
+
+    def get_feedback_trends(self, grain="month"):
+        """Reads feedback count and average rating per period from the rollups."""
+        results = self.rollups.get_series("feedback", grain)
+        return {period: {"count": count, "average_rating": round(total / count, 2)}
+                for period, count, total in results} if results else {}
+
+    def get_book_circulation_trends(self, grain="month"):
+        """Reads books issued and returned per period from the rollups."""
+        trends = {}
+        for metric, key in (("book_issues", "issued"), ("book_returns", "returned")):
+            for period, count, _ in self.rollups.get_series(metric, grain):
+                trends.setdefault(period, {"issued": 0, "returned": 0})[key] = count
+        return dict(sorted(trends.items()))
 
     def get_total_courses(self):
         """Queries the courses table to count the total number of courses."""
@@ -31,9 +59,15 @@ class Analytics:
         return result[0] if result else 0
 
     def get_course_popularity(self):
-        """Queries the students table to count students per course."""
-        # This method reuses the logic from get_students_by_course
-        results = self.db.fetch_all("SELECT course, COUNT(*) FROM students GROUP BY course")
+        """Counts active enrollments per course, most popular first."""
+        results = self.db.fetch_all("""
+            SELECT c.title, COUNT(*) AS enrolled
+            FROM enrollments e
+            JOIN courses c ON c.course_id = e.course_id
+            WHERE e.status = 'active'
+            GROUP BY e.course_id
+            ORDER BY enrolled DESC, c.title
+        """)
         return {course: count for course, count in results} if results else {}
 
     def get_total_teachers(self):
@@ -56,11 +90,11 @@ class Analytics:
         result = self.db.fetch_one("SELECT COUNT(*) FROM book_issues WHERE status = 'Issued'")
         return result[0] if result else 0
 
-    def get_most_borrowed_books(self, limit=5):
+    def get_most_borrowed_books(self, limit=5, include_archived=False):
         """Queries book_issues and books tables for most borrowed books."""
-        query = """
+        query = f"""
             SELECT b.title, COUNT(bi.book_id) AS borrow_count
-            FROM book_issues bi
+            FROM {tiered(self.db, "book_issues", include_archived)} bi
             JOIN books b ON bi.book_id = b.book_id
             GROUP BY bi.book_id, b.title
             ORDER BY borrow_count DESC
@@ -69,32 +103,67 @@ class Analytics:
         results = self.db.fetch_all(query, (limit,))
         return results if results else []
 
-    def get_total_events(self):
+    def get_total_events(self, include_archived=False):
         """Queries the events table to count the total number of events."""
-        result = self.db.fetch_one("SELECT COUNT(*) FROM events")
+        result = self.db.fetch_one(f"SELECT COUNT(*) FROM {tiered(self.db, 'events', include_archived)}")
         return result[0] if result else 0
 
     def get_upcoming_events(self):
-        """Queries the events table for upcoming events."""
+        """Upcoming events by date, with recurring series expanded up to their horizon."""
         query = "SELECT name, date, venue FROM events WHERE date >= date('now') ORDER BY date ASC"
         results = self.db.fetch_all(query)
-        return results if results else []
+        occurrences = ((event['name'], event['date'], event['venue'])
+                       for event in self.events.iter_occurrences(datetime.date.today().isoformat()))
+        return list(heapq.merge(results, occurrences, key=lambda event: event[1]))
 
     def get_average_feedback_rating_by_course(self):
-        """Queries the feedback table for average rating by course."""
-        query = "SELECT course, AVG(rating) FROM feedback GROUP BY course"
+        """Reads the average rating by course from the running rating aggregates."""
+        query = "SELECT course, total * 1.0 / n FROM course_rating_stats WHERE n > 0"
         results = self.db.fetch_all(query)
-        # Filter out courses where AVG(rating) might be None
-        return {course: avg_rating for course, avg_rating in results if avg_rating is not None} if results else {}
+        return {course: avg_rating for course, avg_rating in results} if results else {}
 
     def get_average_feedback_rating_by_teacher(self):
-        """Queries feedback and teachers tables for average rating by teacher."""
+        """Reads the average rating by teacher from the running rating aggregates."""
         query = """
-            SELECT t.name, AVG(f.rating)
-            FROM feedback f
-            JOIN teachers t ON f.teacher_id = t.teacher_id
-            GROUP BY t.teacher_id, t.name
+            SELECT t.name, s.total * 1.0 / s.n
+            FROM teacher_rating_stats s
+            JOIN teachers t ON s.teacher_id = t.teacher_id
+            WHERE s.n > 0
         """
         results = self.db.fetch_all(query)
-        # Filter out teachers where AVG(rating) might be None
-        return {name: avg_rating for name, avg_rating in results if avg_rating is not None} if results else {}
+        return {name: avg_rating for name, avg_rating in results} if results else {}
+
+    def get_teacher_rankings(self, limit=10, prior_weight=None):
+        """Ranks teachers by Bayesian-adjusted average rating."""
+        query = """
+            WITH prior AS (
+                SELECT SUM(total) * 1.0 / SUM(n) AS mean, COALESCE(?, AVG(n)) AS weight
+                FROM teacher_rating_stats WHERE n > 0
+            )
+            SELECT s.teacher_id, t.name, s.n, ROUND(s.total * 1.0 / s.n, 2),
+                   ROUND((prior.weight * prior.mean + s.total) / (prior.weight + s.n), 4) AS score
+            FROM teacher_rating_stats s
+            JOIN teachers t ON s.teacher_id = t.teacher_id, prior
+            WHERE s.n > 0
+            ORDER BY score DESC, s.n DESC
+            LIMIT ?
+        """
+        results = self.db.fetch_all(query, (prior_weight, limit))
+        return results if results else []
+
+    def get_course_rankings(self, limit=10, prior_weight=None):
+        """Ranks courses by Bayesian-adjusted average rating."""
+        query = """
+            WITH prior AS (
+                SELECT SUM(total) * 1.0 / SUM(n) AS mean, COALESCE(?, AVG(n)) AS weight
+                FROM course_rating_stats WHERE n > 0
+            )
+            SELECT s.course, s.n, ROUND(s.total * 1.0 / s.n, 2),
+                   ROUND((prior.weight * prior.mean + s.total) / (prior.weight + s.n), 4) AS score
+            FROM course_rating_stats s, prior
+            WHERE s.n > 0
+            ORDER BY score DESC, s.n DESC
+            LIMIT ?
+        """
+        results = self.db.fetch_all(query, (prior_weight, limit))
+        return results if results else []
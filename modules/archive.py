@@ -0,0 +1,200 @@
+import datetime
+import os
+import sqlite3
+import time
+
+ARCHIVE_SCHEMA = "archive"
+ARCHIVING_KEY = "archiving"
+DEFAULT_BATCH_SIZE = 5000
+
+# table -> (primary key, condition for a closed row older than :cutoff, default retention in days)
+POLICIES = {
+    "book_issues": ("issue_id", "status = 'returned' AND actual_return_date < :cutoff", 365),
+    "events": ("event_id", "status IN ('completed', 'cancelled') AND date < :cutoff", 365),
+    "feedback": ("feedback_id", "date_submitted < :cutoff", 730),
+}
+# Rows that leave with their parent: table -> [(child table, foreign key)]
+DEPENDENTS = {
+    "events": [("event_registrations", "event_id")],
+    "feedback": [("feedback_tags", "feedback_id"), ("feedback_topics", "feedback_id")],
+}
+ARCHIVED_TABLES = list(POLICIES) + [child for children in DEPENDENTS.values() for child, _ in children]
+# Lookups the include_archived queries make against the archive tier
+ARCHIVE_INDEXES = {
+    "book_issues": ["student_id", "book_id"],
+    "events": ["date"],
+    "feedback": ["teacher_id", "student_id", "course"],
+    "event_registrations": ["event_id", "student_id"],
+    "feedback_tags": ["feedback_id"],
+    "feedback_topics": ["feedback_id"],
+}
+
+
+def archive_path(db_name):
+    """The archive database kept next to the main one: college_management_archive.db"""
+    root, ext = os.path.splitext(db_name)
+    return f"{root}_archive{ext or '.db'}"
+
+
+def attach_archive(db, create=False):
+    """ATTACH the archive tier to this connection; without create, only if the file exists"""
+    attached = {row[1] for row in db.conn.execute("PRAGMA database_list")}
+    if ARCHIVE_SCHEMA in attached:
+        return True
+    path = archive_path(db.db_name)
+    if db.db_name == ":memory:" or (not create and not os.path.exists(path)):
+        return False
+    db.conn.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (path,))
+    for table in ARCHIVED_TABLES:
+        _sync_table(db.conn, table)
+    _reserve_archived_ids(db.conn)
+    return True
+
+
+def tiered(db, table, include_archived=False):
+    """FROM-clause source for table: the hot table, or hot and archived rows together"""
+    if not include_archived or table not in ARCHIVED_TABLES or not attach_archive(db):
+        return table
+    columns = ", ".join(_columns(db.conn, "main", table))
+    return (f"(SELECT {columns} FROM main.{table} "
+            f"UNION ALL SELECT {columns} FROM {ARCHIVE_SCHEMA}.{table})")
+
+
+def prepare_archive(db):
+    """Attach the archive (creating it) and bring the rollups up to date; call outside a transaction.
+
+    Rows past the rollup watermarks are folded in first: archived rows must
+    already be counted, as their deletes are not logged.
+    """
+    from modules.rollups import Rollups  # rollups reads through tiered()
+    attach_archive(db, create=True)
+    return Rollups(db).refresh() is not None
+
+
+def move_rows(db, cursor, table, condition, params=()):
+    """Move the rows of table matching condition, and their dependents, to the archive; returns the row count.
+
+    Runs inside the caller's transaction, with the archiving flag set so
+    aggregate triggers keep counting the rows and the journal records 'A'.
+    """
+    _sync_table(db.conn, table)
+    cursor.execute("INSERT OR REPLACE INTO system_state (key, value) VALUES (?, '1')", (ARCHIVING_KEY,))
+    for child, foreign_key in DEPENDENTS.get(table, []):
+        _sync_table(db.conn, child)
+        key = POLICIES[table][0]
+        child_columns = ", ".join(_columns(db.conn, "main", child))
+        parents = f"SELECT {key} FROM main.{table} WHERE {condition}"
+        cursor.execute(f"""
+            INSERT INTO {ARCHIVE_SCHEMA}.{child} ({child_columns})
+            SELECT {child_columns} FROM main.{child} WHERE {foreign_key} IN ({parents})
+        """, params)
+        cursor.execute(f"DELETE FROM main.{child} WHERE {foreign_key} IN ({parents})", params)
+    columns = ", ".join(_columns(db.conn, "main", table))
+    cursor.execute(f"""
+        INSERT INTO {ARCHIVE_SCHEMA}.{table} ({columns})
+        SELECT {columns} FROM main.{table} WHERE {condition}
+    """, params)
+    cursor.execute(f"DELETE FROM main.{table} WHERE {condition}", params)
+    moved = cursor.rowcount
+    cursor.execute("DELETE FROM system_state WHERE key = ?", (ARCHIVING_KEY,))
+    return moved
+
+
+def _columns(conn, schema, table):
+    return [row[1] for row in conn.execute(f"PRAGMA {schema}.table_info({table})")]
+
+
+def _reserve_archived_ids(conn):
+    """Raise each AUTOINCREMENT sequence past the archived ids, for rows archived before the keys were AUTOINCREMENT"""
+    for table, (key, _, _) in POLICIES.items():
+        archived = conn.execute(f"SELECT MAX({key}) FROM {ARCHIVE_SCHEMA}.{table}").fetchone()[0]
+        row = conn.execute("SELECT seq FROM main.sqlite_sequence WHERE name = ?", (table,)).fetchone()
+        if archived is None or (row and row[0] >= archived):
+            continue
+        # Inside a caller's transaction the change commits with it
+        standalone = not conn.in_transaction
+        if row:
+            conn.execute("UPDATE main.sqlite_sequence SET seq = ? WHERE name = ?", (archived, table))
+        else:
+            conn.execute("INSERT INTO main.sqlite_sequence (name, seq) VALUES (?, ?)", (table, archived))
+        if standalone:
+            conn.commit()
+
+
+def _sync_table(conn, table):
+    """Create the archive copy of a table (no constraints) and add columns the hot table gained since"""
+    hot = _columns(conn, "main", table)
+    archived = _columns(conn, ARCHIVE_SCHEMA, table)
+    if not archived:
+        # CREATE TABLE AS copies no constraints: archived rows never block deletes
+        conn.execute(f"CREATE TABLE {ARCHIVE_SCHEMA}.{table} AS SELECT * FROM main.{table} WHERE 0")
+        for column in ARCHIVE_INDEXES.get(table, []):
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {ARCHIVE_SCHEMA}.idx_{table}_{column} "
+                         f"ON {table} ({column})")
+        return
+    types = {row[1]: row[2] for row in conn.execute(f"PRAGMA main.table_info({table})")}
+    for column in hot:
+        if column not in archived:
+            conn.execute(f"ALTER TABLE {ARCHIVE_SCHEMA}.{table} ADD COLUMN {column} {types[column]}")
+
+
+class Archiver:
+    def __init__(self, db):
+        """Initialize Archiver class with database connection"""
+        self.db = db
+
+    def archive(self, tables=None, retention_days=None, batch_size=DEFAULT_BATCH_SIZE, as_of=None):
+        """Move closed rows older than the retention window into the archive database, batch by batch"""
+        tables = tables or list(POLICIES)
+        unknown = [table for table in tables if table not in POLICIES]
+        if unknown:
+            print(f"Error: Cannot archive {', '.join(unknown)}.")
+            return None
+        started = time.perf_counter()
+        today = datetime.date.fromisoformat(as_of) if as_of else datetime.date.today()
+        try:
+            if not prepare_archive(self.db):
+                return None
+            moved = {}
+            for table in tables:
+                key, condition, default_days = POLICIES[table]
+                days = retention_days if retention_days is not None else default_days
+                cutoff = (today - datetime.timedelta(days=days)).isoformat()
+                moved[table] = self._archive_table(table, key, condition, cutoff, batch_size)
+        except sqlite3.Error as e:
+            print(f"Error archiving: {e}")
+            return None
+        seconds = round(time.perf_counter() - started, 2)
+        print(f"Archived {sum(moved.values())} rows in {seconds}s.")
+        return {"moved": moved, "seconds": seconds}
+
+    def get_counts(self):
+        """Hot and archived row counts per archivable table"""
+        has_archive = attach_archive(self.db)
+        counts = {}
+        for table in POLICIES:
+            hot = self.db.fetch_one(f"SELECT COUNT(*) FROM main.{table}")
+            archived = self.db.fetch_one(f"SELECT COUNT(*) FROM {ARCHIVE_SCHEMA}.{table}") if has_archive else None
+            counts[table] = {"hot": hot[0] if hot else 0, "archived": archived[0] if archived else 0}
+        return counts
+
+    def _archive_table(self, table, key, condition, cutoff, batch_size):
+        """Copy and delete one batch per transaction so writers are never blocked for long"""
+        moved = 0
+        self.db.cursor.execute("CREATE TEMP TABLE IF NOT EXISTS archive_batch (id INTEGER PRIMARY KEY)")
+        while True:
+            with self.db.transaction() as cursor:
+                cursor.execute("BEGIN IMMEDIATE")
+                cursor.execute("DELETE FROM archive_batch")
+                cursor.execute(f"""
+                    INSERT INTO archive_batch (id)
+                    SELECT {key} FROM main.{table} WHERE {condition} ORDER BY {key} LIMIT :limit
+                """, {"cutoff": cutoff, "limit": batch_size})
+                count = cursor.rowcount
+                if count <= 0:
+                    break
+                move_rows(self.db, cursor, table, f"{key} IN (SELECT id FROM archive_batch)")
+            moved += count
+            if count < batch_size:
+                break
+        return moved
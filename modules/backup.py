@@ -0,0 +1,299 @@
+import datetime
+import gzip
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from database import Database
+from modules.archive import ARCHIVE_SCHEMA, archive_path
+from modules.metrics import BACKUPS, BACKUP_BYTES_PER_SECOND, BACKUP_LONGEST_STEP
+
+# Pages copied per backup step. The source is only read-locked for the
+# duration of one step, so writers wait at most that long.
+DEFAULT_STEP_PAGES = 256
+# Outside WAL mode a write from another connection restarts the copy; after
+# this many restarts the rest is copied in one step instead
+MAX_RESTARTS = 3
+DEFAULT_KEEP = 7
+# Snapshots favour speed over ratio; level 1 still shrinks the file several times
+COMPRESS_LEVEL = 1
+SNAPSHOT_TIME_FORMAT = "%Y%m%d-%H%M%S"
+
+
+def integrity_check(path):
+    """PRAGMA integrity_check on a database file; returns 'ok' or the problems found"""
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        return "; ".join(row[0] for row in conn.execute("PRAGMA integrity_check"))
+    finally:
+        conn.close()
+
+
+def paired_path(path):
+    """Where the archive tier of a backup at path is kept: college-1_archive.db(.gz) next to college-1.db(.gz)"""
+    if path.endswith(".gz"):
+        return archive_path(path[:-3]) + ".gz"
+    return archive_path(path)
+
+
+@contextmanager
+def uncompressed(path):
+    """Yield a plain database file for a backup, decompressing .gz copies next to it"""
+    if not path.endswith(".gz"):
+        yield path
+        return
+    plain = f"{path[:-3]}.{os.getpid()}.tmp"
+    try:
+        with gzip.open(path, "rb") as source, open(plain, "wb") as out:
+            shutil.copyfileobj(source, out, 1024 * 1024)
+        yield plain
+    finally:
+        if os.path.exists(plain):
+            os.remove(plain)
+
+
+class BackupRestarted(Exception):
+    """Raised from the progress callback to stop a copy that keeps restarting"""
+
+
+class BackupManager:
+    def __init__(self, db, directory=None):
+        """Initialize BackupManager class with database connection"""
+        self.db = db
+        self.directory = directory or os.path.join(os.path.dirname(os.path.abspath(db.db_name)), "backups")
+        self.stem = os.path.splitext(os.path.basename(db.db_name))[0]
+
+    def backup(self, path, step_pages=DEFAULT_STEP_PAGES, compress=False, verify=True):
+        """Copy the live database to path a few pages at a time, without stopping readers or writers.
+
+        The archive tier, when there is one, is copied from the same snapshot
+        to paired_path(path); both files are verified before either replaces
+        an earlier backup.
+        """
+        steps = []
+        restarts = 0
+        started = last = time.perf_counter()
+        left = None
+        copy_restarts = 0
+
+        def progress(status, remaining, total):
+            nonlocal last, left, restarts, copy_restarts
+            now = time.perf_counter()
+            steps.append(now - last)
+            last = now
+            if left is not None and remaining > left:
+                restarts += 1
+                copy_restarts += 1
+                if copy_restarts > MAX_RESTARTS:
+                    raise BackupRestarted()
+            left = remaining
+
+        copies = []
+        try:
+            source = self._source()
+            try:
+                for schema, target_path in self._copies(source, path):
+                    copies.append({"schema": schema, "partial": target_path + ".partial", "path": target_path})
+                    left, copy_restarts = None, 0
+                    target = sqlite3.connect(copies[-1]["partial"])
+                    try:
+                        last = time.perf_counter()
+                        try:
+                            source.backup(target, pages=step_pages, progress=progress, name=schema)
+                        except BackupRestarted:
+                            last = time.perf_counter()
+                            source.backup(target, progress=progress, name=schema)
+                        # A copy of a WAL database is in WAL mode too; a single file leaves no -wal/-shm behind
+                        target.execute("PRAGMA journal_mode = DELETE").fetchone()
+                    finally:
+                        target.close()
+            finally:
+                if source is not self.db.conn:
+                    source.close()
+            seconds = time.perf_counter() - started
+            for copy in copies:
+                copy["integrity"] = integrity_check(copy["partial"]) if verify else None
+                if copy["integrity"] not in (None, "ok"):
+                    raise sqlite3.DatabaseError(f"integrity check of {copy['schema']} failed: {copy['integrity']}")
+                copy["bytes"] = os.path.getsize(copy["partial"])
+                if compress:
+                    copy["path"] += "" if copy["path"].endswith(".gz") else ".gz"
+                    with open(copy["partial"], "rb") as plain, \
+                            gzip.open(copy["path"] + ".partial", "wb", COMPRESS_LEVEL) as out:
+                        shutil.copyfileobj(plain, out, 1024 * 1024)
+                    os.remove(copy["partial"])
+                    copy["partial"] = copy["path"] + ".partial"
+            # The archive copy is put in place first: a main copy is never left without its pair
+            for copy in reversed(copies):
+                os.replace(copy["partial"], copy["path"])
+        except (sqlite3.Error, OSError) as e:
+            BACKUPS.labels("error").inc()
+            print(f"Error backing up database: {e}")
+            for copy in copies:
+                if os.path.exists(copy["partial"]):
+                    os.remove(copy["partial"])
+            return None
+
+        main, archive = copies[0], (copies[1] if len(copies) > 1 else None)
+        size = sum(copy["bytes"] for copy in copies)
+        longest = max(steps, default=0.0)
+        BACKUPS.labels("ok").inc()
+        BACKUP_BYTES_PER_SECOND.set(size / seconds if seconds else 0)
+        BACKUP_LONGEST_STEP.set(longest)
+        print(f"Backed up {size // 1024} KB to {main['path']}" + (f" and {archive['path']}." if archive else "."))
+        return {
+            "path": main["path"],
+            "bytes": main["bytes"],
+            "stored_bytes": os.path.getsize(main["path"]),
+            "archive": {"path": archive["path"], "bytes": archive["bytes"],
+                        "stored_bytes": os.path.getsize(archive["path"]),
+                        "integrity": archive["integrity"]} if archive else None,
+            "steps": len(steps),
+            "restarts": restarts,
+            "seconds": round(seconds, 3),
+            "mb_per_second": round(size / seconds / 1e6, 1) if seconds else None,
+            "longest_step_ms": round(longest * 1000, 2),
+            "integrity": main["integrity"],
+            "total_seconds": round(time.perf_counter() - started, 3),
+        }
+
+    def _copies(self, source, path):
+        """(schema, target path) for each database the backup copies: main, then the archive if attached"""
+        yield "main", path
+        if ARCHIVE_SCHEMA in {row[1] for row in source.execute("PRAGMA database_list")}:
+            yield ARCHIVE_SCHEMA, paired_path(path)
+
+    def _source(self):
+        """Connection the copy is read from, pinned to one snapshot when the database is in WAL mode"""
+        if self.db.db_name == ":memory:":
+            return self.db.conn
+        source = sqlite3.connect(self.db.db_name)
+        has_archive = os.path.exists(archive_path(self.db.db_name))
+        if has_archive:
+            source.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (archive_path(self.db.db_name),))
+        if source.execute("PRAGMA journal_mode").fetchone()[0] == "wal":
+            # An open read transaction keeps every step on the same snapshot,
+            # so concurrent writers neither wait for the copy nor restart it.
+            # Reading the archive in it too pins both halves of the pair together.
+            source.execute("BEGIN")
+            source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+            if has_archive:
+                source.execute(f"SELECT COUNT(*) FROM {ARCHIVE_SCHEMA}.sqlite_master").fetchone()
+        return source
+
+    def snapshot(self, keep=DEFAULT_KEEP, compress=True, step_pages=DEFAULT_STEP_PAGES, verify=True):
+        """Take a timestamped backup into the snapshot directory and drop all but the newest keep"""
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = datetime.datetime.now().strftime(SNAPSHOT_TIME_FORMAT)
+        result = self.backup(os.path.join(self.directory, f"{self.stem}-{stamp}.db"), step_pages, compress, verify)
+        if result is not None:
+            result["pruned"] = self.prune(keep)
+        return result
+
+    def list_snapshots(self):
+        """Snapshots of this database, newest first"""
+        if not os.path.isdir(self.directory):
+            return []
+        snapshots = []
+        for name in os.listdir(self.directory):
+            if name.startswith(f"{self.stem}-") and name.endswith((".db", ".db.gz")) \
+                    and not name.endswith(("_archive.db", "_archive.db.gz")):
+                path = os.path.join(self.directory, name)
+                archive = paired_path(path)
+                snapshots.append({"name": name, "path": path, "bytes": os.path.getsize(path),
+                                  "archive": archive if os.path.exists(archive) else None})
+        return sorted(snapshots, key=lambda snapshot: snapshot["name"], reverse=True)
+
+    def prune(self, keep=DEFAULT_KEEP):
+        """Delete snapshots beyond the newest keep; returns the names removed"""
+        removed = []
+        for snapshot in self.list_snapshots()[keep:]:
+            if snapshot["archive"]:
+                os.remove(snapshot["archive"])
+            os.remove(snapshot["path"])
+            removed.append(snapshot["name"])
+        return removed
+
+    def verify(self, path):
+        """Integrity check of a backup file, compressed or not, and of its archive copy if it has one"""
+        try:
+            with uncompressed(path) as plain:
+                integrity = integrity_check(plain)
+            if os.path.exists(paired_path(path)):
+                with uncompressed(paired_path(path)) as plain:
+                    archived = integrity_check(plain)
+                if archived != "ok":
+                    integrity = archived if integrity == "ok" else f"{integrity}; archive: {archived}"
+            return integrity
+        except (sqlite3.Error, OSError) as e:
+            print(f"Error verifying backup: {e}")
+            return None
+
+    def restore(self, path):
+        """Replace the live database, and its archive tier, with a verified backup pair in one backup pass each"""
+        started = time.perf_counter()
+        pair = [(path, self.db.conn)]
+        live_archive = archive_path(self.db.db_name)
+        if os.path.exists(paired_path(path)):
+            pair.append((paired_path(path), None))
+        elif os.path.exists(live_archive):
+            # Restoring the main file alone would leave archived rows that do not belong to it
+            print(f"Error: {path} has no archive copy but {live_archive} exists; move the archive aside first.")
+            return None
+        try:
+            with ExitStack() as stack:
+                plains = [stack.enter_context(uncompressed(backup)) for backup, _ in pair]
+                for (backup, _), plain in zip(pair, plains):
+                    integrity = integrity_check(plain)
+                    if integrity != "ok":
+                        print(f"Error: {backup} failed its integrity check: {integrity}")
+                        return None
+                # The archive first, so the main database never refers to a tier it does not have
+                for (_, target), plain in reversed(list(zip(pair, plains))):
+                    source = sqlite3.connect(plain)
+                    target = target or sqlite3.connect(live_archive)
+                    try:
+                        source.backup(target)
+                    finally:
+                        source.close()
+                        if target is not self.db.conn:
+                            target.close()
+        except (sqlite3.Error, OSError) as e:
+            print(f"Error restoring backup: {e}")
+            return None
+        # Backups taken before a schema change are brought up to date
+        self.db.ensure_schema()
+        seconds = round(time.perf_counter() - started, 3)
+        print(f"Restored {path}" + (f" and {pair[1][0]}" if len(pair) > 1 else "") + f" in {seconds}s.")
+        return {"path": path, "archive": pair[1][0] if len(pair) > 1 else None, "seconds": seconds}
+
+
+class SnapshotThread:
+    def __init__(self, db_name="college_management.db", interval=3600.0, keep=DEFAULT_KEEP, compress=True):
+        """Take a snapshot every interval seconds from a daemon thread"""
+        self.db_name = db_name
+        self.interval = interval
+        self.keep = keep
+        self.compress = compress
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="cms-snapshots", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def _run(self):
+        db = Database(self.db_name)
+        manager = BackupManager(db)
+        try:
+            while not self.stopped.wait(self.interval):
+                manager.snapshot(self.keep, self.compress)
+        finally:
+            db.close()
@@ -1,26 +1,52 @@
+import importlib
+import time
+
 from database import Database
-from modules.students import Student
-from modules.admin import Administrator
-from modules.teachers import Teacher
-from modules.library import Library
-from modules.events import Event
-from modules.feedback import Feedback
-from modules.ai import generateResponse
-from modules.courses import Course
-from modules.analytics import Analytics
+from modules.instrumentation import Profiler
+from modules.metrics import observe_operation
+
+# attribute -> (module, class); each module is imported and instantiated the
+# first time the attribute is used so startup only pays for what it touches
+MODULES = {
+    "student": ("modules.students", "Student"),
+    "admin": ("modules.admin", "Administrator"),
+    "teacher": ("modules.teachers", "Teacher"),
+    "library": ("modules.library", "Library"),
+    "event": ("modules.events", "Event"),
+    "feedback": ("modules.feedback", "Feedback"),
+    "course": ("modules.courses", "Course"),
+    "analytics": ("modules.analytics", "Analytics"),
+    "comment_analysis": ("modules.comment_analysis", "CommentAnalyzer"),
+    "timetable": ("modules.timetable", "Timetable"),
+    "archive": ("modules.archive", "Archiver"),
+    "integrity": ("modules.integrity", "IntegrityManager"),
+    "journal": ("modules.journal", "ChangeJournal"),
+    "backup": ("modules.backup", "BackupManager"),
+}
+
+# Cold start (interpreter + College() + first query) must stay within this
+STARTUP_BUDGET_MS = 150
+
 
 class College:
     def __init__(self, db_name="college_management.db"):
         """Initialize the College Management System"""
+        started = time.perf_counter()
         self.db = Database(db_name)
-        self.student = Student(self.db)
-        self.admin = Administrator(self.db)
-        self.teacher = Teacher(self.db)
-        self.library = Library(self.db)
-        self.event = Event(self.db)
-        self.feedback = Feedback(self.db)
-        self.course = Course(self.db)
-        self.analytics = Analytics(self.db)
+        self.profiler = Profiler(self.db)
+        self.profiler.listeners.append(observe_operation)
+        self.startup_ms = (time.perf_counter() - started) * 1000
+
+    def __getattr__(self, name):
+        """Create a (timed) module object on first access"""
+        if name not in MODULES:
+            raise AttributeError(f"'College' object has no attribute '{name}'")
+        module_name, class_name = MODULES[name]
+        module_class = getattr(importlib.import_module(module_name), class_name)
+        instance = self.profiler.wrap(name, module_class(self.db))
+        setattr(self, name, instance)
+        return instance
+
     def close(self):
         """Close database connection"""
         self.db.close()
@@ -41,72 +67,73 @@ class College:
             print("="*60)
 
             choice = input("Enter your choice (0-6): ")
-            
-            if choice == '1':
-                name = input("Enter student name: ")
-                age = int(input("Enter age: "))
-                gender = input("Enter gender: ")
-                contact = input("Enter contact number: ")
-                email = input("Enter email: ")
-                address = input("Enter address: ")
-                course = input("Enter course: ")
-                semester = int(input("Enter semester: "))
-                
-                self.student.add_student(name, age, gender, contact, email, address, course, semester)
-                
-            elif choice == '2':
-                student_id = int(input("Enter student ID to update: "))
-                student_data = self.student.get_student(student_id)
-                
-                if student_data:
-                    self.student.display_student(student_data)
-                    print("\nEnter new details (leave blank to keep current value):")
-                    
-                    name = input(f"Name [{student_data['name']}]: ") or None
-                    age_str = input(f"Age [{student_data['age']}]: ") or None
-                    age = int(age_str) if age_str else None
-                    gender = input(f"Gender [{student_data['gender']}]: ") or None
-                    contact = input(f"Contact [{student_data['contact']}]: ") or None
-                    email = input(f"Email [{student_data['email']}]: ") or None
-                    address = input(f"Address [{student_data['address']}]: ") or None
-                    course = input(f"Course [{student_data['course']}]: ") or None
-                    semester_str = input(f"Semester [{student_data['semester']}]: ") or None
-                    semester = int(semester_str) if semester_str else None
-                    
-                    self.student.update_student(
-                        student_id, name=name, age=age, gender=gender, 
-                        contact=contact, email=email, address=address, 
-                        course=course, semester=semester
-                    )
-            
-            elif choice == '3':
-                student_id = int(input("Enter student ID to delete: "))
-                confirm = input(f"Are you sure you want to delete student ID {student_id}? (y/n): ")
-                if confirm.lower() == 'y':
-                    self.student.delete_student(student_id)
-            
-            elif choice == '4':
-                student_id = int(input("Enter student ID to view: "))
-                student_data = self.student.get_student(student_id)
-                if student_data:
-                    self.student.display_student(student_data)
-            
-            elif choice == '5':
-                students = self.student.get_all_students()
-                for student in students:
-                    self.student.display_student(student)
-            
-            elif choice == '6':
-                search_term = input("Enter search term: ")
-                students = self.student.search_students(search_term)
-                for student in students:
-                    self.student.display_student(student)
-            
-            elif choice == '0':
-                break
-            
-            else:
-                print("Invalid choice. Please try again.")
+            with self.profiler.action("student", choice):
+
+                if choice == '1':
+                    name = input("Enter student name: ")
+                    age = int(input("Enter age: "))
+                    gender = input("Enter gender: ")
+                    contact = input("Enter contact number: ")
+                    email = input("Enter email: ")
+                    address = input("Enter address: ")
+                    course = input("Enter course: ")
+                    semester = int(input("Enter semester: "))
+
+                    self.student.add_student(name, age, gender, contact, email, address, course, semester)
+
+                elif choice == '2':
+                    student_id = int(input("Enter student ID to update: "))
+                    student_data = self.student.get_student(student_id)
+
+                    if student_data:
+                        self.student.display_student(student_data)
+                        print("\nEnter new details (leave blank to keep current value):")
+
+                        name = input(f"Name [{student_data['name']}]: ") or None
+                        age_str = input(f"Age [{student_data['age']}]: ") or None
+                        age = int(age_str) if age_str else None
+                        gender = input(f"Gender [{student_data['gender']}]: ") or None
+                        contact = input(f"Contact [{student_data['contact']}]: ") or None
+                        email = input(f"Email [{student_data['email']}]: ") or None
+                        address = input(f"Address [{student_data['address']}]: ") or None
+                        course = input(f"Course [{student_data['course']}]: ") or None
+                        semester_str = input(f"Semester [{student_data['semester']}]: ") or None
+                        semester = int(semester_str) if semester_str else None
+
+                        self.student.update_student(
+                            student_id, name=name, age=age, gender=gender, 
+                            contact=contact, email=email, address=address, 
+                            course=course, semester=semester
+                        )
+
+                elif choice == '3':
+                    student_id = int(input("Enter student ID to delete: "))
+                    confirm = input(f"Are you sure you want to delete student ID {student_id}? (y/n): ")
+                    if confirm.lower() == 'y':
+                        self.student.delete_student(student_id)
+
+                elif choice == '4':
+                    student_id = int(input("Enter student ID to view: "))
+                    student_data = self.student.get_student(student_id)
+                    if student_data:
+                        self.student.display_student(student_data)
+
+                elif choice == '5':
+                    students = self.student.get_all_students()
+                    for student in students:
+                        self.student.display_student(student)
+
+                elif choice == '6':
+                    search_term = input("Enter search term: ")
+                    students = self.student.search_students(search_term)
+                    for student in students:
+                        self.student.display_student(student)
+
+                elif choice == '0':
+                    break
+
+                else:
+                    print("Invalid choice. Please try again.")
 
     def run_admin_module(self):
         """Run the administrator management module"""
@@ -119,65 +146,66 @@ class College:
             print("5. View All Administrators")
             print("6. Search Administrators")
             print("0. Return to Main Menu")
-            
+
             choice = input("Enter your choice (0-6): ")
-            
-            if choice == '1':
-                name = input("Enter administrator name: ")
-                contact = input("Enter contact number: ")
-                email = input("Enter email: ")
-                position = input("Enter position: ")
-                department = input("Enter department: ")
-                
-                self.admin.add_admin(name, contact, email, position, department)
-            
-            elif choice == '2':
-                admin_id = int(input("Enter administrator ID to update: "))
-                admin_data = self.admin.get_admin(admin_id)
-                
-                if admin_data:
-                    self.admin.display_admin(admin_data)
-                    print("\nEnter new details (leave blank to keep current value):")
-                    
-                    name = input(f"Name [{admin_data['name']}]: ") or None
-                    contact = input(f"Contact [{admin_data['contact']}]: ") or None
-                    email = input(f"Email [{admin_data['email']}]: ") or None
-                    position = input(f"Position [{admin_data['position']}]: ") or None
-                    department = input(f"Department [{admin_data['department']}]: ") or None
-                    
-                    self.admin.update_admin(
-                        admin_id, name=name, contact=contact, email=email,
-                        position=position, department=department
-                    )
-            
-            elif choice == '3':
-                admin_id = int(input("Enter administrator ID to delete: "))
-                confirm = input(f"Are you sure you want to delete administrator ID {admin_id}? (y/n): ")
-                if confirm.lower() == 'y':
-                    self.admin.delete_admin(admin_id)
-            
-            elif choice == '4':
-                admin_id = int(input("Enter administrator ID to view: "))
-                admin_data = self.admin.get_admin(admin_id)
-                if admin_data:
-                    self.admin.display_admin(admin_data)
-            
-            elif choice == '5':
-                admins = self.admin.get_all_admins()
-                for admin in admins:
-                    self.admin.display_admin(admin)
-            
-            elif choice == '6':
-                search_term = input("Enter search term: ")
-                admins = self.admin.search_admins(search_term)
-                for admin in admins:
-                    self.admin.display_admin(admin)
-            
-            elif choice == '0':
-                break
-            
-            else:
-                print("Invalid choice. Please try again.")
+            with self.profiler.action("admin", choice):
+
+                if choice == '1':
+                    name = input("Enter administrator name: ")
+                    contact = input("Enter contact number: ")
+                    email = input("Enter email: ")
+                    position = input("Enter position: ")
+                    department = input("Enter department: ")
+
+                    self.admin.add_admin(name, contact, email, position, department)
+
+                elif choice == '2':
+                    admin_id = int(input("Enter administrator ID to update: "))
+                    admin_data = self.admin.get_admin(admin_id)
+
+                    if admin_data:
+                        self.admin.display_admin(admin_data)
+                        print("\nEnter new details (leave blank to keep current value):")
+
+                        name = input(f"Name [{admin_data['name']}]: ") or None
+                        contact = input(f"Contact [{admin_data['contact']}]: ") or None
+                        email = input(f"Email [{admin_data['email']}]: ") or None
+                        position = input(f"Position [{admin_data['position']}]: ") or None
+                        department = input(f"Department [{admin_data['department']}]: ") or None
+
+                        self.admin.update_admin(
+                            admin_id, name=name, contact=contact, email=email,
+                            position=position, department=department
+                        )
+
+                elif choice == '3':
+                    admin_id = int(input("Enter administrator ID to delete: "))
+                    confirm = input(f"Are you sure you want to delete administrator ID {admin_id}? (y/n): ")
+                    if confirm.lower() == 'y':
+                        self.admin.delete_admin(admin_id)
+
+                elif choice == '4':
+                    admin_id = int(input("Enter administrator ID to view: "))
+                    admin_data = self.admin.get_admin(admin_id)
+                    if admin_data:
+                        self.admin.display_admin(admin_data)
+
+                elif choice == '5':
+                    admins = self.admin.get_all_admins()
+                    for admin in admins:
+                        self.admin.display_admin(admin)
+
+                elif choice == '6':
+                    search_term = input("Enter search term: ")
+                    admins = self.admin.search_admins(search_term)
+                    for admin in admins:
+                        self.admin.display_admin(admin)
+
+                elif choice == '0':
+                    break
+
+                else:
+                    print("Invalid choice. Please try again.")
 
     def run_teacher_module(self):
         """Run the teacher management module"""
@@ -195,69 +223,70 @@ class College:
             print("="*60)
 
             choice = input("Enter your choice (0-6): ")
+            with self.profiler.action("teacher", choice):
+
+                if choice == '1':
+                    print("\n➕ Add New Teacher")
+                    name = input("   👤 Name: ")
+                    gender = input("   🚻 Gender: ")
+                    contact = input("   📞 Contact Number: ")
+                    email = input("   ✉️  Email: ")
+                    department = input("   🏢 Department: ")
+                    qualification = input("   🎓 Qualification: ")
+                    self.teacher.add_teacher(name, gender, contact, email, department, qualification)
+
+                elif choice == '2':
+                    print("\n✏️  Update Teacher")
+                    teacher_id = int(input("   🆔 Enter teacher ID to update: "))
+                    teacher_data = self.teacher.get_teacher(teacher_id)
+
+                    if teacher_data:
+                        self.teacher.display_teacher(teacher_data)
+                        print("\n   Enter new details (leave blank to keep current value):")
+                        name = input(f"   👤 Name [{teacher_data['name']}]: ") or None
+                        gender = input(f"   🚻 Gender [{teacher_data['gender']}]: ") or None
+                        contact = input(f"   📞 Contact [{teacher_data['contact']}]: ") or None
+                        email = input(f"   ✉️  Email [{teacher_data['email']}]: ") or None
+                        department = input(f"   🏢 Department [{teacher_data['department']}]: ") or None
+                        qualification = input(f"   🎓 Qualification [{teacher_data['qualification']}]: ") or None
+                        self.teacher.update_teacher(
+                            teacher_id, name=name, gender=gender, contact=contact,
+                            email=email, department=department, qualification=qualification
+                        )
+
+                elif choice == '3':
+                    print("\n❌ Delete Teacher")
+                    teacher_id = int(input("   🆔 Enter teacher ID to delete: "))
+                    confirm = input(f"   Are you sure you want to delete teacher ID {teacher_id}? (y/n): ")
+                    if confirm.lower() == 'y':
+                        self.teacher.delete_teacher(teacher_id)
+
+                elif choice == '4':
+                    print("\n🔍 View Teacher")
+                    teacher_id = int(input("   🆔 Enter teacher ID to view: "))
+                    teacher_data = self.teacher.get_teacher(teacher_id)
+                    if teacher_data:
+                        self.teacher.display_teacher(teacher_data)
+
+                elif choice == '5':
+                    print("\n📋 View All Teachers")
+                    teachers = self.teacher.get_all_teachers()
+                    for teacher in teachers:
+                        self.teacher.display_teacher(teacher)
+
+                elif choice == '6':
+                    print("\n🔎 Search Teachers")
+                    search_term = input("   Enter search term: ")
+                    teachers = self.teacher.search_teachers(search_term)
+                    for teacher in teachers:
+                        self.teacher.display_teacher(teacher)
+
+                elif choice == '0':
+                    print("Returning to main menu...")
+                    break
 
-            if choice == '1':
-                print("\n➕ Add New Teacher")
-                name = input("   👤 Name: ")
-                gender = input("   🚻 Gender: ")
-                contact = input("   📞 Contact Number: ")
-                email = input("   ✉️  Email: ")
-                department = input("   🏢 Department: ")
-                qualification = input("   🎓 Qualification: ")
-                self.teacher.add_teacher(name, gender, contact, email, department, qualification)
-
-            elif choice == '2':
-                print("\n✏️  Update Teacher")
-                teacher_id = int(input("   🆔 Enter teacher ID to update: "))
-                teacher_data = self.teacher.get_teacher(teacher_id)
-
-                if teacher_data:
-                    self.teacher.display_teacher(teacher_data)
-                    print("\n   Enter new details (leave blank to keep current value):")
-                    name = input(f"   👤 Name [{teacher_data['name']}]: ") or None
-                    gender = input(f"   🚻 Gender [{teacher_data['gender']}]: ") or None
-                    contact = input(f"   📞 Contact [{teacher_data['contact']}]: ") or None
-                    email = input(f"   ✉️  Email [{teacher_data['email']}]: ") or None
-                    department = input(f"   🏢 Department [{teacher_data['department']}]: ") or None
-                    qualification = input(f"   🎓 Qualification [{teacher_data['qualification']}]: ") or None
-                    self.teacher.update_teacher(
-                        teacher_id, name=name, gender=gender, contact=contact,
-                        email=email, department=department, qualification=qualification
-                    )
-
-            elif choice == '3':
-                print("\n❌ Delete Teacher")
-                teacher_id = int(input("   🆔 Enter teacher ID to delete: "))
-                confirm = input(f"   Are you sure you want to delete teacher ID {teacher_id}? (y/n): ")
-                if confirm.lower() == 'y':
-                    self.teacher.delete_teacher(teacher_id)
-
-            elif choice == '4':
-                print("\n🔍 View Teacher")
-                teacher_id = int(input("   🆔 Enter teacher ID to view: "))
-                teacher_data = self.teacher.get_teacher(teacher_id)
-                if teacher_data:
-                    self.teacher.display_teacher(teacher_data)
-
-            elif choice == '5':
-                print("\n📋 View All Teachers")
-                teachers = self.teacher.get_all_teachers()
-                for teacher in teachers:
-                    self.teacher.display_teacher(teacher)
-
-            elif choice == '6':
-                print("\n🔎 Search Teachers")
-                search_term = input("   Enter search term: ")
-                teachers = self.teacher.search_teachers(search_term)
-                for teacher in teachers:
-                    self.teacher.display_teacher(teacher)
-
-            elif choice == '0':
-                print("Returning to main menu...")
-                break
-
-            else:
-                print("❌ Invalid choice. Please try again.")
+                else:
+                    print("❌ Invalid choice. Please try again.")
 
     def run_library_module(self):
         """Run the library management module"""
@@ -277,81 +306,82 @@ class College:
             print("="*60)
 
             choice = input("Enter your choice (0-8): ")
+            with self.profiler.action("library", choice):
+
+                if choice == '1':
+                    print("\n➕ Add New Book")
+                    title = input("   📖 Title: ")
+                    author = input("   👤 Author: ")
+                    isbn = input("   🔢 ISBN: ")
+                    publisher = input("   🏢 Publisher: ")
+                    year = input("   📅 Publication Year: ")
+                    quantity = int(input("   🔢 Quantity: "))
+                    self.library.add_book(title, author, isbn, publisher, year, quantity)
+
+                elif choice == '2':
+                    print("\n✏️  Update Book")
+                    book_id = int(input("   🆔 Enter book ID to update: "))
+                    book_data = self.library.get_book(book_id)
+                    if book_data:
+                        self.library.display_book(book_data)
+                        print("\n   Enter new details (leave blank to keep current value):")
+                        title = input(f"   📖 Title [{book_data['title']}]: ") or None
+                        author = input(f"   👤 Author [{book_data['author']}]: ") or None
+                        isbn = input(f"   🔢 ISBN [{book_data['isbn']}]: ") or None
+                        publisher = input(f"   🏢 Publisher [{book_data['publisher']}]: ") or None
+                        year = input(f"   📅 Year [{book_data['year']}]: ") or None
+                        quantity_str = input(f"   🔢 Quantity [{book_data['quantity']}]: ") or None
+                        quantity = int(quantity_str) if quantity_str else None
+                        self.library.update_book(
+                            book_id, title=title, author=author, isbn=isbn,
+                            publisher=publisher, year=year, quantity=quantity
+                        )
+
+                elif choice == '3':
+                    print("\n❌ Delete Book")
+                    book_id = int(input("   🆔 Enter book ID to delete: "))
+                    confirm = input(f"   Are you sure you want to delete book ID {book_id}? (y/n): ")
+                    if confirm.lower() == 'y':
+                        self.library.delete_book(book_id)
+
+                elif choice == '4':
+                    print("\n🔍 View Book")
+                    book_id = int(input("   🆔 Enter book ID to view: "))
+                    book_data = self.library.get_book(book_id)
+                    if book_data:
+                        self.library.display_book(book_data)
+
+                elif choice == '5':
+                    print("\n📋 View All Books")
+                    books = self.library.get_all_books()
+                    for book in books:
+                        self.library.display_book(book)
+
+                elif choice == '6':
+                    print("\n🔎 Search Books")
+                    search_term = input("   Enter search term: ")
+                    books = self.library.search_books(search_term)
+                    for book in books:
+                        self.library.display_book(book)
+
+                elif choice == '7':
+                    print("\n📤 Issue Book")
+                    book_id = int(input("   🆔 Enter book ID to issue: "))
+                    student_id = int(input("   👨‍🎓 Enter student ID to issue to: "))
+                    self.library.issue_book(book_id, student_id)
+
+                elif choice == '8':
+                    print("\n📥 Return Book")
+                    book_id = int(input("   🆔 Enter book ID to return: "))
+                    student_id = int(input("   👨‍🎓 Enter student ID returning the book: "))
+                    self.library.return_book(book_id, student_id)
+
+                elif choice == '0':
+                    print("Returning to main menu...")
+                    break
 
-            if choice == '1':
-                print("\n➕ Add New Book")
-                title = input("   📖 Title: ")
-                author = input("   👤 Author: ")
-                isbn = input("   🔢 ISBN: ")
-                publisher = input("   🏢 Publisher: ")
-                year = input("   📅 Publication Year: ")
-                quantity = int(input("   🔢 Quantity: "))
-                self.library.add_book(title, author, isbn, publisher, year, quantity)
-
-            elif choice == '2':
-                print("\n✏️  Update Book")
-                book_id = int(input("   🆔 Enter book ID to update: "))
-                book_data = self.library.get_book(book_id)
-                if book_data:
-                    self.library.display_book(book_data)
-                    print("\n   Enter new details (leave blank to keep current value):")
-                    title = input(f"   📖 Title [{book_data['title']}]: ") or None
-                    author = input(f"   👤 Author [{book_data['author']}]: ") or None
-                    isbn = input(f"   🔢 ISBN [{book_data['isbn']}]: ") or None
-                    publisher = input(f"   🏢 Publisher [{book_data['publisher']}]: ") or None
-                    year = input(f"   📅 Year [{book_data['year']}]: ") or None
-                    quantity_str = input(f"   🔢 Quantity [{book_data['quantity']}]: ") or None
-                    quantity = int(quantity_str) if quantity_str else None
-                    self.library.update_book(
-                        book_id, title=title, author=author, isbn=isbn,
-                        publisher=publisher, year=year, quantity=quantity
-                    )
-
-            elif choice == '3':
-                print("\n❌ Delete Book")
-                book_id = int(input("   🆔 Enter book ID to delete: "))
-                confirm = input(f"   Are you sure you want to delete book ID {book_id}? (y/n): ")
-                if confirm.lower() == 'y':
-                    self.library.delete_book(book_id)
-
-            elif choice == '4':
-                print("\n🔍 View Book")
-                book_id = int(input("   🆔 Enter book ID to view: "))
-                book_data = self.library.get_book(book_id)
-                if book_data:
-                    self.library.display_book(book_data)
-
-            elif choice == '5':
-                print("\n📋 View All Books")
-                books = self.library.get_all_books()
-                for book in books:
-                    self.library.display_book(book)
-
-            elif choice == '6':
-                print("\n🔎 Search Books")
-                search_term = input("   Enter search term: ")
-                books = self.library.search_books(search_term)
-                for book in books:
-                    self.library.display_book(book)
-
-            elif choice == '7':
-                print("\n📤 Issue Book")
-                book_id = int(input("   🆔 Enter book ID to issue: "))
-                student_id = int(input("   👨‍🎓 Enter student ID to issue to: "))
-                self.library.issue_book(book_id, student_id)
-
-            elif choice == '8':
-                print("\n📥 Return Book")
-                book_id = int(input("   🆔 Enter book ID to return: "))
-                student_id = int(input("   👨‍🎓 Enter student ID returning the book: "))
-                self.library.return_book(book_id, student_id)
-
-            elif choice == '0':
-                print("Returning to main menu...")
-                break
-
-            else:
-                print("❌ Invalid choice. Please try again.")
+                else:
+                    print("❌ Invalid choice. Please try again.")
 
     def run_ai_module(self):
         """Run the AI module"""
@@ -364,26 +394,28 @@ class College:
             print("="*60)
 
             choice = input("Enter your choice (0-1): ")
-
-            if choice == '1':
-                print("\n🚀 Welcome to the AI Assistant!")
-                print("Type your question or request below and let the AI help you.")
-                print("💡 Tip: The more detailed your prompt, the better the answer!\n")
-                prompt = input("📝 Your prompt: ")
-                if len(prompt.strip()) < 5:
-                    print("⚠️  Please enter a more comprehensive prompt to get a useful response.")
+            with self.profiler.action("ai", choice):
+
+                if choice == '1':
+                    print("\n🚀 Welcome to the AI Assistant!")
+                    print("Type your question or request below and let the AI help you.")
+                    print("💡 Tip: The more detailed your prompt, the better the answer!\n")
+                    prompt = input("📝 Your prompt: ")
+                    if len(prompt.strip()) < 5:
+                        print("⚠️  Please enter a more comprehensive prompt to get a useful response.")
+                    else:
+                        print("\n🤖 Thinking...\n")
+                        from modules.ai import generateResponse
+                        response = generateResponse(prompt)
+                        print("═" * 60)
+                        print("🔮 AI Response:")
+                        print(response)
+                        print("═" * 60)
+                elif choice == '0':
+                    print("Returning to main menu...")
+                    break
                 else:
-                    print("\n🤖 Thinking...\n")
-                    response = generateResponse(prompt)
-                    print("═" * 60)
-                    print("🔮 AI Response:")
-                    print(response)
-                    print("═" * 60)
-            elif choice == '0':
-                print("Returning to main menu...")
-                break
-            else:
-                print("❌ Invalid choice. Please try again.")
+                    print("❌ Invalid choice. Please try again.")
 
     def run_event_module(self):
         """Run the event management module"""
@@ -396,65 +428,70 @@ class College:
             print("5. View All Events")
             print("6. Search Events")
             print("0. Return to Main Menu")
-            
+
             choice = input("Enter your choice (0-6): ")
-            
-            if choice == '1':
-                name = input("Enter event name: ")
-                date = input("Enter event date (YYYY-MM-DD): ")
-                time = input("Enter event time (HH:MM): ")
-                venue = input("Enter venue: ")
-                description = input("Enter event description: ")
-                organizer = input("Enter event organizer : ")
-                self.event.add_event(name, date, time, venue, description, organizer)
-
-            elif choice == '2':
-                event_id = int(input("Enter event ID to update: "))
-                event_data = self.event.get_event(event_id)
-
-                if event_data:
-                    self.event.display_event(event_data)
-                    print("\nEnter new details (leave blank to keep current value):")
-
-                    name = input(f"Name [{event_data['name']}]: ") or None
-                    date = input(f"Date [{event_data['date']}]: ") or None
-                    time = input(f"Time [{event_data['time']}]: ") or None
-                    venue = input(f"Venue [{event_data['venue']}]: ") or None
-                    description = input(f"Description [{event_data['description']}]: ") or None
-                    
-                    self.event.update_event(
-                        event_id, name=name, date=date, time=time,
-                        venue=venue, description=description
-                    )
-
-            elif choice == '3':
-                event_id = int(input("Enter event ID to delete: "))
-                confirm = input(f"Are you sure you want to delete event ID {event_id}? (y/n): ")
-                if confirm.lower() == 'y':
-                    self.event.delete_event(event_id)
-
-            elif choice == '4':
-                event_id = int(input("Enter event ID to view: "))
-                event_data = self.event.get_event(event_id)
-                if event_data:
-                    self.event.display_event(event_data)
-
-            elif choice == '5':
-                events = self.event.get_all_events()
-                for event in events:
-                    self.event.display_event(event)
-
-            elif choice == '6':
-                search_term = input("Enter search term: ")
-                events = self.event.search_events(search_term)
-                for event in events:
-                    self.event.display_event(event)
-
-            elif choice == '0':
-                break
-
-            else:
-                print("Invalid choice. Please try again.")
+            with self.profiler.action("event", choice):
+
+                if choice == '1':
+                    name = input("Enter event name: ")
+                    date = input("Enter event date (YYYY-MM-DD): ")
+                    time = input("Enter event time (HH:MM): ")
+                    end_time = input("Enter end time (HH:MM, blank for two hours): ") or None
+                    venue = input("Enter venue: ")
+                    description = input("Enter event description: ")
+                    organizer = input("Enter event organizer : ")
+                    if not self.event.add_event(name, description, date, time, venue, organizer, end_time):
+                        if venue and input("Book the venue anyway? (y/n): ").lower() == 'y':
+                            self.event.add_event(name, description, date, time, venue, organizer, end_time,
+                                                 on_conflict="flag")
+
+                elif choice == '2':
+                    event_id = int(input("Enter event ID to update: "))
+                    event_data = self.event.get_event(event_id)
+
+                    if event_data:
+                        self.event.display_event(event_data)
+                        print("\nEnter new details (leave blank to keep current value):")
+
+                        name = input(f"Name [{event_data['name']}]: ") or None
+                        date = input(f"Date [{event_data['date']}]: ") or None
+                        time = input(f"Time [{event_data['time']}]: ") or None
+                        venue = input(f"Venue [{event_data['venue']}]: ") or None
+                        description = input(f"Description [{event_data['description']}]: ") or None
+
+                        self.event.update_event(
+                            event_id, name=name, date=date, time=time,
+                            venue=venue, description=description
+                        )
+
+                elif choice == '3':
+                    event_id = int(input("Enter event ID to delete: "))
+                    confirm = input(f"Are you sure you want to delete event ID {event_id}? (y/n): ")
+                    if confirm.lower() == 'y':
+                        self.event.delete_event(event_id)
+
+                elif choice == '4':
+                    event_id = int(input("Enter event ID to view: "))
+                    event_data = self.event.get_event(event_id)
+                    if event_data:
+                        self.event.display_event(event_data)
+
+                elif choice == '5':
+                    events = self.event.get_all_events()
+                    for event in events:
+                        self.event.display_event(event)
+
+                elif choice == '6':
+                    search_term = input("Enter search term: ")
+                    events = self.event.search_events(search_term)
+                    for event in events:
+                        self.event.display_event(event)
+
+                elif choice == '0':
+                    break
+
+                else:
+                    print("Invalid choice. Please try again.")
 
     def run_feedback_module(self):
         """Run the feedback management module"""
@@ -471,89 +508,90 @@ class College:
             print("0. Return to Main Menu")
 
             choice = input("Enter your choice (0-8): ")
+            with self.profiler.action("feedback", choice):
+
+                if choice == '1':
+                    student_id = int(input("Enter student ID: "))
+                    teacher_id = int(input("Enter teacher ID: "))
+                    course = input("Enter course name: ")
+                    try:
+                        rating = int(input("Enter rating (1-5): "))
+                    except ValueError:
+                        print("Invalid rating. Must be an integer.")
+                        continue
+                    comments = input("Enter comments: ")
+                    self.feedback.submit_feedback(student_id, teacher_id, course, rating, comments)
+
+                elif choice == '2':
+                    feedback_id = int(input("Enter feedback ID to update: "))
+                    try:
+                        rating = input("Enter new rating (1-5, or leave blank): ")
+                        rating = int(rating) if rating else None
+                    except ValueError:
+                        print("Invalid rating.")
+                        continue
+                    comments = input("Enter new comments (or leave blank): ")
+                    comments = comments if comments else None
+                    self.feedback.update_feedback(feedback_id, rating=rating, comments=comments)
+
+                elif choice == '3':
+                    feedback_id = int(input("Enter feedback ID to delete: "))
+                    confirm = input("Are you sure you want to delete this feedback? (y/n): ")
+                    if confirm.lower() == 'y':
+                        self.feedback.delete_feedback(feedback_id)
+
+                elif choice == '4':
+                    feedback_id = int(input("Enter feedback ID to view: "))
+                    data = self.feedback.get_feedback(feedback_id)
+                    self.feedback.display_feedback(data)
+
+                elif choice == '5':
+                    teacher_id = int(input("Enter teacher ID: "))
+                    feedbacks = self.feedback.get_teacher_feedback(teacher_id)
+                    for fb in feedbacks:
+                        print(f"\nFeedback ID: {fb[0]}")
+                        print(f"Student: {fb[1]}")
+                        print(f"Course: {fb[2]}")
+                        print(f"Rating: {fb[3]}/5")
+                        print(f"Comments: {fb[4]}")
+                        print(f"Date: {fb[5]}")
+                        print("-" * 40)
+
+                elif choice == '6':
+                    student_id = int(input("Enter student ID: "))
+                    feedbacks = self.feedback.get_student_feedback(student_id)
+                    for fb in feedbacks:
+                        print(f"\nFeedback ID: {fb[0]}")
+                        print(f"Teacher: {fb[1]}")
+                        print(f"Course: {fb[2]}")
+                        print(f"Rating: {fb[3]}/5")
+                        print(f"Comments: {fb[4]}")
+                        print(f"Date: {fb[5]}")
+                        print("-" * 40)
+
+                elif choice == '7':
+                    course = input("Enter course name: ")
+                    feedbacks = self.feedback.get_course_feedback(course)
+                    for fb in feedbacks:
+                        print(f"\nFeedback ID: {fb[0]}")
+                        print(f"Student: {fb[1]}")
+                        print(f"Teacher: {fb[2]}")
+                        print(f"Rating: {fb[3]}/5")
+                        print(f"Comments: {fb[4]}")
+                        print(f"Date: {fb[5]}")
+                        print("-" * 40)
+
+                elif choice == '8':
+                    teacher_id = int(input("Enter teacher ID: "))
+                    avg = self.feedback.calculate_teacher_rating(teacher_id)
+                    print(f"Average Rating for Teacher {teacher_id}: {avg}/5")
+
+                elif choice == '0':
+                    break
+
+                else:
+                    print("Invalid choice. Please try again.")
 
-            if choice == '1':
-                student_id = int(input("Enter student ID: "))
-                teacher_id = int(input("Enter teacher ID: "))
-                course = input("Enter course name: ")
-                try:
-                    rating = int(input("Enter rating (1-5): "))
-                except ValueError:
-                    print("Invalid rating. Must be an integer.")
-                    continue
-                comments = input("Enter comments: ")
-                self.feedback.submit_feedback(student_id, teacher_id, course, rating, comments)
-
-            elif choice == '2':
-                feedback_id = int(input("Enter feedback ID to update: "))
-                try:
-                    rating = input("Enter new rating (1-5, or leave blank): ")
-                    rating = int(rating) if rating else None
-                except ValueError:
-                    print("Invalid rating.")
-                    continue
-                comments = input("Enter new comments (or leave blank): ")
-                comments = comments if comments else None
-                self.feedback.update_feedback(feedback_id, rating=rating, comments=comments)
-
-            elif choice == '3':
-                feedback_id = int(input("Enter feedback ID to delete: "))
-                confirm = input("Are you sure you want to delete this feedback? (y/n): ")
-                if confirm.lower() == 'y':
-                    self.feedback.delete_feedback(feedback_id)
-
-            elif choice == '4':
-                feedback_id = int(input("Enter feedback ID to view: "))
-                data = self.feedback.get_feedback(feedback_id)
-                self.feedback.display_feedback(data)
-
-            elif choice == '5':
-                teacher_id = int(input("Enter teacher ID: "))
-                feedbacks = self.feedback.get_teacher_feedback(teacher_id)
-                for fb in feedbacks:
-                    print(f"\nFeedback ID: {fb[0]}")
-                    print(f"Student: {fb[1]}")
-                    print(f"Course: {fb[2]}")
-                    print(f"Rating: {fb[3]}/5")
-                    print(f"Comments: {fb[4]}")
-                    print(f"Date: {fb[5]}")
-                    print("-" * 40)
-
-            elif choice == '6':
-                student_id = int(input("Enter student ID: "))
-                feedbacks = self.feedback.get_student_feedback(student_id)
-                for fb in feedbacks:
-                    print(f"\nFeedback ID: {fb[0]}")
-                    print(f"Teacher: {fb[1]}")
-                    print(f"Course: {fb[2]}")
-                    print(f"Rating: {fb[3]}/5")
-                    print(f"Comments: {fb[4]}")
-                    print(f"Date: {fb[5]}")
-                    print("-" * 40)
-
-            elif choice == '7':
-                course = input("Enter course name: ")
-                feedbacks = self.feedback.get_course_feedback(course)
-                for fb in feedbacks:
-                    print(f"\nFeedback ID: {fb[0]}")
-                    print(f"Student: {fb[1]}")
-                    print(f"Teacher: {fb[2]}")
-                    print(f"Rating: {fb[3]}/5")
-                    print(f"Comments: {fb[4]}")
-                    print(f"Date: {fb[5]}")
-                    print("-" * 40)
-
-            elif choice == '8':
-                teacher_id = int(input("Enter teacher ID: "))
-                avg = self.feedback.calculate_teacher_rating(teacher_id)
-                print(f"Average Rating for Teacher {teacher_id}: {avg}/5")
-
-            elif choice == '0':
-                break
-
-            else:
-                print("Invalid choice. Please try again.")
-    
     def run_course_module(self):
         """Run the course management module"""
         while True:
@@ -566,60 +604,61 @@ class College:
             print("0. Return to Main Menu")
 
             choice = input("Enter your choice (0-5): ")
+            with self.profiler.action("course", choice):
+
+                if choice == '1':
+                    name = input("Enter course name: ")
+                    description = input("Enter course description: ")
+                    duration = input("Enter course duration: ")
+                    self.course.add_course(name, description, duration)
+
+                elif choice == '2':
+                    try:
+                        course_id = int(input("Enter course ID to update: "))
+                        name = input("Enter new course name (or leave blank): ")
+                        description = input("Enter new description (or leave blank): ")
+                        name = name if name.strip() else None
+                        description = description if description.strip() else None
+                        self.course.update_course(course_id, name, description)
+                    except ValueError:
+                        print("Invalid input. Course ID must be an integer.")
+
+                elif choice == '3':
+                    try:
+                        print(self.course.get_all_courses())
+                        course_id = int(input("Enter course ID to delete: "))
+                        confirm = input("Are you sure you want to delete this course? (y/n): ")
+                        if confirm.lower() == 'y':
+                            self.course.delete_course(course_id)
+                    except ValueError:
+                        print("Invalid input. Course ID must be an integer.")
+
+                elif choice == '4':
+                    try:
+                        course_id = int(input("Enter course ID to view: "))
+                        course = self.course.get_course(course_id)
+                        self.course.display_course(course)
+                    except ValueError:
+                        print("Invalid input. Course ID must be an integer.")
+
+                elif choice == '5':
+                    all_courses = self.course.get_all_courses()
+                    if not all_courses:
+                        print("No courses found.")
+                    for c in all_courses:
+                        course_dict = {
+                            "course_id": c[0],
+                            "course_name": c[1],
+                            "description": c[2]
+                        }
+                        self.course.display_course(course_dict)
+
+                elif choice == '0':
+                    break
+                else:
+                    print("Invalid choice. Please try again.")            
+
 
-            if choice == '1':
-                name = input("Enter course name: ")
-                description = input("Enter course description: ")
-                duration = input("Enter course duration: ")
-                self.course.add_course(name, description, duration)
-
-            elif choice == '2':
-                try:
-                    course_id = int(input("Enter course ID to update: "))
-                    name = input("Enter new course name (or leave blank): ")
-                    description = input("Enter new description (or leave blank): ")
-                    name = name if name.strip() else None
-                    description = description if description.strip() else None
-                    self.course.update_course(course_id, name, description)
-                except ValueError:
-                    print("Invalid input. Course ID must be an integer.")
-
-            elif choice == '3':
-                try:
-                    print(self.course.get_all_courses())
-                    course_id = int(input("Enter course ID to delete: "))
-                    confirm = input("Are you sure you want to delete this course? (y/n): ")
-                    if confirm.lower() == 'y':
-                        self.course.delete_course(course_id)
-                except ValueError:
-                    print("Invalid input. Course ID must be an integer.")
-
-            elif choice == '4':
-                try:
-                    course_id = int(input("Enter course ID to view: "))
-                    course = self.course.get_course(course_id)
-                    self.course.display_course(course)
-                except ValueError:
-                    print("Invalid input. Course ID must be an integer.")
-
-            elif choice == '5':
-                all_courses = self.course.get_all_courses()
-                if not all_courses:
-                    print("No courses found.")
-                for c in all_courses:
-                    course_dict = {
-                        "course_id": c[0],
-                        "course_name": c[1],
-                        "description": c[2]
-                    }
-                    self.course.display_course(course_dict)
-
-            elif choice == '0':
-                break
-            else:
-                print("Invalid choice. Please try again.")            
-
-    
     def run_analytics_module(self):
         """Run the analytics module"""
         while True:
@@ -645,65 +684,66 @@ class College:
             print("="*60)
 
             choice = input("Enter your choice (0-15): ")
-
-            if choice == '1':
-                print(f"\n👨‍🎓 Total Students: {self.analytics.get_total_students()}")
-            elif choice == '2':
-                print("\n📚 Students by Course:")
-                for course, count in self.analytics.get_students_by_course().items():
-                    print(f"   - {course}: {count}")
-            elif choice == '3':
-                print("\n🚻 Students by Gender:")
-                for gender, count in self.analytics.get_students_by_gender().items():
-                    print(f"   - {gender}: {count}")
-            elif choice == '4':
-                print("\n📈 Student Enrollment Trends:")
-                for year, count in self.analytics.get_student_enrollment_trends().items():
-                    print(f"   - {year}: {count}")
-            elif choice == '5':
-                print(f"\n📖 Total Courses: {self.analytics.get_total_courses()}")
-            elif choice == '6':
-                print("\n🌟 Course Popularity:")
-                for course, count in self.analytics.get_course_popularity().items():
-                    print(f"   - {course}: {count}")
-            elif choice == '7':
-                print(f"\n👩‍🏫 Total Teachers: {self.analytics.get_total_teachers()}")
-            elif choice == '8':
-                print("\n🏢 Teachers by Department:")
-                for dept, count in self.analytics.get_teachers_by_department().items():
-                    print(f"   - {dept}: {count}")
-            elif choice == '9':
-                print(f"\n📗 Total Books: {self.analytics.get_total_books()}")
-            elif choice == '10':
-                print(f"\n📕 Total Borrowed Books: {self.analytics.get_total_borrowed_books()}")
-            elif choice == '11':
-                books = self.analytics.get_most_borrowed_books()
-                print("\n🏆 Most Borrowed Books:")
-                if books:
-                    for title, count in books:
-                        print(f"   - {title}: {count} times")
-                else:
-                    print("No borrowed books data.")
-            elif choice == '12':
-                print(f"\n🎉 Total Events: {self.analytics.get_total_events()}")
-            elif choice == '13':
-                events = self.analytics.get_upcoming_events()
-                print("\n⏳ Upcoming Events:")
-                if events:
-                    for name, date, venue in events:
-                        print(f"   - {name} on {date} at {venue}")
+            with self.profiler.action("analytics", choice):
+
+                if choice == '1':
+                    print(f"\n👨‍🎓 Total Students: {self.analytics.get_total_students()}")
+                elif choice == '2':
+                    print("\n📚 Students by Course:")
+                    for course, count in self.analytics.get_students_by_course().items():
+                        print(f"   - {course}: {count}")
+                elif choice == '3':
+                    print("\n🚻 Students by Gender:")
+                    for gender, count in self.analytics.get_students_by_gender().items():
+                        print(f"   - {gender}: {count}")
+                elif choice == '4':
+                    print("\n📈 Student Enrollment Trends:")
+                    for year, count in self.analytics.get_student_enrollment_trends().items():
+                        print(f"   - {year}: {count}")
+                elif choice == '5':
+                    print(f"\n📖 Total Courses: {self.analytics.get_total_courses()}")
+                elif choice == '6':
+                    print("\n🌟 Course Popularity:")
+                    for course, count in self.analytics.get_course_popularity().items():
+                        print(f"   - {course}: {count}")
+                elif choice == '7':
+                    print(f"\n👩‍🏫 Total Teachers: {self.analytics.get_total_teachers()}")
+                elif choice == '8':
+                    print("\n🏢 Teachers by Department:")
+                    for dept, count in self.analytics.get_teachers_by_department().items():
+                        print(f"   - {dept}: {count}")
+                elif choice == '9':
+                    print(f"\n📗 Total Books: {self.analytics.get_total_books()}")
+                elif choice == '10':
+                    print(f"\n📕 Total Borrowed Books: {self.analytics.get_total_borrowed_books()}")
+                elif choice == '11':
+                    books = self.analytics.get_most_borrowed_books()
+                    print("\n🏆 Most Borrowed Books:")
+                    if books:
+                        for title, count in books:
+                            print(f"   - {title}: {count} times")
+                    else:
+                        print("No borrowed books data.")
+                elif choice == '12':
+                    print(f"\n🎉 Total Events: {self.analytics.get_total_events()}")
+                elif choice == '13':
+                    events = self.analytics.get_upcoming_events()
+                    print("\n⏳ Upcoming Events:")
+                    if events:
+                        for name, date, venue in events:
+                            print(f"   - {name} on {date} at {venue}")
+                    else:
+                        print("No upcoming events.")
+                elif choice == '14':
+                    print("\n⭐ Average Feedback Rating by Course:")
+                    for course, avg in self.analytics.get_average_feedback_rating_by_course().items():
+                        print(f"   - {course}: {avg}/5")
+                elif choice == '15':
+                    print("\n⭐ Average Feedback Rating by Teacher:")
+                    for teacher, avg in self.analytics.get_average_feedback_rating_by_teacher().items():
+                        print(f"   - {teacher}: {avg}/5")
+                elif choice == '0':
+                    print("Returning to main menu...")
+                    break
                 else:
-                    print("No upcoming events.")
-            elif choice == '14':
-                print("\n⭐ Average Feedback Rating by Course:")
-                for course, avg in self.analytics.get_average_feedback_rating_by_course().items():
-                    print(f"   - {course}: {avg}/5")
-            elif choice == '15':
-                print("\n⭐ Average Feedback Rating by Teacher:")
-                for teacher, avg in self.analytics.get_average_feedback_rating_by_teacher().items():
-                    print(f"   - {teacher}: {avg}/5")
-            elif choice == '0':
-                print("Returning to main menu...")
-                break
-            else:
-                print("❌ Invalid choice. Please try again.")
\ No newline at end of file
+                    print("❌ Invalid choice. Please try again.")
\ No newline at end of file
@@ -0,0 +1,181 @@
+import collections
+import datetime
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+WATERMARK_KEY = "comment_analysis_watermark"
+DEFAULT_CHUNK_SIZE = 2000
+KEYWORD_LIMIT = 5
+
+# Local lexicon: word -> polarity weight. Negators flip the next two words.
+SENTIMENT_LEXICON = {
+    "excellent": 3, "brilliant": 3, "best": 3, "outstanding": 3, "amazing": 3, "inspiring": 3,
+    "great": 2, "good": 2, "helpful": 2, "clear": 2, "engaging": 2, "supportive": 2, "useful": 2,
+    "approachable": 2, "patient": 2, "interesting": 2, "knowledgeable": 2, "organized": 2,
+    "fine": 1, "decent": 1, "okay": 1, "ok": 1, "nice": 1, "friendly": 1,
+    "average": -1, "uneven": -1, "incomplete": -1, "rushed": -1, "slow": -1, "boring": -2,
+    "unclear": -2, "confusing": -2, "poor": -2, "hard": -1, "difficult": -1, "late": -1,
+    "cancelled": -2, "unhelpful": -3, "rude": -3, "terrible": -3, "worst": -3, "useless": -3,
+}
+NEGATORS = {"not", "no", "never", "hardly", "barely", "isnt", "wasnt", "dont", "didnt", "without"}
+INTENSIFIERS = {"very": 1.5, "really": 1.5, "extremely": 2.0, "quite": 1.2, "too": 1.3}
+
+TOPICS = {
+    "teaching": {"teaching", "teacher", "explanations", "explanation", "explains", "lectures", "lecture"},
+    "clarity": {"clear", "unclear", "confusing", "follow", "explanations", "understand"},
+    "pace": {"pace", "rushed", "slow", "fast", "uneven"},
+    "materials": {"notes", "examples", "slides", "materials", "books", "readings"},
+    "assessment": {"assignments", "assignment", "exams", "exam", "grading", "marks", "tests"},
+    "engagement": {"engaging", "boring", "interesting", "inspiring", "classes", "interactive"},
+    "support": {"helpful", "unhelpful", "supportive", "approachable", "patient", "doubt", "questions", "rude"},
+    "attendance": {"cancelled", "late", "absent", "punctual", "missed"},
+}
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "could", "for", "from", "in", "is", "it",
+    "of", "on", "or", "so", "some", "that", "the", "this", "to", "was", "were", "with", "more", "often",
+    "enough", "very", "really", "quite", "too", "not", "no", "course", "semester",
+}
+
+TOKEN_PATTERN = re.compile(r"[a-z]+")
+
+
+def analyze_comment(text):
+    """Score one comment: returns (sentiment, score, topics, keywords)"""
+    tokens = TOKEN_PATTERN.findall((text or "").lower().replace("'", ""))
+    total = 0.0
+    hits = 0
+    negate = 0
+    boost = 1.0
+    for token in tokens:
+        if token in NEGATORS:
+            negate = 2
+            continue
+        if token in INTENSIFIERS:
+            boost = INTENSIFIERS[token]
+            continue
+        weight = SENTIMENT_LEXICON.get(token)
+        if weight is not None:
+            total += -weight * boost if negate else weight * boost
+            hits += 1
+        boost = 1.0
+        negate = max(negate - 1, 0)
+
+    # Normalise to [-1, 1]; 3 is the strongest single-word weight
+    score = round(max(-1.0, min(1.0, total / (3 * hits))), 3) if hits else 0.0
+    sentiment = "positive" if score > 0.2 else "negative" if score < -0.2 else "neutral"
+    words = set(tokens)
+    topics = sorted(topic for topic, keywords in TOPICS.items() if words & keywords)
+    keywords = [word for word, _ in collections.Counter(
+        token for token in tokens if token not in STOPWORDS and len(token) > 2).most_common(KEYWORD_LIMIT)]
+    return sentiment, score, topics, keywords
+
+
+def analyze_chunk(rows):
+    """Worker entry point: analyse a list of (feedback_id, comments) rows"""
+    return [(feedback_id, *analyze_comment(comments)) for feedback_id, comments in rows]
+
+
+class CommentAnalyzer:
+    def __init__(self, db):
+        """Initialize CommentAnalyzer class with database connection"""
+        self.db = db
+
+    def get_watermark(self):
+        """Highest feedback_id already analysed"""
+        row = self.db.fetch_one("SELECT value FROM system_state WHERE key = ?", (WATERMARK_KEY,))
+        return int(row[0]) if row else 0
+
+    def get_pending_count(self):
+        """Feedback rows waiting for analysis: new since the watermark plus edited comments"""
+        new = self.db.fetch_one("SELECT COUNT(*) FROM feedback WHERE feedback_id > ?", (self.get_watermark(),))
+        edited = self.db.fetch_one("SELECT COUNT(*) FROM feedback_tags_pending")
+        return (new[0] if new else 0) + (edited[0] if edited else 0)
+
+    def run(self, workers=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Analyse new and edited comments across a process pool, writing tags back per chunk"""
+        workers = workers or os.cpu_count() or 1
+        started = time.perf_counter()
+        analyzed = 0
+        try:
+            if workers == 1:
+                # No pool: handy for small runs and platforms without fork
+                for rows, advance in self._chunks(chunk_size):
+                    analyzed += self._write(rows, analyze_chunk(rows), advance)
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    in_flight = collections.deque()
+                    for rows, advance in self._chunks(chunk_size):
+                        in_flight.append((rows, advance, pool.submit(analyze_chunk, rows)))
+                        # Keep the pool busy without reading the whole table into memory;
+                        # results are written in order so the watermark only moves forward
+                        while len(in_flight) >= workers * 2:
+                            analyzed += self._write(*self._finish(in_flight.popleft()))
+                    while in_flight:
+                        analyzed += self._write(*self._finish(in_flight.popleft()))
+        except sqlite3.Error as e:
+            print(f"Comment analysis failed: {e}")
+            return None
+
+        seconds = round(time.perf_counter() - started, 2)
+        print(f"Analysed {analyzed} comments in {seconds}s.")
+        return {"analyzed": analyzed, "seconds": seconds, "watermark": self.get_watermark()}
+
+    def _finish(self, item):
+        rows, advance, future = item
+        return rows, future.result(), advance
+
+    def _chunks(self, chunk_size):
+        """Yield (rows, advance_watermark) chunks: edited comments first, then new rows by id"""
+        last_pending = 0
+        while True:
+            rows = self.db.fetch_all("""
+                SELECT f.feedback_id, f.comments FROM feedback_tags_pending p
+                JOIN feedback f ON f.feedback_id = p.feedback_id
+                WHERE p.feedback_id > ? ORDER BY p.feedback_id LIMIT ?
+            """, (last_pending, chunk_size))
+            if not rows:
+                break
+            last_pending = rows[-1][0]
+            yield rows, False
+
+        last_id = self.get_watermark()
+        while True:
+            rows = self.db.fetch_all(
+                "SELECT feedback_id, comments FROM feedback WHERE feedback_id > ? ORDER BY feedback_id LIMIT ?",
+                (last_id, chunk_size))
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            yield rows, True
+
+    def _write(self, rows, results, advance):
+        """Store one chunk's tags in a single transaction, skipping comments edited meanwhile"""
+        analyzed_at = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        analysed_text = dict(rows)
+        with self.db.transaction() as cursor:
+            placeholders = ",".join("?" * len(rows))
+            current = dict(cursor.execute(
+                f"SELECT feedback_id, comments FROM feedback WHERE feedback_id IN ({placeholders})",
+                list(analysed_text)).fetchall())
+            fresh = [r for r in results if r[0] in current and current[r[0]] == analysed_text[r[0]]]
+            ids = [(r[0],) for r in fresh]
+            cursor.executemany("DELETE FROM feedback_topics WHERE feedback_id = ?", ids)
+            cursor.executemany("""
+                INSERT OR REPLACE INTO feedback_tags (feedback_id, sentiment, score, keywords, analyzed_at)
+                VALUES (?, ?, ?, ?, ?)
+            """, [(fid, sentiment, score, ",".join(keywords), analyzed_at)
+                  for fid, sentiment, score, _, keywords in fresh])
+            cursor.executemany("INSERT OR IGNORE INTO feedback_topics (topic, feedback_id) VALUES (?, ?)",
+                               [(topic, r[0]) for r in fresh for topic in r[3]])
+            cursor.executemany("DELETE FROM feedback_tags_pending WHERE feedback_id = ?", ids)
+            if advance:
+                cursor.execute("""
+                    INSERT INTO system_state (key, value) VALUES (?, ?)
+                    ON CONFLICT (key) DO UPDATE SET
+                        value = MAX(CAST(value AS INTEGER), CAST(excluded.value AS INTEGER))
+                """, (WATERMARK_KEY, str(rows[-1][0])))
+        return len(fresh)
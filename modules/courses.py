@@ -1,31 +1,40 @@
-from database import Database
+from database import Database, WriteError
+from modules.integrity import IntegrityManager
+import datetime
+import heapq
+import sqlite3
+
+ENROLLMENT_STATUSES = ("active", "dropped", "completed")
 
 class Course:
     def __init__(self, db):
         """Initialize Course class with database connection"""
         self.db = db
+        # Prerequisite graph cache, valid while prerequisites_version is unchanged
+        self._graph_version = None
+        self._direct = {}
+        self._order = []
+        self._position = {}
+        self._direct_bits = {}
+        self._closure_bits = {}
 
     def add_course(self, title, description, duration):
-        """Add a new course"""
-        # Check if course already exists
-        existing = self.db.fetch_one("SELECT course_id FROM courses WHERE title = ?", (title,))
-        if existing:
-            print(f"Error: Course '{title}' already exists.")
-            return False
-
-        query = "INSERT INTO courses (title, description, duration) VALUES (?, ?, ?)"
-        if self.db.execute_query(query, (title, description, duration)):
+        """Add a new course; returns the created record, or a WriteError if the title is taken"""
+        # The unique index on title is the duplicate check
+        query = """
+        INSERT INTO courses (title, description, duration) VALUES (?, ?, ?)
+        ON CONFLICT (title) DO NOTHING
+        RETURNING course_id, title, description, duration
+        """
+        course = self.db.execute_returning(query, (title, description, duration))
+        if course is None:
+            return WriteError("duplicate", f"Course '{title}' already exists.").report()
+        if course:
             print(f"Course '{title}' added successfully.")
-            return True
-        return False
+        return course
 
     def update_course(self, course_id, title=None, description=None, duration=None):
-        """Update course details"""
-        existing = self.db.fetch_one("SELECT * FROM courses WHERE course_id = ?", (course_id,))
-        if not existing:
-            print(f"Error: Course with ID {course_id} does not exist.")
-            return False
-
+        """Update course details; returns the updated record or a WriteError"""
         updates = {}
         if title:
             updates['title'] = title
@@ -36,30 +45,30 @@ class Course:
 
 
         if not updates:
-            print("No valid fields to update.")
-            return False
+            return WriteError("invalid", "No valid fields to update.").report()
 
+        # No matching row means the course does not exist; a taken title fails the unique index
         set_clause = ", ".join([f"{field} = ?" for field in updates.keys()])
-        query = f"UPDATE courses SET {set_clause} WHERE course_id = ?"
+        query = (f"UPDATE courses SET {set_clause} WHERE course_id = ? "
+                 "RETURNING course_id, title, description, duration")
         params = list(updates.values()) + [course_id]
 
-        if self.db.execute_query(query, tuple(params)):
+        course = self.db.execute_returning(query, tuple(params))
+        if course is None:
+            return WriteError("not_found", f"Course with ID {course_id} does not exist.").report()
+        if course:
             print(f"Course ID {course_id} updated successfully.")
-            return True
-        return False
+        return course
 
-    def delete_course(self, course_id):
-        """Delete a course"""
-        existing = self.db.fetch_one("SELECT * FROM courses WHERE course_id = ?", (course_id,))
-        if not existing:
-            print(f"Error: Course with ID {course_id} does not exist.")
+    def delete_course(self, course_id, policies=None):
+        """Delete a course; refused while students are enrolled unless the policies say otherwise"""
+        report = IntegrityManager(self.db).delete("courses", [course_id], policies)
+        if report is None:
             return False
-
-        query = "DELETE FROM courses WHERE course_id = ?"
-        if self.db.execute_query(query, (course_id,)):
-            print(f"Course ID {course_id} deleted successfully.")
-            return True
-        return False
+        if report["missing"]:
+            return WriteError("not_found", f"Course with ID {course_id} does not exist.").report()
+        print(f"Course ID {course_id} deleted successfully.")
+        return True
 
     def get_course(self, course_id):
         """Retrieve course details by ID"""
@@ -85,6 +94,249 @@ class Course:
         query = "SELECT * FROM courses ORDER BY course_id"
         return self.db.fetch_all(query)
 
+    def get_roster(self, course_id, status="active"):
+        """List the students enrolled in a course (all statuses when status is None)"""
+        query = """
+        SELECT s.student_id, s.name, s.email, e.status, e.enrolled_on
+        FROM enrollments e
+        JOIN students s ON s.student_id = e.student_id
+        WHERE e.course_id = ?
+        """
+        params = [course_id]
+        if status:
+            query += " AND e.status = ?"
+            params.append(status)
+        return self.db.fetch_all(query + " ORDER BY s.name", tuple(params))
+
+    def enroll_student(self, student_id, course_id):
+        """Enroll a student in a course, re-activating a dropped or completed enrollment"""
+        if not self.db.fetch_one("SELECT student_id FROM students WHERE student_id = ?", (student_id,)):
+            print(f"Error: Student with ID {student_id} does not exist.")
+            return False
+        if not self.db.fetch_one("SELECT course_id FROM courses WHERE course_id = ?", (course_id,)):
+            print(f"Error: Course with ID {course_id} does not exist.")
+            return False
+        existing = self.db.fetch_one("SELECT status FROM enrollments WHERE student_id = ? AND course_id = ?",
+                                     (student_id, course_id))
+        if existing and existing[0] == "active":
+            print(f"Student ID {student_id} is already enrolled in course ID {course_id}.")
+            return False
+
+        today = datetime.datetime.now().strftime("%Y-%m-%d")
+        query = """
+        INSERT INTO enrollments (student_id, course_id, status, enrolled_on, updated_on)
+        VALUES (?, ?, 'active', ?, ?)
+        ON CONFLICT (student_id, course_id) DO UPDATE SET status = 'active', updated_on = excluded.updated_on
+        """
+        if self.db.execute_query(query, (student_id, course_id, today, today)):
+            print(f"Student ID {student_id} enrolled in course ID {course_id}.")
+            return True
+        return False
+
+    def drop_student(self, student_id, course_id):
+        """Mark an active enrollment as dropped"""
+        return self._set_enrollment_status(student_id, course_id, "dropped")
+
+    def complete_enrollment(self, student_id, course_id):
+        """Mark an active enrollment as completed"""
+        return self._set_enrollment_status(student_id, course_id, "completed")
+
+    def _set_enrollment_status(self, student_id, course_id, status):
+        existing = self.db.fetch_one("SELECT status FROM enrollments WHERE student_id = ? AND course_id = ?",
+                                     (student_id, course_id))
+        if not existing or existing[0] != "active":
+            print(f"Error: Student ID {student_id} has no active enrollment in course ID {course_id}.")
+            return False
+
+        today = datetime.datetime.now().strftime("%Y-%m-%d")
+        query = "UPDATE enrollments SET status = ?, updated_on = ? WHERE student_id = ? AND course_id = ?"
+        if self.db.execute_query(query, (status, today, student_id, course_id)):
+            print(f"Enrollment of student ID {student_id} in course ID {course_id} marked {status}.")
+            return True
+        return False
+
+    def get_enrollment_history(self, student_id, course_id=None):
+        """List every status change of a student's enrollments, oldest first"""
+        query = """
+        SELECT h.course_id, c.title, h.status, h.changed_on
+        FROM enrollment_history h
+        JOIN courses c ON c.course_id = h.course_id
+        WHERE h.student_id = ?
+        """
+        params = [student_id]
+        if course_id is not None:
+            query += " AND h.course_id = ?"
+            params.append(course_id)
+        return self.db.fetch_all(query + " ORDER BY h.history_id", tuple(params))
+
+    def add_prerequisite(self, course_id, prerequisite_id):
+        """Make prerequisite_id a prerequisite of course_id, refusing edges that would form a cycle"""
+        if course_id == prerequisite_id:
+            print("Error: A course cannot be its own prerequisite.")
+            return False
+        for cid in (course_id, prerequisite_id):
+            if not self.db.fetch_one("SELECT course_id FROM courses WHERE course_id = ?", (cid,)):
+                print(f"Error: Course with ID {cid} does not exist.")
+                return False
+        try:
+            with self.db.transaction() as cursor:
+                # Hold the write lock so the cycle check sees the latest edges
+                cursor.execute("BEGIN IMMEDIATE")
+                self._load_graph()
+                if self._requires(prerequisite_id, course_id):
+                    print(f"Error: Course ID {prerequisite_id} already requires course ID {course_id}; "
+                          "this prerequisite would create a cycle.")
+                    return False
+                cursor.execute("INSERT OR IGNORE INTO course_prerequisites (course_id, prerequisite_id) VALUES (?, ?)",
+                               (course_id, prerequisite_id))
+                added = cursor.rowcount
+        except sqlite3.Error as e:
+            print(f"Error adding prerequisite: {e}")
+            return False
+        if not added:
+            print(f"Course ID {prerequisite_id} is already a prerequisite of course ID {course_id}.")
+            return False
+        print(f"Course ID {prerequisite_id} is now a prerequisite of course ID {course_id}.")
+        return True
+
+    def remove_prerequisite(self, course_id, prerequisite_id):
+        """Remove a direct prerequisite edge"""
+        existing = self.db.fetch_one(
+            "SELECT 1 FROM course_prerequisites WHERE course_id = ? AND prerequisite_id = ?",
+            (course_id, prerequisite_id))
+        if not existing:
+            print(f"Error: Course ID {prerequisite_id} is not a prerequisite of course ID {course_id}.")
+            return False
+        query = "DELETE FROM course_prerequisites WHERE course_id = ? AND prerequisite_id = ?"
+        if self.db.execute_query(query, (course_id, prerequisite_id)):
+            print(f"Prerequisite removed from course ID {course_id}.")
+            return True
+        return False
+
+    def get_prerequisites(self, course_id, transitive=False):
+        """List (course_id, title) of a course's prerequisites; transitive ones in study order"""
+        self._load_graph()
+        if transitive:
+            ids = self._bits_to_ids(self._closure_bits.get(course_id, 0))
+        else:
+            ids = sorted(self._direct.get(course_id, ()), key=self._position.get)
+        return self._with_titles(ids)
+
+    def get_study_plan(self, course_id, student_id=None):
+        """Every course needed to reach course_id, in a valid order, skipping ones the student completed"""
+        self._load_graph()
+        ids = self._bits_to_ids(self._closure_bits.get(course_id, 0)) + [course_id]
+        if student_id is not None:
+            completed = self._student_courses(student_id, "completed")
+            ids = [cid for cid in ids if cid not in completed]
+        return self._with_titles(ids)
+
+    def get_course_order(self):
+        """All courses in an order where each comes after its prerequisites"""
+        self._load_graph()
+        constrained = set(self._position)
+        free = [row[0] for row in self.db.fetch_all("SELECT course_id FROM courses ORDER BY course_id")
+                if row[0] not in constrained]
+        return self._with_titles(self._order + free)
+
+    def eligible_courses(self, student_id):
+        """Courses the student can take next: every direct prerequisite completed, not already taken"""
+        if not self.db.fetch_one("SELECT student_id FROM students WHERE student_id = ?", (student_id,)):
+            print(f"Error: Student with ID {student_id} does not exist.")
+            return []
+        self._load_graph()
+        completed = self._student_courses(student_id, "completed")
+        taking = self._student_courses(student_id, "active")
+        completed_bits = 0
+        for cid in completed:
+            if cid in self._position:
+                completed_bits |= 1 << self._position[cid]
+        eligible = []
+        for cid, title in self.db.fetch_all("SELECT course_id, title FROM courses ORDER BY course_id"):
+            if cid in completed or cid in taking:
+                continue
+            if self._direct_bits.get(cid, 0) & ~completed_bits == 0:
+                eligible.append((cid, title))
+        return eligible
+
+    def _student_courses(self, student_id, status):
+        rows = self.db.fetch_all("SELECT course_id FROM enrollments WHERE student_id = ? AND status = ?",
+                                 (student_id, status))
+        return {row[0] for row in rows}
+
+    def _load_graph(self):
+        """Rebuild the cached closure and ordering when the prerequisite edges changed"""
+        row = self.db.fetch_one("SELECT value FROM system_state WHERE key = 'prerequisites_version'")
+        version = int(row[0]) if row else 0
+        if version == self._graph_version:
+            return
+
+        direct = {}
+        dependants = {}
+        for course_id, prerequisite_id in self.db.fetch_all(
+                "SELECT course_id, prerequisite_id FROM course_prerequisites"):
+            direct.setdefault(course_id, set()).add(prerequisite_id)
+            dependants.setdefault(prerequisite_id, []).append(course_id)
+
+        # Kahn's algorithm, lowest course_id first among the ready courses
+        nodes = set(direct) | set(dependants)
+        waiting = {node: len(direct.get(node, ())) for node in nodes}
+        ready = [node for node, count in waiting.items() if count == 0]
+        heapq.heapify(ready)
+        order = []
+        while ready:
+            node = heapq.heappop(ready)
+            order.append(node)
+            for dependant in dependants.get(node, ()):
+                waiting[dependant] -= 1
+                if waiting[dependant] == 0:
+                    heapq.heappush(ready, dependant)
+        if len(order) != len(nodes):
+            # Only possible if edges were written around add_prerequisite
+            print("Warning: Prerequisite cycle detected; courses on it are left out of the ordering.")
+
+        # Closures as bitsets over positions in the ordering
+        position = {node: i for i, node in enumerate(order)}
+        direct_bits = {}
+        closure_bits = {}
+        for node in order:
+            bits = closure = 0
+            for prerequisite_id in direct.get(node, ()):
+                bits |= 1 << position[prerequisite_id]
+                closure |= closure_bits[prerequisite_id]
+            direct_bits[node] = bits
+            closure_bits[node] = closure | bits
+
+        self._direct, self._order, self._position = direct, order, position
+        self._direct_bits, self._closure_bits = direct_bits, closure_bits
+        self._graph_version = version
+
+    def _requires(self, course_id, other_id):
+        """Whether other_id is among course_id's transitive prerequisites"""
+        if course_id not in self._position or other_id not in self._position:
+            return False
+        return bool(self._closure_bits[course_id] >> self._position[other_id] & 1)
+
+    def _bits_to_ids(self, bits):
+        ids = []
+        while bits:
+            low = bits & -bits
+            ids.append(self._order[low.bit_length() - 1])
+            bits ^= low
+        return ids
+
+    def _with_titles(self, ids):
+        if not ids:
+            return []
+        titles = {}
+        # Stay well under SQLite's bound-parameter limit
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            titles.update(self.db.fetch_all(
+                f"SELECT course_id, title FROM courses WHERE course_id IN ({','.join('?' * len(chunk))})",
+                tuple(chunk)))
+        return [(cid, titles.get(cid)) for cid in ids]
+
     def display_course(self, course):
         """Display a single course in formatted output"""
         if not course:
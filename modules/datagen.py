@@ -0,0 +1,353 @@
+from database import Database, JOURNALED_TABLES, RATING_STATS_REBUILD, journal_triggers
+from modules.journal import ChangeJournal
+from modules.rollups import Rollups
+import datetime
+import itertools
+import random
+import time
+
+# Row counts per table for the named scales
+SCALES = {
+    "tiny": {"courses": 20, "students": 500, "teachers": 40, "administrators": 5, "books": 1000,
+             "book_issues": 5000, "events": 100, "feedback": 2500},
+    "small": {"courses": 60, "students": 5000, "teachers": 250, "administrators": 20, "books": 10000,
+              "book_issues": 100000, "events": 1000, "feedback": 50000},
+    "medium": {"courses": 150, "students": 25000, "teachers": 1250, "administrators": 50, "books": 50000,
+               "book_issues": 500000, "events": 5000, "feedback": 250000},
+    "full": {"courses": 300, "students": 100000, "teachers": 5000, "administrators": 200, "books": 200000,
+             "book_issues": 2000000, "events": 20000, "feedback": 1000000},
+}
+
+BATCH_SIZE = 50000
+# Tables loaded with their row triggers and secondary indexes suspended
+BULK_TABLES = ("book_issues", "feedback")
+
+FIRST_NAMES = ["Aarav", "Aisha", "Arjun", "Ananya", "Bilal", "Chen", "Daniel", "Deepa", "Elena", "Farhan",
+               "Fatima", "Gabriel", "Hana", "Imran", "Isha", "James", "Kabir", "Kavya", "Lucas", "Maya",
+               "Mohammed", "Nadia", "Noah", "Olivia", "Omar", "Priya", "Rahul", "Riya", "Sara", "Tariq",
+               "Uma", "Vikram", "Wei", "Yusuf", "Zara", "Zoya"]
+LAST_NAMES = ["Ahmed", "Bhat", "Chopra", "Dar", "Fernandes", "Gupta", "Hussain", "Iyer", "Joshi", "Khan",
+              "Lone", "Malik", "Nair", "Patel", "Qureshi", "Rao", "Shah", "Sharma", "Singh", "Wani",
+              "Yadav", "Zargar", "Mir", "Kaul", "Reddy", "Das", "Menon", "Pillai"]
+SUBJECTS = ["Computer Science", "Mathematics", "Physics", "Chemistry", "Biology", "Economics",
+            "Commerce", "English Literature", "History", "Political Science", "Psychology",
+            "Statistics", "Electronics", "Data Science", "Business Administration", "Journalism"]
+LEVELS = ["Foundations of", "Introduction to", "Advanced", "Applied", "Topics in", "Seminar in"]
+DEPARTMENTS = ["Computer Science", "Mathematics", "Physics", "Chemistry", "Biology", "Commerce",
+               "Humanities", "Social Sciences", "Management", "Languages"]
+QUALIFICATIONS = ["PhD", "MPhil", "M.Tech", "M.Sc", "MA", "MBA", "NET"]
+POSITIONS = ["Registrar", "Dean", "Accounts Officer", "Exam Controller", "Librarian", "Office Superintendent"]
+PUBLISHERS = ["Pearson", "McGraw Hill", "Oxford University Press", "Cambridge University Press",
+              "Springer", "Wiley", "PHI Learning", "S. Chand", "O'Reilly", "Elsevier"]
+TITLE_WORDS = ["Principles", "Fundamentals", "Handbook", "Theory", "Practice", "Methods", "Systems",
+               "Analysis", "Design", "Concepts", "Essentials", "Modern", "Elements", "Guide"]
+VENUES = ["Main Auditorium", "Seminar Hall A", "Seminar Hall B", "Conference Room", "Sports Ground",
+          "Library Hall", "Lab Complex", "Open Air Theatre", "Room 101", "Room 204", "Indoor Stadium",
+          "Cafeteria Lawn", "Media Centre", "Innovation Hub", "Chapel"]
+EVENT_KINDS = ["Workshop", "Seminar", "Hackathon", "Guest Lecture", "Cultural Fest", "Sports Meet",
+               "Quiz", "Debate", "Career Fair", "Alumni Meet", "Exhibition", "Symposium"]
+TIMES = ["09:00", "10:00", "11:00", "12:00", "14:00", "15:00", "16:00", "17:00", "18:00"]
+COMMENTS = {
+    1: ["Very poor teaching, hard to follow", "Classes were often cancelled and confusing",
+        "Rude and unhelpful in doubt sessions"],
+    2: ["Lectures were boring and rushed", "Not enough examples, assignments unclear",
+        "Could be more patient with questions"],
+    3: ["Average course, some topics were fine", "Okay teaching but notes were incomplete",
+        "Decent but the pace was uneven"],
+    4: ["Good explanations and helpful notes", "Clear lectures, assignments were useful",
+        "Engaging classes, approachable teacher"],
+    5: ["Excellent teacher, very inspiring", "Brilliant explanations and great examples",
+        "Best course this semester, very supportive"],
+}
+
+
+def zipf_cum_weights(n, s):
+    """Cumulative Zipf weights for ranks 1..n, for random.choices"""
+    return list(itertools.accumulate(1.0 / (rank ** s) for rank in range(1, n + 1)))
+
+
+class DataGenerator:
+    def __init__(self, db, seed=42, anchor=None, years=5):
+        """Initialize DataGenerator with database connection and random seed"""
+        self.db = db
+        self.rng = random.Random(seed)
+        self.anchor = anchor or datetime.date.today()
+        self.start = self.anchor - datetime.timedelta(days=365 * years)
+        self.span_days = (self.anchor - self.start).days
+        self.dates = {}
+
+    def generate(self, scale="small", **overrides):
+        """Fill every table at the given scale and return the row counts and timings"""
+        counts = dict(SCALES[scale])
+        counts.update({table: n for table, n in overrides.items() if n is not None})
+
+        existing = self.db.fetch_one("SELECT COUNT(*) FROM students")
+        if existing and existing[0]:
+            print("Error: The database already contains students; generate into an empty database.")
+            return None
+
+        # Bulk-load settings; a crash mid-build just means rebuilding the file.
+        # The file's own settings are put back afterwards.
+        journal_mode = self.db.fetch_one("PRAGMA journal_mode")[0]
+        synchronous = self.db.fetch_one("PRAGMA synchronous")[0]
+        cache_size = self.db.fetch_one("PRAGMA cache_size")[0]
+        self.db.cursor.execute("PRAGMA synchronous = OFF")
+        self.db.cursor.execute("PRAGMA journal_mode = MEMORY")
+        self.db.cursor.execute("PRAGMA cache_size = -200000")
+        try:
+            return self._load(counts)
+        finally:
+            self.db.cursor.execute(f"PRAGMA journal_mode = {journal_mode}")
+            self.db.cursor.execute(f"PRAGMA synchronous = {synchronous}")
+            self.db.cursor.execute(f"PRAGMA cache_size = {cache_size}")
+
+    def _load(self, counts):
+        """Run the generation steps with the per-row triggers and indexes of the big tables suspended"""
+        # Generated rows are consistent by construction and are not journaled one
+        # by one: consumers start from the baseline seq recorded after the load
+        self.db.cursor.execute("PRAGMA foreign_keys = OFF")
+        # The rating, rollup and tagging triggers and the secondary indexes of
+        # the bulk tables would otherwise run per row; they are recreated, and
+        # the aggregates rebuilt, in one pass each after the load
+        deferred = self.db.fetch_all(f"""
+            SELECT type, name, sql FROM sqlite_master
+            WHERE type IN ('trigger', 'index') AND sql IS NOT NULL AND name NOT LIKE 'journal_%'
+              AND tbl_name IN ({', '.join('?' * len(BULK_TABLES))})
+        """, BULK_TABLES)
+        with self.db.transaction() as cursor:
+            for table in JOURNALED_TABLES:
+                for operation in ("insert", "update", "delete"):
+                    cursor.execute(f"DROP TRIGGER IF EXISTS journal_{table}_{operation}")
+            for kind, name, _ in deferred:
+                cursor.execute(f"DROP {kind.upper()} {name}")
+
+        timings = {}
+        steps = [
+            ("courses", self._courses), ("students", self._students), ("teachers", self._teachers),
+            ("administrators", self._administrators), ("books", self._books),
+            ("book_issues", self._book_issues), ("events", self._events), ("feedback", self._feedback),
+        ]
+        try:
+            for table, step in steps:
+                started = time.perf_counter()
+                step(counts)
+                timings[table] = round(time.perf_counter() - started, 2)
+                print(f"Generated {counts[table]} {table} in {timings[table]}s")
+        finally:
+            started = time.perf_counter()
+            with self.db.transaction() as cursor:
+                for _, _, statement in deferred:
+                    cursor.execute(statement)
+                for table, key in (("teacher_rating_stats", "teacher_id"), ("course_rating_stats", "course")):
+                    cursor.execute(f"DELETE FROM {table}")
+                    cursor.execute(RATING_STATS_REBUILD.format(table=table, key=key, source="feedback",
+                                                               condition=""))
+                for table in JOURNALED_TABLES:
+                    for statement in journal_triggers(table):
+                        cursor.execute(statement)
+            self.db.cursor.execute("PRAGMA foreign_keys = ON")
+        baseline = ChangeJournal(self.db).record_baseline()
+        # Roll the generated history up now, so the first trend read does not scan it
+        Rollups(self.db).refresh()
+        timings["indexes"] = round(time.perf_counter() - started, 2)
+        print(f"Rebuilt indexes and aggregates in {timings['indexes']}s")
+        return {"anchor": self.anchor.isoformat(), "rows": counts, "seconds": timings, "journal_baseline": baseline}
+
+    def _insert(self, query, rows):
+        """Insert rows in large batches inside one transaction"""
+        with self.db.transaction() as cursor:
+            while True:
+                batch = list(itertools.islice(rows, BATCH_SIZE))
+                if not batch:
+                    break
+                cursor.executemany(query, batch)
+
+    def _date(self, day_offset):
+        # Hundreds of thousands of rows share a few thousand days: format each once
+        date = self.dates.get(day_offset)
+        if date is None:
+            date = self.dates[day_offset] = (self.start + datetime.timedelta(days=day_offset)).isoformat()
+        return date
+
+    def _enrollment_offset(self):
+        """Day offset biased towards the July-September admission season"""
+        year = self.rng.randrange(self.span_days // 365 + 1)
+        if self.rng.random() < 0.7:
+            day_of_year = self.rng.randint(181, 273)
+        else:
+            day_of_year = self.rng.randint(0, 364)
+        offset = year * 365 + day_of_year - self.start.timetuple().tm_yday
+        return min(max(offset, 0), self.span_days)
+
+    def _person_name(self):
+        return f"{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}"
+
+    def _courses(self, counts):
+        titles = [f"{level} {subject}" for subject in SUBJECTS for level in LEVELS]
+        self.rng.shuffle(titles)
+        rows = []
+        for i in range(counts["courses"]):
+            title = titles[i % len(titles)] + (f" {i // len(titles) + 1}" if i >= len(titles) else "")
+            rows.append((title, f"{title} course", f"{self.rng.choice([1, 2, 3, 4])} semesters"))
+        self.course_titles = [row[0] for row in rows]
+        self._insert("INSERT INTO courses (title, description, duration) VALUES (?, ?, ?)", iter(rows))
+
+    def _students(self, counts):
+        n = counts["students"]
+        # Skewed course popularity: a few courses hold most of the students
+        course_weights = zipf_cum_weights(len(self.course_titles), 1.1)
+        courses = self.rng.choices(self.course_titles, cum_weights=course_weights, k=n)
+        genders = self.rng.choices(["Male", "Female", "Other"], weights=[49, 49, 2], k=n)
+        rng = self.rng
+
+        def rows():
+            for i in range(n):
+                offset = self._enrollment_offset()
+                semester = min(8, 1 + (self.span_days - offset) // 182)
+                name = self._person_name()
+                email = f"{name.lower().replace(' ', '.')}.{i + 1}@students.example.edu"
+                yield (name, rng.randint(17, 19) + semester // 2, genders[i], f"9{rng.randrange(10 ** 9):09d}",
+                       email, f"{rng.randint(1, 999)} {rng.choice(LAST_NAMES)} Road", courses[i],
+                       self._date(offset), semester)
+
+        self._insert("""
+        INSERT INTO students (name, age, gender, contact, email, address, course, enrollment_date, semester)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, rows())
+
+    def _teachers(self, counts):
+        n = counts["teachers"]
+        department_weights = zipf_cum_weights(len(DEPARTMENTS), 0.8)
+        departments = self.rng.choices(DEPARTMENTS, cum_weights=department_weights, k=n)
+        rng = self.rng
+
+        def rows():
+            for i in range(n):
+                name = self._person_name()
+                joined = self.anchor - datetime.timedelta(days=rng.randint(30, 365 * 20))
+                yield (name, rng.choice(["Male", "Female"]), f"8{rng.randrange(10 ** 9):09d}",
+                       f"{name.lower().replace(' ', '.')}.{i + 1}@faculty.example.edu", departments[i],
+                       rng.choice(QUALIFICATIONS), joined.isoformat())
+
+        self._insert("""
+        INSERT INTO teachers (name, gender, contact, email, department, qualification, date_joined)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, rows())
+
+    def _administrators(self, counts):
+        rng = self.rng
+        rows = ((self._person_name(), f"7{rng.randrange(10 ** 9):09d}", f"admin{i + 1}@example.edu",
+                 rng.choice(POSITIONS), rng.choice(DEPARTMENTS)) for i in range(counts["administrators"]))
+        self._insert("""
+        INSERT INTO administrators (name, contact, email, position, department) VALUES (?, ?, ?, ?, ?)
+        """, rows)
+
+    def _books(self, counts):
+        n = counts["books"]
+        rng = self.rng
+        # available_copies is corrected after issues are generated
+        self.book_copies = [min(10, 1 + int(rng.expovariate(0.5))) for _ in range(n)]
+
+        def rows():
+            for i in range(n):
+                title = f"{rng.choice(TITLE_WORDS)} of {rng.choice(SUBJECTS)}"
+                if i >= len(TITLE_WORDS) * len(SUBJECTS):
+                    title += f", Vol. {rng.randint(1, 5)}"
+                yield (title, self._person_name(), f"978{i + 1:010d}", rng.choice(PUBLISHERS),
+                       self.anchor.year - int(rng.expovariate(0.08)), self.book_copies[i], self.book_copies[i])
+
+        self._insert("""
+        INSERT INTO books (title, author, isbn, publisher, year_published, total_copies, available_copies)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, rows())
+
+    def _book_issues(self, counts):
+        n = counts["book_issues"]
+        n_books = counts["books"]
+        n_students = counts["students"]
+        rng = self.rng
+        # Zipfian borrowing: shuffle ranks so popular books are spread over IDs
+        popularity = list(range(1, n_books + 1))
+        rng.shuffle(popularity)
+        book_ids = rng.choices(popularity, cum_weights=zipf_cum_weights(n_books, 1.0), k=n)
+        outstanding = [0] * (n_books + 1)
+        today = self.span_days
+
+        def rows():
+            for i in range(n):
+                book_id = book_ids[i]
+                student_id = rng.randint(1, n_students)
+                offset = rng.randint(0, today)
+                due = offset + 14
+                # Recent issues may still be out, as long as copies remain
+                if today - offset < 30 and rng.random() < 0.6 and outstanding[book_id] < self.book_copies[book_id - 1]:
+                    outstanding[book_id] += 1
+                    yield (book_id, student_id, self._date(offset), self._date(due), None, 0, "issued")
+                    continue
+                returned = min(offset + max(1, int(rng.gauss(12, 6))), today)
+                fine = max(0, returned - due) * 2
+                yield (book_id, student_id, self._date(offset), self._date(due), self._date(returned),
+                       fine, "returned")
+
+        self._insert("""
+        INSERT INTO book_issues (book_id, student_id, issue_date, return_date, actual_return_date, fine_amount, status)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, rows())
+        with self.db.transaction() as cursor:
+            cursor.executemany("UPDATE books SET available_copies = total_copies - ? WHERE book_id = ?",
+                               ((count, book_id) for book_id, count in enumerate(outstanding) if count))
+
+    def _events(self, counts):
+        rng = self.rng
+        venue_weights = zipf_cum_weights(len(VENUES), 0.9)
+        today = self.span_days
+
+        def rows():
+            for i in range(counts["events"]):
+                # Mostly historical, with a tail scheduled over the next six months
+                offset = rng.randint(0, today + 180)
+                if offset < today:
+                    status = "cancelled" if rng.random() < 0.05 else "completed"
+                elif offset == today:
+                    status = "ongoing"
+                else:
+                    status = "upcoming"
+                kind = rng.choice(EVENT_KINDS)
+                subject = rng.choice(SUBJECTS)
+                yield (f"{subject} {kind}", f"{kind} organised by the {subject} department",
+                       self._date(offset), rng.choice(TIMES),
+                       rng.choices(VENUES, cum_weights=venue_weights)[0], f"{subject} Society", status)
+
+        self._insert("""
+        INSERT INTO events (name, description, date, time, venue, organizer, status)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, rows())
+
+    def _feedback(self, counts):
+        n = counts["feedback"]
+        n_students = counts["students"]
+        n_teachers = counts["teachers"]
+        rng = self.rng
+        teacher_quality = [min(4.8, max(1.8, rng.gauss(3.7, 0.6))) for _ in range(n_teachers)]
+        course_weights = zipf_cum_weights(len(self.course_titles), 1.1)
+        seen = set()
+
+        def rows():
+            produced = 0
+            while produced < n:
+                student_id = rng.randint(1, n_students)
+                teacher_id = rng.randint(1, n_teachers)
+                course = rng.choices(self.course_titles, cum_weights=course_weights)[0]
+                key = (student_id, teacher_id, course)
+                if key in seen:
+                    continue
+                seen.add(key)
+                rating = min(5, max(1, round(rng.gauss(teacher_quality[teacher_id - 1], 0.9))))
+                produced += 1
+                yield (student_id, teacher_id, course, rating, rng.choice(COMMENTS[rating]),
+                       self._date(rng.randint(0, self.span_days)))
+
+        self._insert("""
+        INSERT INTO feedback (student_id, teacher_id, course, rating, comments, date_submitted)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """, rows())
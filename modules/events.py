@@ -1,35 +1,160 @@
-from database import Database
+from database import Database, WriteError
+from modules.archive import tiered
+from modules.integrity import IntegrityManager
+from modules.metrics import EVENT_REGISTRATIONS
+from modules.write_queue import WriteRejected, cancel_registration, promote_waitlist, register_for_event
 import datetime
+import heapq
+import sqlite3
+import threading
+
+EVENT_COLUMNS = ["event_id", "name", "description", "date", "time", "venue", "organizer", "status",
+                 "start_at", "end_at", "capacity", "seats_available"]
+REGISTRATION_COLUMNS = ["registration_id", "student_id", "name", "status", "priority", "registered_at"]
+CONFLICT_POLICIES = ("reject", "flag")
+DEFAULT_DURATION = datetime.timedelta(hours=2)
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M"
+
+# Recurring series (event_series) are expanded into occurrences on read and
+# never stored as events rows. Unbounded series are expanded this far ahead
+# when no end date is asked for.
+FREQUENCIES = ("daily", "weekly", "monthly")
+SERIES_COLUMNS = ["series_id", "name", "description", "venue", "organizer", "start_date", "time",
+                  "duration_minutes", "frequency", "every", "weekdays", "until", "count", "status"]
+OVERRIDE_FIELDS = ["name", "description", "date", "time", "duration_minutes", "venue", "organizer", "status"]
+SERIES_HORIZON = datetime.timedelta(days=180)
+
+
+
+class EventStatusScheduler:
+    def __init__(self, db):
+        """Initialize EventStatusScheduler class with database connection"""
+        self.db = db
+        # Earliest pending start_at/end_at (None: nothing pending), valid while
+        # the database is unchanged since it was read
+        self.next_due = None
+        self.seen = None
+
+    def apply_due(self, now=None):
+        """Move events upcoming -> ongoing -> completed as their start and end pass; free when nothing is due"""
+        now = now or datetime.datetime.now().strftime(TIMESTAMP_FORMAT)
+        if self._version() != self.seen:
+            # Some connection wrote since next_due was read: re-read it (indexed MINs)
+            row = self.db.fetch_one("""
+                SELECT MIN(due) FROM (
+                    SELECT MIN(start_at) AS due FROM events WHERE status = 'upcoming'
+                    UNION ALL
+                    SELECT MIN(end_at) FROM events WHERE status IN ('upcoming', 'ongoing')
+                )
+            """)
+            self.next_due = row[0] if row else None
+            self.seen = self._version()
+        if self.next_due is None or now < self.next_due:
+            return 0
+        try:
+            with self.db.transaction() as cursor:
+                cursor.execute("UPDATE events SET status = 'completed' "
+                               "WHERE status IN ('upcoming', 'ongoing') AND end_at <= ?", (now,))
+                changed = cursor.rowcount
+                cursor.execute("UPDATE events SET status = 'ongoing' WHERE status = 'upcoming' AND start_at <= ?",
+                               (now,))
+                changed += cursor.rowcount
+        except sqlite3.Error as e:
+            print(f"Error updating event statuses: {e}")
+            return None
+        # Forces a re-read of next_due on the next call
+        self.seen = None
+        return changed
+
+    def seconds_until_due(self):
+        """Seconds until the next transition, or None when nothing is pending"""
+        if self.next_due is None:
+            return None
+        due = datetime.datetime.strptime(self.next_due, TIMESTAMP_FORMAT)
+        return max((due - datetime.datetime.now()).total_seconds(), 0.0)
+
+    def _version(self):
+        """Changes by this connection plus PRAGMA data_version, which moves on other connections' commits"""
+        row = self.db.fetch_one("PRAGMA data_version")
+        return self.db.conn.total_changes, row[0] if row else None
+
+
+class EventStatusThread:
+    def __init__(self, db_name="college_management.db", max_sleep=60.0):
+        """Keep event statuses current from a daemon thread, waking when the next transition is due"""
+        self.db_name = db_name
+        self.max_sleep = max_sleep
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="cms-event-status", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+
+    def _run(self):
+        db = Database(self.db_name)
+        scheduler = EventStatusScheduler(db)
+        try:
+            while True:
+                scheduler.apply_due()
+                # New events are noticed within max_sleep; due ones on the minute
+                wait = scheduler.seconds_until_due()
+                wait = self.max_sleep if wait is None else min(max(wait, 1.0), self.max_sleep)
+                if self.stopped.wait(wait):
+                    break
+        finally:
+            db.close()
+
 
 class Event:
     def __init__(self, db):
         """Initialize Event class with database connection"""
         self.db = db
+        self.scheduler = EventStatusScheduler(db)
     
-    def add_event(self, name, description, date, time, venue, organizer):
-        """Add a new event to the database"""
+    def add_event(self, name, description, date, time, venue, organizer, end_time=None, on_conflict="reject",
+                  capacity=None):
+        """Add a new event to the database, refusing (or flagging) a venue double booking"""
         # Validate date format (YYYY-MM-DD)
         try:
             datetime.datetime.strptime(date, "%Y-%m-%d")
         except ValueError:
             print("Error: Date must be in YYYY-MM-DD format.")
             return False
+        interval = self._interval(date, time, end_time)
+        if interval is None:
+            return False
+        if capacity is not None and capacity < 0:
+            print("Error: Capacity cannot be negative.")
+            return False
             
         # Default status is 'upcoming'
         query = """
-        INSERT INTO events (name, description, date, time, venue, organizer, status)
-        VALUES (?, ?, ?, ?, ?, ?, 'upcoming')
+        INSERT INTO events (name, description, date, time, venue, organizer, status, start_at, end_at,
+                            capacity, seats_available)
+        VALUES (?, ?, ?, ?, ?, ?, 'upcoming', ?, ?, ?, ?)
         """
-        params = (name, description, date, time, venue, organizer)
+        params = (name, description, date, time, venue, organizer, *interval, capacity, capacity)
         
-        if self.db.execute_query(query, params):
-            print(f"Event '{name}' added successfully.")
-            return True
-        return False
+        try:
+            with self.db.transaction() as cursor:
+                # Check the venue and book it under one write lock, so two bookings cannot both find it free
+                cursor.execute("BEGIN IMMEDIATE")
+                if not self._venue_free(venue, *interval, on_conflict):
+                    return False
+                cursor.execute(query, params)
+        except sqlite3.Error as e:
+            print(f"Error adding event: {e}")
+            return False
+        print(f"Event '{name}' added successfully.")
+        return True
 
-    def update_event(self, event_id, **kwargs):
-        """Update event information"""
-        self.get_all_events()
+    def update_event(self, event_id, end_time=None, on_conflict="reject", **kwargs):
+        """Update event information; returns the updated record or a WriteError"""
         valid_fields = ['name', 'description', 'date', 'time', 'venue', 'organizer', 'status']
 
         if 'organizer' in kwargs:
@@ -39,75 +164,100 @@ class Event:
 
         updates = {k: v for k, v in kwargs.items() if k in valid_fields and v is not None}
 
-        if not updates:
-            print("No valid fields to update.")
-            return False
+        if not updates and end_time is None:
+            return WriteError("invalid", "No valid fields to update.").report()
 
         # Validate date format if provided
         if 'date' in updates:
             try:
                 datetime.datetime.strptime(updates['date'], "%Y-%m-%d")
             except ValueError:
-                print("Error: Date must be in YYYY-MM-DD format.")
-                return False
+                return WriteError("invalid", "Date must be in YYYY-MM-DD format.").report()
 
         # Validate status if provided
         if 'status' in updates and updates['status'] not in ['upcoming', 'ongoing', 'completed', 'cancelled']:
-            print("Error: Status must be one of 'upcoming', 'ongoing', 'completed', or 'cancelled'.")
-            return False
+            return WriteError("invalid", "Status must be one of 'upcoming', 'ongoing', 'completed', "
+                                         "or 'cancelled'.").report()
 
-        # Construct update query
-        set_clause = ", ".join([f"{field} = ?" for field in updates.keys()])
-        query = f"UPDATE events SET {set_clause} WHERE event_id = ?"
-
-        # Parameters for the query
-        params = list(updates.values()) + [event_id]
+        self.scheduler.apply_due()
+        try:
+            with self.db.transaction() as cursor:
+                # Re-check the venue and write under one write lock, as add_event does
+                cursor.execute("BEGIN IMMEDIATE")
+                # A new date, time, end time or venue is a new booking: re-check the venue
+                if end_time is not None or {'date', 'time', 'venue'} & updates.keys():
+                    row = cursor.execute(f"SELECT {', '.join(EVENT_COLUMNS)} FROM events WHERE event_id = ?",
+                                         (event_id,)).fetchone()
+                    if not row:
+                        return WriteError("not_found", f"Event with ID {event_id} does not exist.").report()
+                    event = dict(zip(EVENT_COLUMNS, row))
+                    date = updates.get('date', event['date'])
+                    time = updates.get('time', event['time'])
+                    if end_time is None and event['start_at'] and event['end_at']:
+                        # Keep the booking's length when only its start moves
+                        length = (datetime.datetime.strptime(event['end_at'], TIMESTAMP_FORMAT)
+                                  - datetime.datetime.strptime(event['start_at'], TIMESTAMP_FORMAT))
+                        interval = self._interval(date, time, duration=length)
+                    else:
+                        interval = self._interval(date, time, end_time)
+                    if interval is None:
+                        return WriteError("invalid", "Invalid date, time or end time.").report()
+                    venue = updates.get('venue', event['venue'])
+                    if updates.get('status', event['status']) != 'cancelled' and not self._venue_free(
+                            venue, *interval, on_conflict, exclude_id=event_id):
+                        return WriteError("duplicate", f"{venue} is already booked.").report()
+                    updates['start_at'], updates['end_at'] = interval
 
+                # Construct update query; no matching row means the event does not exist
+                set_clause = ", ".join([f"{field} = ?" for field in updates.keys()])
+                query = f"UPDATE events SET {set_clause} WHERE event_id = ? RETURNING {', '.join(EVENT_COLUMNS)}"
+                rows = cursor.execute(query, tuple(updates.values()) + (event_id,)).fetchall()
+        except sqlite3.IntegrityError as e:
+            return WriteError("invalid", str(e)).report("Write rejected")
+        except sqlite3.Error as e:
+            return WriteError("error", str(e)).report("Query execution error")
+        if not rows:
+            return WriteError("not_found", f"Event with ID {event_id} does not exist. Cannot update.").report()
+        print(f"Event ID {event_id} updated successfully.")
+        return dict(zip(EVENT_COLUMNS, rows[0]))
 
-        if self.db.execute_query(query, tuple(params)):
-            print(f"Event ID {event_id} updated successfully.")
-            return True
-        return False  
     def cancel_event(self, event_id):
-        """Cancel an event"""
-        self.get_all_events()
-        event = self.get_event(event_id)
-        if not event:
-            return False
-        
-        if event['status'] == 'completed':
-            print("Cannot cancel an event that has already completed.")
-            return False
-        
-        if event['status'] == 'cancelled':
+        """Cancel an event; returns the cancelled record or a WriteError"""
+        self.scheduler.apply_due()
+        # Only an upcoming or ongoing event is cancelled; the status test is part of the write
+        event = self.db.execute_returning(f"""
+            UPDATE events SET status = 'cancelled'
+            WHERE event_id = ? AND status NOT IN ('completed', 'cancelled')
+            RETURNING {', '.join(EVENT_COLUMNS)}
+        """, (event_id,))
+        if event is None:
+            # Nothing changed: say why
+            row = self.db.fetch_one(f"SELECT {', '.join(EVENT_COLUMNS)} FROM events WHERE event_id = ?", (event_id,))
+            if not row:
+                return WriteError("not_found", f"Event with ID {event_id} does not exist.").report()
+            event = dict(zip(EVENT_COLUMNS, row))
+            if event['status'] == 'completed':
+                return WriteError("invalid", "Cannot cancel an event that has already completed.").report()
             print("This event is already cancelled.")
-            return True
-        
-        query = "UPDATE events SET status = 'cancelled' WHERE event_id = ?"
-        if self.db.execute_query(query, (event_id,)):
+            return event
+        if event:
             print(f"Event '{event['name']}' cancelled successfully.")
-            return True
-        return False
+        return event
     
     def delete_event(self, event_id):
         """Delete an event from the database"""
-        # Check if event exists
-        self.get_all_events()
-
-        exists = self.db.fetch_one("SELECT event_id FROM events WHERE event_id = ?", (event_id,))
-        if not exists:
-            print(f"Error: Event with ID {event_id} does not exist.")
+        report = IntegrityManager(self.db).delete("events", [event_id])
+        if report is None:
             return False
-        
-        query = "DELETE FROM events WHERE event_id = ?"
-        if self.db.execute_query(query, (event_id,)):
-            print(f"Event ID {event_id} deleted successfully.")
-            return True
-        return False
+        if report["missing"]:
+            return WriteError("not_found", f"Event with ID {event_id} does not exist.").report()
+        print(f"Event ID {event_id} deleted successfully.")
+        return True
     
     def get_event(self, event_id):
         """Get event details by ID"""
-        query = "SELECT * FROM events WHERE event_id = ?"
+        self.scheduler.apply_due()
+        query = f"SELECT {', '.join(EVENT_COLUMNS)} FROM events WHERE event_id = ?"
         event = self.db.fetch_one(query, (event_id,))
         
         if not event:
@@ -115,43 +265,52 @@ class Event:
             return None
         
         # Convert to dictionary for easier access
-        columns = ["event_id", "name", "description", "date", "time", "venue", "organizer", "status"]
-        return dict(zip(columns, event))
+        return dict(zip(EVENT_COLUMNS, event))
     
-    def get_all_events(self, status=None):
-        """Get all events, optionally filtered by status"""
-        if status:
-            if status not in ['upcoming', 'ongoing', 'completed', 'cancelled', 'all']:
-                print("Invalid status. Must be 'upcoming', 'ongoing', 'completed', 'cancelled', or 'all'.")
-                return []
-                
-            if status == 'all':
-                query = "SELECT * FROM events ORDER BY date"
-                params = ()
-            else:
-                query = "SELECT * FROM events WHERE status = ? ORDER BY date"
-                params = (status,)
-        else:
+    def get_all_events(self, status=None, start_date=None, end_date=None, include_archived=False):
+        """Get all events, optionally filtered by status and date window, including series occurrences"""
+        self.scheduler.apply_due()
+        if status and status not in ['upcoming', 'ongoing', 'completed', 'cancelled', 'all']:
+            print("Invalid status. Must be 'upcoming', 'ongoing', 'completed', 'cancelled', or 'all'.")
+            return []
+
+        conditions = []
+        params = []
+        if not status:
             # Default to showing non-cancelled events
-            query = "SELECT * FROM events WHERE status != 'cancelled' ORDER BY date"
-            params = ()
-            
-        events = self.db.fetch_all(query, params)
-        
+            conditions.append("status != 'cancelled'")
+        elif status != 'all':
+            conditions.append("status = ?")
+            params.append(status)
+        if start_date:
+            conditions.append("date >= ?")
+            params.append(start_date)
+        if end_date:
+            conditions.append("date <= ?")
+            params.append(end_date)
+        query = f"SELECT {', '.join(EVENT_COLUMNS)} FROM {tiered(self.db, 'events', include_archived)}"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        rows = self.db.fetch_all(query + " ORDER BY date, time", tuple(params))
+
+        occurrences = (event for event in self.iter_occurrences(start_date, end_date)
+                       if status == 'all' or event['status'] == status
+                       or (not status and event['status'] != 'cancelled'))
+        one_off = (dict(zip(EVENT_COLUMNS, row), series_id=None, occurrence_date=None) for row in rows)
+        events = list(heapq.merge(one_off, occurrences, key=lambda event: (event['date'], event['time'] or '')))
+
         if not events:
             status_msg = f" with status '{status}'" if status and status != 'all' else ""
             print(f"No events found{status_msg}.")
             return []
-        
-        # Convert to list of dictionaries
-        columns = ["event_id", "name", "description", "date", "time", "venue", "organizer", "status"]
-        return [dict(zip(columns, event)) for event in events]
-    
+        return events
+
     def search_events(self, search_term):
         """Search for events by name, description, venue, or organizer"""
-        query = """
-        SELECT * FROM events 
-        WHERE name ILIKE ? OR description ILIKE ? OR venue ILIKE ? OR organizer ILIKE ?
+        self.scheduler.apply_due()
+        query = f"""
+        SELECT {', '.join(EVENT_COLUMNS)} FROM events
+        WHERE name LIKE ? OR description LIKE ? OR venue LIKE ? OR organizer LIKE ?
         ORDER BY date
         """
         search_pattern = f"%{search_term}%"
@@ -163,8 +322,7 @@ class Event:
             return []
         
         # Convert to list of dictionaries
-        columns = ["event_id", "name", "description", "date", "time", "venue", "organizer", "status"]
-        return [dict(zip(columns, event)) for event in events]
+        return [dict(zip(EVENT_COLUMNS, event)) for event in events]
     
     def display_event(self, event_data):
         """Display event information in a formatted way"""
@@ -172,11 +330,16 @@ class Event:
             return
 
         print("\n" + "="*50)
-        print(f"EVENT ID: {event_data['event_id']}")
+        if event_data.get('series_id'):
+            print(f"SERIES ID: {event_data['series_id']} (occurrence of {event_data['occurrence_date']})")
+        else:
+            print(f"EVENT ID: {event_data['event_id']}")
         print(f"Name: {event_data['name']}")
         print(f"Description: {event_data['description']}")
         print(f"Date: {event_data['date']}")
         print(f"Time: {event_data['time']}")
+        if event_data.get('start_at'):
+            print(f"Booked: {event_data['start_at']} to {event_data['end_at']}")
         print(f"Venue: {event_data['venue']}")
         # Fix: Handle missing or None organizer gracefully
         organizer = event_data.get('organizer', '')
@@ -188,27 +351,484 @@ class Event:
         print("="*50 + "\n")
     
     def update_event_statuses(self):
+        """Apply every due status transition now: started events become 'ongoing', ended ones 'completed'"""
+        changed = self.scheduler.apply_due()
+        if changed is None:
+            return False
+        print(f"{changed} event statuses updated.")
+        return True
+
+    # ------------------------------------------------------------ registrations
+
+    def set_capacity(self, event_id, capacity):
+        """Set an event's seat limit (None for unlimited); new seats go to the waitlist first"""
+        if capacity is not None and capacity < 0:
+            print("Error: Capacity cannot be negative.")
+            return False
+        promoted = self._write(self._set_capacity, event_id, capacity)
+        if promoted is None:
+            return False
+        print(f"Capacity of event ID {event_id} set to {capacity if capacity is not None else 'unlimited'}"
+              f"{f'; {len(promoted)} promoted from the waitlist' if promoted else ''}.")
+        return True
+
+    def register(self, event_id, student_id, priority=0):
+        """Register a student for an event, or waitlist them when it is full"""
+        result = self._write(register_for_event, event_id, student_id, priority)
+        if result:
+            EVENT_REGISTRATIONS.labels(result['status']).inc()
+            print(f"Student {student_id} {result['status']} for event ID {event_id}.")
+        return result
+
+    def cancel_registration(self, event_id, student_id):
+        """Cancel a registration; the freed seat goes to the next student on the waitlist"""
+        promoted = self._write(cancel_registration, event_id, student_id)
+        if promoted is None:
+            return False
+        print(f"Registration of student {student_id} for event ID {event_id} cancelled.")
+        for promoted_id in promoted:
+            print(f"Student {promoted_id} promoted from the waitlist.")
+        return True
+
+    def get_registrations(self, event_id, status=None):
+        """Registrations for an event; the waitlist comes in promotion order"""
+        query = """
+        SELECT r.registration_id, r.student_id, s.name, r.status, r.priority, r.registered_at
+        FROM event_registrations r JOIN students s ON s.student_id = r.student_id
+        WHERE r.event_id = ?
         """
-        Update event statuses based on the current date
-        - Events with past dates are marked as 'completed'
-        - Events with current date are marked as 'ongoing'
+        params = [event_id]
+        if status:
+            query += " AND r.status = ?"
+            params.append(status)
+        query += " ORDER BY r.status, r.priority DESC, r.registration_id"
+        return [dict(zip(REGISTRATION_COLUMNS, row)) for row in self.db.fetch_all(query, tuple(params))]
+
+    def get_student_registrations(self, student_id):
+        """Events a student is registered or waitlisted for"""
+        query = """
+        SELECT e.event_id, e.name, e.date, e.time, e.venue, r.status, r.registered_at
+        FROM event_registrations r JOIN events e ON e.event_id = r.event_id
+        WHERE r.student_id = ? AND r.status IN ('registered', 'waitlisted')
+        ORDER BY e.date, e.time
         """
-        today = datetime.datetime.now().strftime("%Y-%m-%d")
-        
-        # Update past events to completed
-        past_query = """
-        UPDATE events 
-        SET status = 'completed' 
-        WHERE date < ? AND status = 'upcoming'
+        columns = ["event_id", "name", "date", "time", "venue", "status", "registered_at"]
+        return [dict(zip(columns, row)) for row in self.db.fetch_all(query, (student_id,))]
+
+    def _set_capacity(self, cursor, event_id, capacity):
+        if not cursor.execute("SELECT 1 FROM events WHERE event_id = ?", (event_id,)).fetchone():
+            raise WriteRejected(f"Event with ID {event_id} does not exist.")
+        taken = cursor.execute("SELECT COUNT(*) FROM event_registrations WHERE event_id = ? AND status = 'registered'",
+                               (event_id,)).fetchone()[0]
+        if capacity is not None and capacity < taken:
+            raise WriteRejected(f"{taken} students are already registered for event {event_id}.")
+        cursor.execute("UPDATE events SET capacity = ?, seats_available = ? - ? WHERE event_id = ?",
+                       (capacity, capacity, taken, event_id))
+        if capacity is not None:
+            return promote_waitlist(cursor, event_id)
+        return [row[0] for row in cursor.execute("""
+            UPDATE event_registrations SET status = 'registered'
+            WHERE event_id = ? AND status = 'waitlisted' RETURNING student_id
+        """, (event_id,)).fetchall()]
+
+    def _write(self, operation, *args):
+        """Run a write operation (see modules/write_queue.py) in its own immediate transaction"""
+        try:
+            with self.db.transaction() as cursor:
+                cursor.execute("BEGIN IMMEDIATE")
+                return operation(cursor, *args)
+        except WriteRejected as e:
+            print(f"Error: {e}")
+        except sqlite3.Error as e:
+            print(f"Error saving registration: {e}")
+        return None
+
+    # ------------------------------------------------------------ recurring series
+
+    def add_series(self, name, description, start_date, time, venue, organizer, frequency="weekly", every=1,
+                   weekdays=None, until=None, count=None, end_time=None, on_conflict="reject"):
+        """Store a recurring event once; weekdays are 0 (Monday) to 6 and default to the start date's"""
+        if frequency not in FREQUENCIES:
+            print(f"Error: Frequency must be one of {', '.join(FREQUENCIES)}.")
+            return False
+        try:
+            datetime.datetime.strptime(start_date, "%Y-%m-%d")
+            if until:
+                datetime.datetime.strptime(until, "%Y-%m-%d")
+        except ValueError:
+            print("Error: Dates must be in YYYY-MM-DD format.")
+            return False
+        if every < 1 or (count is not None and count < 1):
+            print("Error: Interval and count must be positive.")
+            return False
+        if weekdays is not None:
+            weekdays = sorted(set(weekdays))
+            if frequency != "weekly" or not all(0 <= day <= 6 for day in weekdays):
+                print("Error: Weekdays (0-6) only apply to weekly series.")
+                return False
+        interval = self._interval(start_date, time, end_time)
+        if interval is None:
+            return False
+        start, end = (datetime.datetime.strptime(value, TIMESTAMP_FORMAT) for value in interval)
+        duration_minutes = int((end - start).total_seconds()) // 60
+
+        series = dict(zip(SERIES_COLUMNS, (None, name, description, venue, organizer, start_date, time or None,
+                                           duration_minutes, frequency, every,
+                                           ",".join(map(str, weekdays)) if weekdays else None,
+                                           until, count, "active")))
+        query = """
+        INSERT INTO event_series (name, description, venue, organizer, start_date, time, duration_minutes,
+                                  frequency, every, weekdays, until, count, status)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'active')
         """
-        self.db.execute_query(past_query, (today,))
-        
-        # Update current events to ongoing
-        current_query = """
-        UPDATE events 
-        SET status = 'ongoing' 
-        WHERE date = ? AND status = 'upcoming'
+        params = tuple(series[column] for column in SERIES_COLUMNS[1:-1])
+        try:
+            with self.db.transaction() as cursor:
+                cursor.execute("BEGIN IMMEDIATE")
+                # Check the occurrences within the horizon against one-off bookings
+                if venue:
+                    horizon = datetime.date.today() + SERIES_HORIZON
+                    for day in self._series_dates(series, datetime.date.fromisoformat(start_date), horizon):
+                        occurrence = self._occurrence(series, day)
+                        if not self._venue_free(venue, occurrence['start_at'], occurrence['end_at'], on_conflict):
+                            return False
+                cursor.execute(query, params)
+        except sqlite3.Error as e:
+            print(f"Error adding recurring event: {e}")
+            return False
+        print(f"Recurring event '{name}' added successfully.")
+        return True
+
+    def get_series(self, series_id):
+        """Get a recurring series by ID"""
+        row = self.db.fetch_one(f"SELECT {', '.join(SERIES_COLUMNS)} FROM event_series WHERE series_id = ?",
+                                (series_id,))
+        if not row:
+            print(f"No recurring event found with ID {series_id}.")
+            return None
+        return dict(zip(SERIES_COLUMNS, row))
+
+    def cancel_series(self, series_id):
+        """Cancel every occurrence of a series"""
+        if not self.get_series(series_id):
+            return False
+        if self.db.execute_query("UPDATE event_series SET status = 'cancelled' WHERE series_id = ?", (series_id,)):
+            print(f"Recurring event ID {series_id} cancelled successfully.")
+            return True
+        return False
+
+    def delete_series(self, series_id):
+        """Delete a series with its exceptions and overrides"""
+        if not self.get_series(series_id):
+            return False
+        try:
+            with self.db.transaction() as cursor:
+                cursor.execute("DELETE FROM event_series_overrides WHERE series_id = ?", (series_id,))
+                cursor.execute("DELETE FROM event_series_exceptions WHERE series_id = ?", (series_id,))
+                cursor.execute("DELETE FROM event_series WHERE series_id = ?", (series_id,))
+        except sqlite3.Error as e:
+            print(f"Error deleting recurring event: {e}")
+            return False
+        print(f"Recurring event ID {series_id} deleted successfully.")
+        return True
+
+    def skip_occurrence(self, series_id, occurrence_date):
+        """Record an exception: the series does not take place on this date"""
+        if not self._is_occurrence(series_id, occurrence_date):
+            return False
+        try:
+            with self.db.transaction() as cursor:
+                cursor.execute("INSERT OR IGNORE INTO event_series_exceptions (series_id, occurrence_date) "
+                               "VALUES (?, ?)", (series_id, occurrence_date))
+                cursor.execute("DELETE FROM event_series_overrides WHERE series_id = ? AND occurrence_date = ?",
+                               (series_id, occurrence_date))
+        except sqlite3.Error as e:
+            print(f"Error skipping occurrence: {e}")
+            return False
+        print(f"Occurrence of {occurrence_date} removed from recurring event ID {series_id}.")
+        return True
+
+    def update_occurrence(self, series_id, occurrence_date, end_time=None, on_conflict="reject", **kwargs):
+        """Change one occurrence by storing an override row; the series itself is untouched"""
+        series = self._is_occurrence(series_id, occurrence_date)
+        if not series:
+            return False
+        updates = {k: v for k, v in kwargs.items() if k in OVERRIDE_FIELDS and v is not None}
+        if not updates and end_time is None:
+            print("No valid fields to update.")
+            return False
+        if 'status' in updates and updates['status'] not in ('upcoming', 'cancelled'):
+            print("Error: An occurrence can only be set to 'upcoming' or 'cancelled'.")
+            return False
+
+        current = self._occurrence(series, datetime.date.fromisoformat(occurrence_date),
+                                   self._override(series_id, occurrence_date))
+        date = updates.get('date', current['date'])
+        time = updates.get('time', current['time'])
+        length = (datetime.datetime.strptime(current['end_at'], TIMESTAMP_FORMAT)
+                  - datetime.datetime.strptime(current['start_at'], TIMESTAMP_FORMAT))
+        interval = self._interval(date, time, end_time, None if end_time else length)
+        if interval is None:
+            return False
+        start, end = (datetime.datetime.strptime(value, TIMESTAMP_FORMAT) for value in interval)
+        updates['duration_minutes'] = int((end - start).total_seconds()) // 60
+
+        values = [updates.get(field) for field in OVERRIDE_FIELDS]
+        query = f"""
+        INSERT INTO event_series_overrides (series_id, occurrence_date, {', '.join(OVERRIDE_FIELDS)})
+        VALUES (?, ?, {', '.join('?' * len(OVERRIDE_FIELDS))})
+        ON CONFLICT (series_id, occurrence_date) DO UPDATE SET
+            {', '.join(f'{field} = COALESCE(excluded.{field}, {field})' for field in OVERRIDE_FIELDS)}
         """
-        self.db.execute_query(current_query, (today,))
-        
-        return True
\ No newline at end of file
+        try:
+            with self.db.transaction() as cursor:
+                cursor.execute("BEGIN IMMEDIATE")
+                if updates.get('status', current['status']) != 'cancelled' and not self._venue_free(
+                        updates.get('venue', current['venue']), *interval, on_conflict):
+                    return False
+                cursor.execute(query, (series_id, occurrence_date, *values))
+        except sqlite3.Error as e:
+            print(f"Error updating occurrence: {e}")
+            return False
+        print(f"Occurrence of {occurrence_date} of recurring event ID {series_id} updated successfully.")
+        return True
+
+    def cancel_occurrence(self, series_id, occurrence_date):
+        """Cancel a single occurrence, keeping it visible as cancelled"""
+        return self.update_occurrence(series_id, occurrence_date, status='cancelled')
+
+    def iter_occurrences(self, start_date=None, end_date=None, series_id=None):
+        """Yield series occurrences between two dates (inclusive) in date order, expanding lazily"""
+        if end_date is None:
+            end_date = (datetime.date.today() + SERIES_HORIZON).isoformat()
+        query = f"SELECT {', '.join(SERIES_COLUMNS)} FROM event_series WHERE start_date <= ?"
+        params = [end_date]
+        if start_date:
+            query += " AND (until IS NULL OR until >= ?)"
+            params.append(start_date)
+        if series_id is not None:
+            query += " AND series_id = ?"
+            params.append(series_id)
+        series_rows = [dict(zip(SERIES_COLUMNS, row)) for row in self.db.fetch_all(query, tuple(params))]
+        if not series_rows:
+            return
+
+        start = datetime.date.fromisoformat(start_date) if start_date else datetime.date.min
+        end = datetime.date.fromisoformat(end_date)
+        now = datetime.datetime.now().strftime(TIMESTAMP_FORMAT)
+        yield from heapq.merge(*(self._expand(series, start, end, now) for series in series_rows),
+                               key=lambda event: (event['date'], event['time'] or ''))
+
+    def _expand(self, series, start, end, now):
+        """One series' occurrences within [start, end], applying exceptions and overrides"""
+        series_id = series['series_id']
+        window = (start.isoformat(), end.isoformat())
+        skipped = {row[0] for row in self.db.fetch_all("""
+            SELECT occurrence_date FROM event_series_exceptions
+            WHERE series_id = ? AND occurrence_date BETWEEN ? AND ?
+        """, (series_id, *window))}
+        overrides = {row[0]: dict(zip(OVERRIDE_FIELDS, row[1:])) for row in self.db.fetch_all(f"""
+            SELECT occurrence_date, {', '.join(OVERRIDE_FIELDS)} FROM event_series_overrides
+            WHERE series_id = ? AND (occurrence_date BETWEEN ? AND ? OR date BETWEEN ? AND ?)
+        """, (series_id, *window, *window))}
+
+        # Occurrences moved to another date are placed by their new date
+        moved = sorted((self._occurrence(series, datetime.date.fromisoformat(occurrence_date), override, now)
+                        for occurrence_date, override in overrides.items()
+                        if override['date'] and override['date'] != occurrence_date
+                        and window[0] <= override['date'] <= window[1]),
+                       key=lambda event: (event['date'], event['time'] or ''))
+
+        def generate():
+            for day in self._series_dates(series, start, end):
+                override = overrides.get(day.isoformat())
+                if day.isoformat() in skipped or (override and override['date'] not in (None, day.isoformat())):
+                    continue
+                yield self._occurrence(series, day, override, now)
+
+        return heapq.merge(generate(), moved, key=lambda event: (event['date'], event['time'] or ''))
+
+    def _series_dates(self, series, start, end):
+        """Dates a series falls on within [start, end], before exceptions; skips ahead to start"""
+        first = datetime.date.fromisoformat(series['start_date'])
+        if series['until']:
+            end = min(end, datetime.date.fromisoformat(series['until']))
+        start = max(start, first)
+        every, count = series['every'], series['count']
+
+        if series['frequency'] == 'daily':
+            index = -(-(start - first).days // every)
+            day = first + datetime.timedelta(days=index * every)
+            while day <= end and (count is None or index < count):
+                yield day
+                index += 1
+                day += datetime.timedelta(days=every)
+
+        elif series['frequency'] == 'weekly':
+            weekdays = [int(day) for day in series['weekdays'].split(",")] if series['weekdays'] \
+                else [first.weekday()]
+            first_monday = first - datetime.timedelta(days=first.weekday())
+            before_first = sum(1 for day in weekdays if day < first.weekday())
+            period = (start - first_monday).days // (7 * every)
+            index = period * len(weekdays) - before_first if period else 0
+            while True:
+                monday = first_monday + datetime.timedelta(weeks=period * every)
+                if monday > end:
+                    return
+                for weekday in weekdays:
+                    day = monday + datetime.timedelta(days=weekday)
+                    if day < first:
+                        continue
+                    if day > end or (count is not None and index >= count):
+                        return
+                    index += 1
+                    if day >= start:
+                        yield day
+                period += 1
+
+        else:
+            # Months without the start day (the 31st, 29 February) are skipped;
+            # with a count every month must be walked to know the index
+            months = 0 if count is not None else \
+                max(0, ((start.year - first.year) * 12 + start.month - first.month) // every)
+            index = 0
+            while True:
+                total = first.month - 1 + months * every
+                year, month = first.year + total // 12, total % 12 + 1
+                months += 1
+                if datetime.date(year, month, 1) > end:
+                    return
+                try:
+                    day = datetime.date(year, month, first.day)
+                except ValueError:
+                    continue
+                if day > end or (count is not None and index >= count):
+                    return
+                index += 1
+                if day >= start:
+                    yield day
+
+    def _occurrence(self, series, day, override=None, now=None):
+        """Build an event dictionary for one occurrence of a series"""
+        values = {field: series[field] for field in ("name", "description", "time", "duration_minutes",
+                                                      "venue", "organizer")}
+        values['date'] = day.isoformat()
+        values['status'] = None
+        for field, value in (override or {}).items():
+            if value is not None:
+                values[field] = value
+        start = datetime.datetime.strptime(f"{values['date']} {values['time'] or '00:00'}", TIMESTAMP_FORMAT)
+        start_at = start.strftime(TIMESTAMP_FORMAT)
+        end_at = (start + datetime.timedelta(minutes=values['duration_minutes'])).strftime(TIMESTAMP_FORMAT)
+
+        if series['status'] == 'cancelled' or values['status'] == 'cancelled':
+            status = 'cancelled'
+        elif now and end_at <= now:
+            status = 'completed'
+        elif now and start_at <= now:
+            status = 'ongoing'
+        else:
+            status = 'upcoming'
+        return {"event_id": None, "name": values['name'], "description": values['description'],
+                "date": values['date'], "time": values['time'], "venue": values['venue'],
+                "organizer": values['organizer'], "status": status, "start_at": start_at, "end_at": end_at,
+                "capacity": None, "seats_available": None, "series_id": series['series_id'],
+                "occurrence_date": day.isoformat()}
+
+    def _override(self, series_id, occurrence_date):
+        row = self.db.fetch_one(f"""
+            SELECT {', '.join(OVERRIDE_FIELDS)} FROM event_series_overrides
+            WHERE series_id = ? AND occurrence_date = ?
+        """, (series_id, occurrence_date))
+        return dict(zip(OVERRIDE_FIELDS, row)) if row else None
+
+    def _is_occurrence(self, series_id, occurrence_date):
+        """The series if it has a (not skipped) occurrence on that date, else None"""
+        series = self.get_series(series_id)
+        if not series:
+            return None
+        try:
+            day = datetime.date.fromisoformat(occurrence_date)
+        except ValueError:
+            print("Error: Date must be in YYYY-MM-DD format.")
+            return None
+        skipped = self.db.fetch_one("SELECT 1 FROM event_series_exceptions WHERE series_id = ? "
+                                    "AND occurrence_date = ?", (series_id, occurrence_date))
+        if skipped or day not in self._series_dates(series, day, day):
+            print(f"Error: Recurring event ID {series_id} has no occurrence on {occurrence_date}.")
+            return None
+        return series
+
+    # ------------------------------------------------------------ venue bookings
+
+    def find_venue_conflicts(self, venue, start_at, end_at, exclude_id=None):
+        """Bookings of a venue overlapping [start_at, end_at), through the event_intervals R*Tree"""
+        row = self.db.fetch_one("SELECT venue_id FROM venues WHERE name = ?", (venue,))
+        if not row:
+            return []
+        start, end = self._minutes(start_at), self._minutes(end_at) - 1
+        query = f"""
+        SELECT {', '.join('e.' + column for column in EVENT_COLUMNS)}
+        FROM event_intervals i JOIN events e ON e.event_id = i.event_id
+        WHERE i.venue_min <= ? AND i.venue_max >= ? AND i.start_min <= ? AND i.end_min >= ?
+          AND i.event_id IS NOT ?
+        ORDER BY e.start_at
+        """
+        events = self.db.fetch_all(query, (row[0], row[0], end, start, exclude_id))
+        return [dict(zip(EVENT_COLUMNS, event)) for event in events]
+
+    def find_conflicts(self, start_date=None, end_date=None):
+        """Every pair of overlapping bookings of the same venue between two dates (inclusive)"""
+        start = self._minutes(f"{start_date} 00:00") if start_date else -2 ** 31
+        end = self._minutes(f"{end_date} 00:00") + 24 * 60 - 1 if end_date else 2 ** 31 - 1
+        query = """
+        SELECT v.name, a.event_id, ea.name, ea.start_at, ea.end_at, b.event_id, eb.name, eb.start_at, eb.end_at
+        FROM event_intervals a
+        JOIN event_intervals b ON b.venue_min <= a.venue_max AND b.venue_max >= a.venue_min
+            AND b.start_min <= a.end_min AND b.end_min >= a.start_min AND b.event_id > a.event_id
+        JOIN events ea ON ea.event_id = a.event_id
+        JOIN events eb ON eb.event_id = b.event_id
+        JOIN venues v ON v.venue_id = a.venue_min
+        WHERE a.start_min <= ? AND a.end_min >= ?
+        ORDER BY ea.start_at, a.event_id, b.event_id
+        """
+        columns = ["venue", "event_id", "name", "start_at", "end_at",
+                   "other_event_id", "other_name", "other_start_at", "other_end_at"]
+        return [dict(zip(columns, row)) for row in self.db.fetch_all(query, (end, start))]
+
+    def _interval(self, date, time, end_time=None, duration=None):
+        """(start_at, end_at) of a booking: two hours from time, to end_time, or all day without a time"""
+        try:
+            if not time:
+                start = datetime.datetime.strptime(date, "%Y-%m-%d")
+                end = start + (duration or datetime.timedelta(days=1))
+            else:
+                start = datetime.datetime.strptime(f"{date} {time}", TIMESTAMP_FORMAT)
+                end = start + (duration or DEFAULT_DURATION)
+            if end_time:
+                end = datetime.datetime.strptime(f"{date} {end_time}", TIMESTAMP_FORMAT)
+        except ValueError:
+            print("Error: Time and end time must be in HH:MM format.")
+            return None
+        if end <= start:
+            print("Error: Event must end after it starts.")
+            return None
+        return start.strftime(TIMESTAMP_FORMAT), end.strftime(TIMESTAMP_FORMAT)
+
+    def _venue_free(self, venue, start_at, end_at, on_conflict, exclude_id=None):
+        """Apply the conflict policy: 'reject' refuses a clash, 'flag' reports it and goes ahead"""
+        if on_conflict not in CONFLICT_POLICIES:
+            print(f"Error: Conflict policy must be one of {', '.join(CONFLICT_POLICIES)}.")
+            return False
+        if not venue:
+            return True
+        conflicts = self.find_venue_conflicts(venue, start_at, end_at, exclude_id)
+        for event in conflicts:
+            print(f"{'Error' if on_conflict == 'reject' else 'Warning'}: {venue} is booked by "
+                  f"'{event['name']}' (ID {event['event_id']}) from {event['start_at']} to {event['end_at']}.")
+        return not conflicts or on_conflict == "flag"
+
+    def _minutes(self, timestamp):
+        """Minutes since the epoch, the time axis of event_intervals"""
+        moment = datetime.datetime.strptime(timestamp, TIMESTAMP_FORMAT)
+        return int((moment - datetime.datetime(1970, 1, 1)).total_seconds()) // 60
@@ -1,5 +1,11 @@
-from database import Database
+from database import Database, RATING_STATS_REBUILD, WriteError
+from modules.archive import tiered
+from modules.metrics import FEEDBACK_SUBMITTED
 import datetime
+import sqlite3
+
+DUPLICATE_POLICIES = ("reject", "upsert")
+RATING_STATS_COLUMNS = "n, total, total_sq, s1, s2, s3, s4, s5"
 
 class Feedback:
     def __init__(self, db):
@@ -7,99 +13,163 @@ class Feedback:
         self.db = db
     
     def submit_feedback(self, student_id, teacher_id, course, rating, comments):
-        """Submit feedback from a student for a teacher"""
-        # Validate student exists
-        student_exists = self.db.fetch_one("SELECT student_id FROM students WHERE student_id = ?", (student_id,))
-        if not student_exists:
-            print(f"Error: Student with ID {student_id} does not exist.")
-            return False
-        
-        # Validate teacher exists
-        teacher_exists = self.db.fetch_one("SELECT teacher_id FROM teachers WHERE teacher_id = ?", (teacher_id,))
-        if not teacher_exists:
-            print(f"Error: Teacher with ID {teacher_id} does not exist.")
-            return False
-        
+        """Submit feedback from a student for a teacher; returns the created record or a WriteError"""
         # Validate rating (1-5)
         if not (1 <= rating <= 5):
-            print("Error: Rating must be between 1 and 5.")
-            return False
-        
-        # Check if feedback already exists for this combination
-        existing = self.db.fetch_one("""
-            SELECT feedback_id FROM feedback 
-            WHERE student_id = ? AND teacher_id = ? AND course = ?
-        """, (student_id, teacher_id, course))
-        
-        if existing:
-            print(f"Feedback already exists for this student-teacher-course combination.")
-            print("Please use update_feedback method to modify existing feedback.")
-            return False
-        
+            return WriteError("invalid", "Rating must be between 1 and 5.").report()
+
+        # The unique index is the duplicate check, the foreign keys the existence checks
         date_submitted = datetime.datetime.now().strftime("%Y-%m-%d")
-        
         query = """
         INSERT INTO feedback (student_id, teacher_id, course, rating, comments, date_submitted)
         VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (student_id, teacher_id, course) DO NOTHING
+        RETURNING *
         """
         params = (student_id, teacher_id, course, rating, comments, date_submitted)
-        
-        if self.db.execute_query(query, params):
-            print(f"Feedback submitted successfully.")
-            return True
-        return False
+
+        feedback = self.db.execute_returning(query, params)
+        if feedback is None:
+            return WriteError("duplicate", "Feedback already exists for this student-teacher-course combination. "
+                                           "Use update_feedback to modify it.").report()
+        if isinstance(feedback, WriteError) and feedback.kind == "not_found":
+            return WriteError("not_found", f"Student with ID {student_id} or teacher with ID {teacher_id} "
+                                           "does not exist.").report()
+        if feedback:
+            FEEDBACK_SUBMITTED.inc()
+            print("Feedback submitted successfully.")
+        return feedback
     
+    def bulk_submit_feedback(self, records, on_duplicate="reject"):
+        """Validate and submit many feedback records with set-based SQL in one transaction"""
+        if on_duplicate not in DUPLICATE_POLICIES:
+            print(f"Error: on_duplicate must be one of {', '.join(DUPLICATE_POLICIES)}.")
+            return None
+        date_submitted = datetime.datetime.now().strftime("%Y-%m-%d")
+        rows = [(row_no, record.get('student_id'), record.get('teacher_id'), record.get('course'),
+                 record.get('rating'), record.get('comments', ''), record.get('date_submitted') or date_submitted)
+                for row_no, record in enumerate(records, start=1)]
+        # Within the batch the first copy of a combination wins on reject, the last on upsert
+        keep = "MIN(row_no)" if on_duplicate == "reject" else "MAX(row_no)"
+
+        try:
+            with self.db.transaction() as cursor:
+                cursor.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS feedback_import (
+                    row_no INTEGER PRIMARY KEY, student_id INTEGER, teacher_id INTEGER, course TEXT,
+                    rating INTEGER, comments TEXT, date_submitted TEXT, reason TEXT
+                )
+                """)
+                cursor.execute("DELETE FROM feedback_import")
+                cursor.executemany("""
+                INSERT INTO feedback_import (row_no, student_id, teacher_id, course, rating, comments, date_submitted)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, rows)
+
+                cursor.execute("""
+                UPDATE feedback_import SET reason = CASE
+                    WHEN course IS NULL OR course = '' THEN 'missing course'
+                    WHEN typeof(rating) != 'integer' OR rating NOT BETWEEN 1 AND 5 THEN 'rating must be between 1 and 5'
+                    WHEN NOT EXISTS (SELECT 1 FROM students s WHERE s.student_id = feedback_import.student_id)
+                        THEN 'student does not exist'
+                    WHEN NOT EXISTS (SELECT 1 FROM teachers t WHERE t.teacher_id = feedback_import.teacher_id)
+                        THEN 'teacher does not exist'
+                END
+                """)
+                cursor.execute(f"""
+                UPDATE feedback_import SET reason = 'duplicate within batch'
+                WHERE reason IS NULL AND row_no NOT IN (
+                    SELECT {keep} FROM feedback_import WHERE reason IS NULL
+                    GROUP BY student_id, teacher_id, course
+                )
+                """)
+
+                updated = 0
+                if on_duplicate == "upsert":
+                    cursor.execute("""
+                    UPDATE feedback SET rating = i.rating, comments = i.comments, date_submitted = i.date_submitted
+                    FROM feedback_import i
+                    WHERE i.reason IS NULL AND feedback.student_id = i.student_id
+                      AND feedback.teacher_id = i.teacher_id AND feedback.course = i.course
+                    """)
+                    updated = cursor.rowcount
+                    cursor.execute("""
+                    UPDATE feedback_import SET reason = 'updated'
+                    WHERE reason IS NULL AND EXISTS (
+                        SELECT 1 FROM feedback f WHERE f.student_id = feedback_import.student_id
+                          AND f.teacher_id = feedback_import.teacher_id AND f.course = feedback_import.course
+                    )
+                    """)
+                else:
+                    cursor.execute("""
+                    UPDATE feedback_import SET reason = 'feedback already exists'
+                    WHERE reason IS NULL AND EXISTS (
+                        SELECT 1 FROM feedback f WHERE f.student_id = feedback_import.student_id
+                          AND f.teacher_id = feedback_import.teacher_id AND f.course = feedback_import.course
+                    )
+                    """)
+
+                cursor.execute("""
+                INSERT INTO feedback (student_id, teacher_id, course, rating, comments, date_submitted)
+                SELECT student_id, teacher_id, course, rating, comments, date_submitted
+                FROM feedback_import WHERE reason IS NULL ORDER BY row_no
+                """)
+                inserted = cursor.rowcount
+                rejected = [{"row": row_no, "reason": reason} for row_no, reason in cursor.execute(
+                    "SELECT row_no, reason FROM feedback_import "
+                    "WHERE reason IS NOT NULL AND reason != 'updated' ORDER BY row_no")]
+                cursor.execute("DELETE FROM feedback_import")
+        except sqlite3.Error as e:
+            print(f"Bulk feedback failed, nothing was submitted: {e}")
+            return None
+
+        FEEDBACK_SUBMITTED.inc(inserted)
+        print(f"Bulk feedback: {inserted} submitted, {updated} updated, {len(rejected)} rejected.")
+        return {"inserted": inserted, "updated": updated, "rejected": rejected}
+
     def update_feedback(self, feedback_id, rating=None, comments=None):
-        """Update existing feedback"""
-        # Check if feedback exists
-        feedback = self.get_feedback(feedback_id)
-        if not feedback:
-            return False
-        
+        """Update existing feedback; returns the updated record or a WriteError"""
         updates = {}
         
         if rating is not None:
             # Validate rating (1-5)
             if not (1 <= rating <= 5):
-                print("Error: Rating must be between 1 and 5.")
-                return False
+                return WriteError("invalid", "Rating must be between 1 and 5.").report()
             updates['rating'] = rating
             
         if comments is not None:
             updates['comments'] = comments
             
         if not updates:
-            print("No valid fields to update.")
-            return False
+            return WriteError("invalid", "No valid fields to update.").report()
         
         # Update date_submitted to current date
         updates['date_submitted'] = datetime.datetime.now().strftime("%Y-%m-%d")
         
-        # Construct update query
+        # Construct update query; no matching row means the feedback does not exist
         set_clause = ", ".join([f"{field} = ?" for field in updates.keys()])
-        query = f"UPDATE feedback SET {set_clause} WHERE feedback_id = ?"
+        query = f"UPDATE feedback SET {set_clause} WHERE feedback_id = ? RETURNING *"
         
         # Parameters for the query
         params = list(updates.values()) + [feedback_id]
         
-        if self.db.execute_query(query, tuple(params)):
+        feedback = self.db.execute_returning(query, tuple(params))
+        if feedback is None:
+            return WriteError("not_found", f"Feedback with ID {feedback_id} does not exist.").report()
+        if feedback:
             print(f"Feedback ID {feedback_id} updated successfully.")
-            return True
-        return False
+        return feedback
     
     def delete_feedback(self, feedback_id):
         """Delete feedback"""
-        # Check if feedback exists
-        exists = self.db.fetch_one("SELECT feedback_id FROM feedback WHERE feedback_id = ?", (feedback_id,))
-        if not exists:
-            print(f"Error: Feedback with ID {feedback_id} does not exist.")
-            return False
-        
-        query = "DELETE FROM feedback WHERE feedback_id = ?"
-        if self.db.execute_query(query, (feedback_id,)):
+        deleted = self.db.execute_returning("DELETE FROM feedback WHERE feedback_id = ? RETURNING feedback_id",
+                                            (feedback_id,))
+        if deleted is None:
+            return WriteError("not_found", f"Feedback with ID {feedback_id} does not exist.").report()
+        if deleted:
             print(f"Feedback ID {feedback_id} deleted successfully.")
             return True
-        return False
+        return deleted
     
     def get_feedback(self, feedback_id):
         """Get feedback details by ID"""
@@ -115,23 +185,37 @@ class Feedback:
                   "rating", "comments", "date_submitted"]
         return dict(zip(columns, feedback))
     
-    def get_teacher_feedback(self, teacher_id):
-        """Get all feedback for a specific teacher"""
+    def _tag_filters(self, sentiment=None, topic=None, include_archived=False):
+        """Extra WHERE conditions restricting feedback f to analysed comments with these tags"""
+        conditions, params = "", []
+        if sentiment:
+            tags = tiered(self.db, "feedback_tags", include_archived)
+            conditions += f" AND EXISTS (SELECT 1 FROM {tags} g WHERE g.feedback_id = f.feedback_id AND g.sentiment = ?)"
+            params.append(sentiment)
+        if topic:
+            topics = tiered(self.db, "feedback_topics", include_archived)
+            conditions += f" AND EXISTS (SELECT 1 FROM {topics} p WHERE p.feedback_id = f.feedback_id AND p.topic = ?)"
+            params.append(topic)
+        return conditions, params
+    
+    def get_teacher_feedback(self, teacher_id, sentiment=None, topic=None, include_archived=False):
+        """Get all feedback for a specific teacher, optionally only comments with the given tags"""
         # Validate teacher exists
         teacher_exists = self.db.fetch_one("SELECT teacher_id FROM teachers WHERE teacher_id = ?", (teacher_id,))
         if not teacher_exists:
             print(f"Error: Teacher with ID {teacher_id} does not exist.")
             return []
         
-        query = """
+        conditions, params = self._tag_filters(sentiment, topic, include_archived)
+        query = f"""
         SELECT f.feedback_id, s.name as student_name, f.course, f.rating, 
                f.comments, f.date_submitted
-        FROM feedback f
+        FROM {tiered(self.db, "feedback", include_archived)} f
         JOIN students s ON f.student_id = s.student_id
-        WHERE f.teacher_id = ?
+        WHERE f.teacher_id = ?{conditions}
         ORDER BY f.date_submitted DESC
         """
-        feedback_list = self.db.fetch_all(query, (teacher_id,))
+        feedback_list = self.db.fetch_all(query, (teacher_id, *params))
         
         if not feedback_list:
             print(f"No feedback found for teacher ID {teacher_id}.")
@@ -139,7 +223,7 @@ class Feedback:
             
         return feedback_list
     
-    def get_student_feedback(self, student_id):
+    def get_student_feedback(self, student_id, include_archived=False):
         """Get all feedback submitted by a specific student"""
         # Validate student exists
         student_exists = self.db.fetch_one("SELECT student_id FROM students WHERE student_id = ?", (student_id,))
@@ -147,10 +231,10 @@ class Feedback:
             print(f"Error: Student with ID {student_id} does not exist.")
             return []
         
-        query = """
+        query = f"""
         SELECT f.feedback_id, t.name as teacher_name, f.course, f.rating, 
                f.comments, f.date_submitted
-        FROM feedback f
+        FROM {tiered(self.db, "feedback", include_archived)} f
         JOIN teachers t ON f.teacher_id = t.teacher_id
         WHERE f.student_id = ?
         ORDER BY f.date_submitted DESC
@@ -163,18 +247,25 @@ class Feedback:
             
         return feedback_list
     
-    def get_course_feedback(self, course):
-        """Get all feedback for a specific course"""
-        query = """
+    def get_course_feedback(self, course, sentiment=None, topic=None, include_archived=False):
+        """Get all feedback for a course (title or course_id), optionally only comments with the given tags"""
+        if isinstance(course, int):
+            row = self.db.fetch_one("SELECT title FROM courses WHERE course_id = ?", (course,))
+            if not row:
+                print(f"Error: Course with ID {course} does not exist.")
+                return []
+            course = row[0]
+        conditions, params = self._tag_filters(sentiment, topic, include_archived)
+        query = f"""
         SELECT f.feedback_id, s.name as student_name, t.name as teacher_name, 
                f.rating, f.comments, f.date_submitted
-        FROM feedback f
+        FROM {tiered(self.db, "feedback", include_archived)} f
         JOIN students s ON f.student_id = s.student_id
         JOIN teachers t ON f.teacher_id = t.teacher_id
-        WHERE f.course = ?
+        WHERE f.course = ?{conditions}
         ORDER BY f.date_submitted DESC
         """
-        feedback_list = self.db.fetch_all(query, (course,))
+        feedback_list = self.db.fetch_all(query, (course, *params))
         
         if not feedback_list:
             print(f"No feedback found for course '{course}'.")
@@ -182,19 +273,100 @@ class Feedback:
             
         return feedback_list
     
+    def get_tag_summary(self, teacher_id=None, course=None):
+        """Aggregate sentiment and topic tags over a teacher's or a course's analysed feedback"""
+        if teacher_id is not None:
+            scope, params = "f.teacher_id = ?", (teacher_id,)
+        elif course is not None:
+            scope, params = "f.course = ?", (course,)
+        else:
+            print("Error: Give a teacher ID or a course.")
+            return None
+        
+        totals = self.db.fetch_one(f"""
+        SELECT COUNT(*), AVG(g.score) FROM feedback f
+        JOIN feedback_tags g ON g.feedback_id = f.feedback_id
+        WHERE {scope}
+        """, params)
+        if not totals or not totals[0]:
+            print("No analysed feedback found.")
+            return None
+        
+        sentiments = self.db.fetch_all(f"""
+        SELECT g.sentiment, COUNT(*) FROM feedback f
+        JOIN feedback_tags g ON g.feedback_id = f.feedback_id
+        WHERE {scope} GROUP BY g.sentiment
+        """, params)
+        topics = self.db.fetch_all(f"""
+        SELECT p.topic, COUNT(*) FROM feedback f
+        JOIN feedback_topics p ON p.feedback_id = f.feedback_id
+        WHERE {scope} GROUP BY p.topic ORDER BY COUNT(*) DESC
+        """, params)
+        return {
+            "analyzed": totals[0],
+            "average_score": round(totals[1], 3),
+            "sentiment": dict(sentiments),
+            "topics": dict(topics),
+        }
+    
     def calculate_teacher_rating(self, teacher_id):
         """Calculate average rating for a teacher"""
-        query = "SELECT AVG(rating) FROM feedback WHERE teacher_id = ?"
+        query = "SELECT n, total FROM teacher_rating_stats WHERE teacher_id = ?"
         result = self.db.fetch_one(query, (teacher_id,))
         
-        if not result or result[0] is None:
+        if not result or not result[0]:
             print(f"No ratings found for teacher ID {teacher_id}.")
             return 0
             
         # Format to 2 decimal places
-        avg_rating = round(result[0], 2)
+        avg_rating = round(result[1] / result[0], 2)
         return avg_rating
     
+    def get_teacher_rating_stats(self, teacher_id):
+        """Get count, average, variance and star distribution of a teacher's ratings"""
+        row = self.db.fetch_one(f"SELECT {RATING_STATS_COLUMNS} FROM teacher_rating_stats WHERE teacher_id = ?",
+                                (teacher_id,))
+        return self._rating_summary(row, f"teacher ID {teacher_id}")
+    
+    def get_course_rating_stats(self, course):
+        """Get count, average, variance and star distribution of a course's ratings"""
+        row = self.db.fetch_one(f"SELECT {RATING_STATS_COLUMNS} FROM course_rating_stats WHERE course = ?",
+                                (course,))
+        return self._rating_summary(row, f"course '{course}'")
+    
+    def _rating_summary(self, row, what):
+        if not row or not row[0]:
+            print(f"No ratings found for {what}.")
+            return None
+        n, total, total_sq = row[:3]
+        average = total / n
+        # Population variance from the running sums
+        variance = max(total_sq / n - average * average, 0.0)
+        return {
+            "count": n,
+            "average": round(average, 2),
+            "variance": round(variance, 4),
+            "stddev": round(variance ** 0.5, 4),
+            "distribution": dict(zip(range(1, 6), row[3:])),
+        }
+    
+    def rebuild_rating_stats(self):
+        """Recompute the teacher and course rating aggregates from the feedback table, archived rows included"""
+        try:
+            # Archived feedback still counts in the aggregates, as it did before it moved
+            source = tiered(self.db, "feedback", include_archived=True)
+            with self.db.transaction() as cursor:
+                for table, key in (("teacher_rating_stats", "teacher_id"), ("course_rating_stats", "course")):
+                    cursor.execute(f"DELETE FROM {table}")
+                    cursor.execute(RATING_STATS_REBUILD.format(table=table, key=key, source=source, condition=""))
+                teachers = cursor.execute("SELECT COUNT(*) FROM teacher_rating_stats").fetchone()[0]
+                courses = cursor.execute("SELECT COUNT(*) FROM course_rating_stats").fetchone()[0]
+        except sqlite3.Error as e:
+            print(f"Error rebuilding rating statistics: {e}")
+            return None
+        print(f"Rating statistics rebuilt for {teachers} teachers and {courses} courses.")
+        return {"teachers": teachers, "courses": courses}
+    
     def display_feedback(self, feedback_data):
         """Display feedback information in a formatted way"""
         if not feedback_data:
@@ -0,0 +1,158 @@
+import cProfile
+import functools
+import json
+import logging
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from database import WriteError
+
+# Structured timing records (one JSON object per line) are opt-in: they go to
+# the file CMS_TIMING_LOG names (cli.py --timing-log sets it) and are off otherwise.
+TIMING_LOG_ENV = "CMS_TIMING_LOG"
+
+# CMS_PROFILE=cprofile:5 or CMS_PROFILE=tracemalloc:5 profiles the next five
+# menu actions (or public module calls outside the menu) into CMS_PROFILE_DIR.
+PROFILE_ENV = "CMS_PROFILE"
+PROFILE_DIR_ENV = "CMS_PROFILE_DIR"
+DEFAULT_PROFILE_DIR = "profiles"
+PROFILE_MODES = ("cprofile", "tracemalloc")
+
+logger = logging.getLogger("cms.timing")
+logger.propagate = False
+
+
+def configure_timing_log():
+    """Attach the timing log file handler once per process, when one is asked for"""
+    path = os.environ.get(TIMING_LOG_ENV)
+    if not path or logger.handlers:
+        return bool(logger.handlers)
+    handler = logging.FileHandler(path, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    return True
+
+
+class Profiler:
+    def __init__(self, db):
+        """Initialize Profiler for the given database connection"""
+        self.db = db
+        self.logging = configure_timing_log()
+        self.listeners = []
+        self.depth = 0
+        self.profile_mode = None
+        self.profile_remaining = 0
+        self.profile_seq = 0
+        self.profile_dir = os.environ.get(PROFILE_DIR_ENV, DEFAULT_PROFILE_DIR)
+        setting = os.environ.get(PROFILE_ENV)
+        if setting:
+            mode, _, count = setting.partition(":")
+            self.enable_profiling(mode, int(count or 1))
+
+    @property
+    def active(self):
+        """Whether calls need wrapping at all"""
+        return self.logging or bool(self.listeners) or self.profile_remaining > 0
+
+    def enable_profiling(self, mode, count):
+        """Profile the next count actions with cProfile or tracemalloc"""
+        if mode not in PROFILE_MODES:
+            print(f"Error: Profile mode must be one of {', '.join(PROFILE_MODES)}.")
+            return False
+        self.profile_mode = mode
+        self.profile_remaining = count
+        return True
+
+    def record(self, event, **fields):
+        """Log one structured record and pass it to the listeners"""
+        fields = {"event": event, "ts": round(time.time(), 3), **fields}
+        if self.logging:
+            logger.info(json.dumps(fields, default=str))
+        for listener in self.listeners:
+            listener(fields)
+
+    @contextmanager
+    def measure(self, event, **fields):
+        """Time a block, counting the SQL it runs, and profile it if requested"""
+        outer = self.depth == 0
+        self.depth += 1
+        profiling = outer and self.profile_remaining > 0
+        if profiling:
+            self.profile_remaining -= 1
+            profile = self._start_profile()
+        sql_count, sql_time = self.db.sql_count, self.db.sql_time
+        started = time.perf_counter()
+        outcome = {"ok": True}
+        try:
+            yield outcome
+        except BaseException as e:
+            outcome["ok"] = False
+            outcome["error"] = type(e).__name__
+            raise
+        finally:
+            wall = time.perf_counter() - started
+            self.depth -= 1
+            if profiling:
+                fields["profile"] = self._stop_profile(profile, fields)
+            self.record(event, **fields, depth=self.depth, ok=outcome["ok"], error=outcome.get("error"),
+                        wall_ms=round(wall * 1000, 3), sql_count=self.db.sql_count - sql_count,
+                        sql_ms=round((self.db.sql_time - sql_time) * 1000, 3))
+
+    def action(self, module, choice):
+        """Context manager around one menu action"""
+        return self.measure("action", module=module, choice=choice)
+
+    def wrap(self, module_name, instance):
+        """Return a proxy that measures every public method call on instance"""
+        return InstrumentedModule(self, module_name, instance)
+
+    def _start_profile(self):
+        if self.profile_mode == "cprofile":
+            profile = cProfile.Profile()
+            profile.enable()
+            return profile
+        tracemalloc.start()
+        return None
+
+    def _stop_profile(self, profile, fields):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        label = "-".join(str(fields[key]) for key in ("module", "method", "choice") if key in fields)
+        self.profile_seq += 1
+        stamp = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{self.profile_seq}"
+        if self.profile_mode == "cprofile":
+            profile.disable()
+            path = os.path.join(self.profile_dir, f"{stamp}-{label}.prof")
+            profile.dump_stats(path)
+        else:
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            path = os.path.join(self.profile_dir, f"{stamp}-{label}.tracemalloc")
+            snapshot.dump(path)
+        return path
+
+
+class InstrumentedModule:
+    """Proxy around a module object that times its public methods"""
+
+    def __init__(self, profiler, module_name, instance):
+        self._profiler = profiler
+        self._module_name = module_name
+        self._instance = instance
+
+    def __getattr__(self, name):
+        attribute = getattr(self._instance, name)
+        if name.startswith("_") or not callable(attribute):
+            return attribute
+
+        @functools.wraps(attribute)
+        def measured(*args, **kwargs):
+            with self._profiler.measure("call", module=self._module_name, method=name) as outcome:
+                result = attribute(*args, **kwargs)
+                # Empty lists and zero counts are answers; None, False and a WriteError are failures
+                outcome["ok"] = result is not None and result is not False and not isinstance(result, WriteError)
+                return result
+
+        return measured
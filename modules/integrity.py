@@ -0,0 +1,179 @@
+import sqlite3
+
+from modules.archive import move_rows, prepare_archive
+from modules.write_queue import WriteRejected, release_seats
+
+POLICIES = ("cascade", "restrict", "archive")
+
+# parent table -> (primary key, [(child table, referencing column, default policy)]).
+# Children are handled in order before the parent rows are deleted.
+RELATIONS = {
+    "students": ("student_id", [
+        ("book_issues", "student_id", "archive"),
+        ("feedback", "student_id", "archive"),
+        ("enrollments", "student_id", "cascade"),
+        ("enrollment_history", "student_id", "archive"),
+        ("event_registrations", "student_id", "cascade"),
+    ]),
+    "teachers": ("teacher_id", [
+        ("feedback", "teacher_id", "archive"),
+        ("course_sections", "teacher_id", "restrict"),
+        ("teacher_availability", "teacher_id", "cascade"),
+        ("teacher_rating_stats", "teacher_id", "cascade"),
+    ]),
+    "books": ("book_id", [
+        ("book_issues", "book_id", "archive"),
+    ]),
+    "courses": ("course_id", [
+        ("enrollments", "course_id", "restrict"),
+        ("enrollment_history", "course_id", "archive"),
+        ("course_sections", "course_id", "cascade"),
+        ("course_prerequisites", "course_id", "cascade"),
+        ("course_prerequisites", "prerequisite_id", "cascade"),
+    ]),
+    "events": ("event_id", [
+        ("event_registrations", "event_id", "cascade"),
+    ]),
+}
+# Child rows that block a delete whatever the policy: a book still on loan
+OPEN_CHILDREN = {
+    "book_issues": "status = 'issued'",
+}
+# Removing these child rows frees capacity: (column, which rows, function(cursor, value, rows))
+# runs once per distinct value, unless that value's parent is the one being deleted
+FOLLOW_UPS = {
+    "event_registrations": ("event_id", "status = 'registered'", release_seats),
+}
+
+
+class IntegrityManager:
+    def __init__(self, db, policies=None):
+        """Initialize IntegrityManager class with database connection and policy overrides"""
+        self.db = db
+        # {(child table, column): policy} overriding RELATIONS, e.g. {("feedback", "teacher_id"): "cascade"}
+        self.policies = dict(policies or {})
+
+    def delete(self, table, ids, policies=None):
+        """Delete many rows of a parent table in one transaction, applying each child relation's policy.
+
+        Returns a report of what happened to the children, or None if a
+        restrict policy (or an open loan) refused the delete.
+        """
+        if table not in RELATIONS:
+            print(f"Error: Cannot delete from {table}.")
+            return None
+        key, relations = RELATIONS[table]
+        resolved = self._resolve(relations, policies)
+        if resolved is None:
+            return None
+        ids = list(dict.fromkeys(ids))
+        if "archive" in resolved.values() and not prepare_archive(self.db):
+            return None
+        try:
+            with self.db.transaction() as cursor:
+                cursor.execute("BEGIN IMMEDIATE")
+                self._load_ids(cursor, ids)
+                cursor.execute(f"""
+                    DELETE FROM delete_ids WHERE id NOT IN (SELECT {key} FROM {table})
+                    RETURNING id
+                """)
+                missing = sorted(row[0] for row in cursor.fetchall())
+                children = {}
+                for child, column in resolved:
+                    policy = resolved[(child, column)]
+                    rows = self._apply(cursor, child, column, policy, "IN (SELECT id FROM delete_ids)")
+                    if rows:
+                        children[f"{child}.{column}"] = {"policy": policy, "rows": rows}
+                cursor.execute(f"DELETE FROM {table} WHERE {key} IN (SELECT id FROM delete_ids)")
+                deleted = cursor.rowcount
+        except WriteRejected as e:
+            print(f"Error: {e}")
+            return None
+        except sqlite3.Error as e:
+            print(f"Error deleting from {table}: {e}")
+            return None
+        return {"deleted": deleted, "missing": missing, "children": children}
+
+    def cleanup_orphans(self, dry_run=False):
+        """Find child rows whose parent no longer exists and apply each relation's policy to them, set-based.
+
+        Restrict relations are only reported: there is no parent left to keep.
+        """
+        resolved = {}
+        for parent, (key, relations) in RELATIONS.items():
+            policies = self._resolve(relations)
+            if policies is None:
+                return None
+            resolved.update({(parent, child, column): policy for (child, column), policy in policies.items()})
+        if not dry_run and "archive" in resolved.values() and not prepare_archive(self.db):
+            return None
+        report = {}
+        try:
+            with self.db.transaction() as cursor:
+                cursor.execute("BEGIN IMMEDIATE")
+                for (parent, child, column), policy in resolved.items():
+                    key = RELATIONS[parent][0]
+                    orphaned = f"NOT IN (SELECT {key} FROM {parent})"
+                    count = cursor.execute(f"SELECT COUNT(*) FROM {child} WHERE {column} {orphaned}").fetchone()[0]
+                    if not count:
+                        continue
+                    action = "reported"
+                    if not dry_run and policy != "restrict":
+                        self._apply(cursor, child, column, policy, orphaned, guard=False)
+                        action = "archived" if policy == "archive" else "deleted"
+                    report[f"{child}.{column}"] = {"parent": parent, "orphans": count, "action": action}
+                if dry_run:
+                    raise _DryRun()
+        except _DryRun:
+            pass
+        except sqlite3.Error as e:
+            print(f"Error cleaning up orphans: {e}")
+            return None
+        return report
+
+    def _resolve(self, relations, policies=None):
+        """{(child, column): policy} for one parent, after overrides; None if a policy is unknown"""
+        overrides = {**self.policies, **(policies or {})}
+        resolved = {}
+        for child, column, default in relations:
+            policy = overrides.get((child, column), overrides.get(child, default))
+            if policy not in POLICIES:
+                print(f"Error: Unknown policy '{policy}' for {child}.{column}. Use one of {', '.join(POLICIES)}.")
+                return None
+            resolved[(child, column)] = policy
+        return resolved
+
+    def _apply(self, cursor, child, column, policy, match, guard=True):
+        """Restrict, cascade or archive the rows of child whose column matches; returns how many"""
+        condition = f"{column} {match}"
+        if guard and child in OPEN_CHILDREN:
+            open_rows = cursor.execute(f"SELECT COUNT(*) FROM {child} WHERE {condition} "
+                                       f"AND {OPEN_CHILDREN[child]}").fetchone()[0]
+            if open_rows:
+                raise WriteRejected(f"{open_rows} open {child} rows still reference these rows.")
+        count = cursor.execute(f"SELECT COUNT(*) FROM {child} WHERE {condition}").fetchone()[0]
+        if not count:
+            return 0
+        if policy == "restrict":
+            raise WriteRejected(f"{count} {child} rows still reference these rows ({column}).")
+        affected = []
+        if child in FOLLOW_UPS and FOLLOW_UPS[child][0] != column:
+            target, freed, function = FOLLOW_UPS[child]
+            affected = cursor.execute(f"SELECT {target}, COUNT(*) FROM {child} "
+                                      f"WHERE {condition} AND {freed} GROUP BY {target}").fetchall()
+        if policy == "archive":
+            move_rows(self.db, cursor, child, condition)
+        else:
+            cursor.execute(f"DELETE FROM {child} WHERE {condition}")
+        for value, rows in affected:
+            function(cursor, value, rows)
+        return count
+
+    def _load_ids(self, cursor, ids):
+        cursor.execute("CREATE TEMP TABLE IF NOT EXISTS delete_ids (id INTEGER PRIMARY KEY)")
+        cursor.execute("DELETE FROM delete_ids")
+        cursor.executemany("INSERT OR IGNORE INTO delete_ids (id) VALUES (?)", ((i,) for i in ids))
+
+
+class _DryRun(Exception):
+    """Rolls back a cleanup that only reports"""
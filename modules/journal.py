@@ -0,0 +1,123 @@
+import time
+
+JOURNAL_COLUMNS = ["seq", "table_name", "pk", "op", "columns"]
+DEFAULT_BATCH_SIZE = 1000
+# Streaming consumers drop fully consumed entries at most this often
+COMPACT_INTERVAL = 60.0
+# system_state key: the head after a bulk load whose rows were not journaled
+BASELINE_KEY = "journal_baseline"
+
+
+class ChangeJournal:
+    def __init__(self, db):
+        """Initialize ChangeJournal class with database connection"""
+        self.db = db
+        self.last_compacted = time.monotonic()
+
+    def head(self):
+        """Sequence number of the newest change ever journaled (0 if none)"""
+        row = self.db.fetch_one("SELECT seq FROM sqlite_sequence WHERE name = 'change_journal'")
+        return row[0] if row else 0
+
+    def get_baseline(self):
+        """Head recorded after the last bulk load: older rows are in the tables, not the journal (0 if none)"""
+        row = self.db.fetch_one("SELECT value FROM system_state WHERE key = ?", (BASELINE_KEY,))
+        return int(row[0]) if row else 0
+
+    def record_baseline(self):
+        """Record the current head as the baseline after a bulk load; returns it"""
+        head = self.head()
+        self.db.execute_query("""
+            INSERT INTO system_state (key, value) VALUES (?, ?)
+            ON CONFLICT (key) DO UPDATE SET value = excluded.value
+        """, (BASELINE_KEY, str(head)))
+        return head
+
+    def read(self, after_seq=0, limit=DEFAULT_BATCH_SIZE, tables=None):
+        """Journal entries after a sequence number, oldest first; columns lists what an update changed"""
+        query = f"SELECT {', '.join(JOURNAL_COLUMNS)} FROM change_journal WHERE seq > ?"
+        params = [after_seq]
+        if tables:
+            query += f" AND table_name IN ({', '.join('?' * len(tables))})"
+            params.extend(tables)
+        rows = self.db.fetch_all(query + " ORDER BY seq LIMIT ?", (*params, limit))
+        return [dict(zip(JOURNAL_COLUMNS, row), columns=row[4].split(",") if row[4] else None) for row in rows]
+
+    def subscribe(self, consumer, from_seq=None):
+        """Register a consumer, starting at from_seq or at the current head; returns its offset"""
+        start = self.head() if from_seq is None else from_seq
+        self.db.execute_query("""
+            INSERT OR IGNORE INTO change_consumers (consumer, last_seq, updated_at)
+            VALUES (?, ?, datetime('now'))
+        """, (consumer, start))
+        return self.get_offset(consumer)
+
+    def unsubscribe(self, consumer):
+        """Forget a consumer so it no longer holds back compaction"""
+        self.db.execute_query("DELETE FROM change_consumers WHERE consumer = ?", (consumer,))
+        return self.db.cursor.rowcount > 0
+
+    def get_offset(self, consumer):
+        """Last sequence number the consumer has committed, or None if it is not subscribed"""
+        row = self.db.fetch_one("SELECT last_seq FROM change_consumers WHERE consumer = ?", (consumer,))
+        return row[0] if row else None
+
+    def get_consumers(self):
+        """Every consumer with its committed offset and how many changes it is behind"""
+        head = self.head()
+        rows = self.db.fetch_all("SELECT consumer, last_seq, updated_at FROM change_consumers ORDER BY consumer")
+        return [{"consumer": consumer, "last_seq": last_seq, "lag": head - last_seq, "updated_at": updated_at}
+                for consumer, last_seq, updated_at in rows]
+
+    def fetch(self, consumer, limit=DEFAULT_BATCH_SIZE):
+        """Next batch after the consumer's committed offset, without moving it"""
+        offset = self.get_offset(consumer)
+        if offset is None:
+            print(f"Error: Journal consumer '{consumer}' is not subscribed.")
+            return []
+        return self.read(offset, limit)
+
+    def commit(self, consumer, seq):
+        """Durably record that the consumer has processed every change up to seq"""
+        if not self.db.execute_query("""
+            UPDATE change_consumers SET last_seq = MAX(last_seq, ?), updated_at = datetime('now')
+            WHERE consumer = ?
+        """, (seq, consumer)):
+            return False
+        if self.db.cursor.rowcount == 0:
+            print(f"Error: Journal consumer '{consumer}' is not subscribed.")
+            return False
+        return True
+
+    def stream(self, consumer, batch_size=DEFAULT_BATCH_SIZE, tables=None, follow=False, poll_interval=1.0):
+        """Yield batches of changes from the consumer's offset, committing each one when the next is asked for.
+
+        Delivery is at least once: a batch the caller did not finish is read
+        again on the next run. Entries of other tables advance the offset too.
+        """
+        self.subscribe(consumer)
+        while True:
+            batch = self.fetch(consumer, batch_size)
+            if not batch:
+                if not follow:
+                    return
+                time.sleep(poll_interval)
+                continue
+            wanted = [change for change in batch if not tables or change["table_name"] in tables]
+            if wanted:
+                yield wanted
+            self.commit(consumer, batch[-1]["seq"])
+            if time.monotonic() - self.last_compacted >= COMPACT_INTERVAL:
+                self.compact()
+
+    def compact(self):
+        """Delete entries every consumer has committed, or all of them when none is subscribed; returns how many"""
+        self.last_compacted = time.monotonic()
+        # New consumers start at the head, so with none registered nothing is still needed
+        if not self.db.execute_query("""
+            DELETE FROM change_journal
+            WHERE seq <= COALESCE((SELECT MIN(last_seq) FROM change_consumers),
+                                  (SELECT seq FROM sqlite_sequence WHERE name = 'change_journal'))
+        """):
+            return None
+        return self.db.cursor.rowcount
@@ -1,5 +1,10 @@
-from database import Database
+from database import Database, WriteError
+from modules.archive import tiered
+from modules.integrity import IntegrityManager
+from modules.metrics import BOOKS_ISSUED, BOOKS_RETURNED
+from modules.write_queue import WriteRejected, issue_book
 import datetime
+import sqlite3
 
 class Library:
     def __init__(self, db):
@@ -7,95 +12,82 @@ class Library:
         self.db = db
     
     def add_book(self, title, author, isbn, publisher, year_published, total_copies):
-        """Add a new book to the library"""
-        # Check if ISBN already exists
-        exists = self.db.fetch_one("SELECT isbn FROM books WHERE isbn = ?", (isbn,))
-        if exists:
-            print(f"Error: Book with ISBN {isbn} already exists.")
-            return False
-        
+        """Add a new book; returns the created record, or a WriteError if the ISBN is taken"""
+        # The UNIQUE isbn constraint is the duplicate check
         query = """
         INSERT INTO books (title, author, isbn, publisher, year_published, total_copies, available_copies)
         VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (isbn) DO NOTHING
+        RETURNING *
         """
         # Initially, available copies equals total copies
         params = (title, author, isbn, publisher, year_published, total_copies, total_copies)
         
-        if self.db.execute_query(query, params):
+        book = self.db.execute_returning(query, params)
+        if book is None:
+            return WriteError("duplicate", f"Book with ISBN {isbn} already exists.").report()
+        if book:
             print(f"Book '{title}' added successfully.")
-            return True
-        return False
+        return book
     
     def update_book(self, book_id, **kwargs):
-        """Update book information"""
+        """Update book information; returns the updated record or a WriteError"""
         valid_fields = ['title', 'author', 'isbn', 'publisher', 'year_published', 'total_copies']
         
         # Filter out invalid fields
         updates = {k: v for k, v in kwargs.items() if k in valid_fields and v is not None}
         
         if not updates:
-            print("No valid fields to update.")
-            return False
-
-        # Check if book_id exists before trying to update further
-        # Note: self.get_book() will be called again if 'total_copies' is in updates.
-        # This initial check is for general existence.
-        initial_book_check = self.get_book(book_id)
-        if not initial_book_check:
-            # get_book already prints an error if not found, so just return False
-            return False
-            return False
-        
-        # Special handling for total_copies to adjust available_copies accordingly
-        if 'total_copies' in updates:
-            book = self.get_book(book_id)
-            if book:
-                current_total = book['total_copies']
-                current_available = book['available_copies']
-                new_total = updates['total_copies']
-                
-                # Calculate books currently issued
-                issued = current_total - current_available
-                
-                # Ensure the new total is not less than books currently issued
-                if new_total < issued:
-                    print(f"Error: Cannot set total copies to {new_total} as {issued} books are currently issued.")
-                    return False
-                
-                # Update available copies accordingly
-                new_available = new_total - issued
-                updates['available_copies'] = new_available
+            return WriteError("invalid", "No valid fields to update.").report()
         
         # Construct update query
         set_clause = ", ".join([f"{field} = ?" for field in updates.keys()])
-        query = f"UPDATE books SET {set_clause} WHERE book_id = ?"
+        condition = "book_id = ?"
         
         # Parameters for the query
-        params = list(updates.values()) + [book_id]
+        params = list(updates.values())
+        where_params = [book_id]
+        
+        # Available copies move with the total, computed from the row itself; the
+        # condition refuses a total below the number of copies currently issued
+        new_total = updates.get('total_copies')
+        if new_total is not None:
+            set_clause += ", available_copies = ? - (total_copies - available_copies)"
+            params.append(new_total)
+            condition += " AND ? >= total_copies - available_copies"
+            where_params.append(new_total)
         
-        if self.db.execute_query(query, tuple(params)):
+        query = f"UPDATE books SET {set_clause} WHERE {condition} RETURNING *"
+        book = self.db.execute_returning(query, tuple(params + where_params))
+        if book is None:
+            # Nothing updated: find out why (only on this failure path)
+            issued = self.db.fetch_one("SELECT total_copies - available_copies FROM books WHERE book_id = ?",
+                                       (book_id,))
+            if not issued:
+                return WriteError("not_found", f"Book with ID {book_id} does not exist.").report()
+            message = f"Cannot set total copies to {new_total} as {issued[0]} books are currently issued."
+            return WriteError("invalid", message).report()
+        if book:
             print(f"Book ID {book_id} updated successfully.")
-            return True
-        return False
+        return book
     
-    def delete_book(self, book_id):
-        """Delete a book from the library"""
-        # Check if book exists and if it has any issues
-        book = self.get_book(book_id)
-        if not book:
-            print(f"Error: Book with ID {book_id} does not exist.")
+    def delete_book(self, book_id, policies=None):
+        """Delete a book from the library, archiving its returned issues by default"""
+        # Refused while any copy is still issued
+        report = IntegrityManager(self.db).delete("books", [book_id], policies)
+        if report is None:
             return False
-        
-        # Check if book is currently issued
-        if book['total_copies'] != book['available_copies']:
-            print(f"Error: Cannot delete book ID {book_id} as it has issues pending.")
-            return False
-        
-        query = "DELETE FROM books WHERE book_id = ?"
-        if self.db.execute_query(query, (book_id,)):
-            print(f"Book ID {book_id} deleted successfully.")
-            return True
-        return False
+        if report["missing"]:
+            return WriteError("not_found", f"Book with ID {book_id} does not exist.").report()
+        print(f"Book ID {book_id} deleted successfully.")
+        return True
+
+    def delete_books(self, book_ids, policies=None):
+        """Delete many books in one transaction; refused if any of them is still issued"""
+        report = IntegrityManager(self.db).delete("books", book_ids, policies)
+        if report is not None:
+            print(f"{report['deleted']} books deleted successfully.")
+        return report
     
     def get_book(self, book_id):
         """Get book details by ID"""
@@ -111,9 +103,14 @@ class Library:
                   "year_published", "total_copies", "available_copies"]
         return dict(zip(columns, book))
     
-    def get_all_books(self):
+    def get_all_books(self, stream=False):
         """Get all books in the library"""
         query = "SELECT * FROM books ORDER BY title"
+        columns = ["book_id", "title", "author", "isbn", "publisher", 
+                  "year_published", "total_copies", "available_copies"]
+        if stream:
+            # Read while the response is sent, not into one list first
+            return self.db.stream(columns, query)
         books = self.db.fetch_all(query)
         
         if not books:
@@ -121,8 +118,6 @@ class Library:
             return []
         
         # Convert to list of dictionaries
-        columns = ["book_id", "title", "author", "isbn", "publisher", 
-                  "year_published", "total_copies", "available_copies"]
         return [dict(zip(columns, book)) for book in books]
     
     def search_books(self, search_term):
@@ -146,102 +141,108 @@ class Library:
         return [dict(zip(columns, book)) for book in books]
     
     def issue_book(self, book_id, student_id):
-        """Issue a book to a student"""
-        # Check if book exists and is available
-        book = self.get_book(book_id)
-        if not book:
+        """Issue a book to a student; returns the issue record, or False if it was refused"""
+        # One immediate transaction around the same checkout the write queue
+        # uses: the conditional decrement never hands out a copy twice
+        try:
+            with self.db.transaction() as cursor:
+                cursor.execute("BEGIN IMMEDIATE")
+                issue_id = issue_book(cursor, book_id, student_id)
+                issue = cursor.execute("SELECT issue_id, book_id, student_id, issue_date, return_date "
+                                       "FROM book_issues WHERE issue_id = ?", (issue_id,)).fetchone()
+        except WriteRejected as e:
+            print(f"Error: {e}")
             return False
-        
-        if book['available_copies'] <= 0:
-            print(f"Error: No copies of book '{book['title']}' are available.")
-            return False
-        
-        # Check if student exists
-        student_exists = self.db.fetch_one("SELECT student_id FROM students WHERE student_id = ?", (student_id,))
-        if not student_exists:
-            print(f"Error: Student with ID {student_id} does not exist.")
-            return False
-        
-        # Check if student already has this book
-        already_issued = self.db.fetch_one("""
-            SELECT issue_id FROM book_issues 
-            WHERE book_id = ? AND student_id = ? AND status = 'issued'
-        """, (book_id, student_id))
-        
-        if already_issued:
-            print(f"Error: This book is already issued to this student.")
+        except sqlite3.Error as e:
+            print(f"Error issuing book: {e}")
             return False
         
-        # Issue the book
-        # Directly create string dates using the (mocked) datetime.datetime.now()
-        issue_date = datetime.datetime.now().strftime("%Y-%m-%d")
-        return_date = (datetime.datetime.now() + datetime.timedelta(days=14)).strftime("%Y-%m-%d")
-
-        query = """
-        INSERT INTO book_issues (book_id, student_id, issue_date, return_date, status)
-        VALUES (?, ?, ?, ?, 'issued')
-        """
-        params = (book_id, student_id, str(issue_date), str(return_date)) # Explicitly cast to str for paranoia
-        
-        if self.db.execute_query(query, params):
-            # Update available copies
-            update_query = "UPDATE books SET available_copies = available_copies - 1 WHERE book_id = ?"
-            if self.db.execute_query(update_query, (book_id,)):
-                print(f"Book '{book['title']}' issued to student ID {student_id} successfully.")
-                print(f"Return Date: {return_date}") # Corrected variable name
-                return True
-        
-        return False
+        BOOKS_ISSUED.inc()
+        print(f"Book ID {book_id} issued to student ID {student_id} successfully.")
+        print(f"Return Date: {issue[4]}")
+        return dict(zip(["issue_id", "book_id", "student_id", "issue_date", "return_date"], issue))
     
     def return_book(self, issue_id):
-        """Process a book return"""
-        # Get issue details
-        query = "SELECT * FROM book_issues WHERE issue_id = ?"
-        issue = self.db.fetch_one(query, (issue_id,))
-        
-        if not issue:
-            print(f"Error: Issue ID {issue_id} not found.")
+        """Process a book return; returns the closed issue record, or False if it was refused"""
+        actual_return_date = datetime.datetime.now().strftime("%Y-%m-%d")
+        try:
+            with self.db.transaction() as cursor:
+                # Conditional update, as issue_book's decrement: only an open issue
+                # is closed, so two returns of the same issue free one copy.
+                # Fine if late: $2 per day past the return date.
+                issue = cursor.execute("""
+                    UPDATE book_issues
+                    SET actual_return_date = :today, status = 'returned',
+                        fine_amount = MAX(0, COALESCE(CAST(julianday(:today) - julianday(return_date) AS INTEGER), 0)) * 2
+                    WHERE issue_id = :issue_id AND status = 'issued'
+                    RETURNING issue_id, book_id, student_id, issue_date, return_date, actual_return_date,
+                              fine_amount, status
+                """, {"today": actual_return_date, "issue_id": issue_id}).fetchone()
+                if issue:
+                    cursor.execute("UPDATE books SET available_copies = available_copies + 1 WHERE book_id = ?",
+                                   (issue[1],))
+                else:
+                    returned = cursor.execute("SELECT status FROM book_issues WHERE issue_id = ?",
+                                              (issue_id,)).fetchone()
+        except sqlite3.Error as e:
+            print(f"Error returning book: {e}")
             return False
-        
-        # Convert to dictionary for easier access
-        issue_columns = ["issue_id", "book_id", "student_id", "issue_date", 
-                         "return_date", "actual_return_date", "fine_amount", "status"]
-        issue_data = dict(zip(issue_columns, issue))
-        
-        if issue_data['status'] == 'returned':
-            print("This book has already been returned.")
+
+        if not issue:
+            print("This book has already been returned." if returned else f"Error: Issue ID {issue_id} not found.")
             return False
-        
-        # Process return
-        actual_return_date = datetime.datetime.now().strftime("%Y-%m-%d")
-        
-        # Calculate fine if late
-        fine_amount = 0
-        if issue_data['return_date']:
-            return_date = datetime.datetime.strptime(issue_data['return_date'], "%Y-%m-%d")
-            actual_date = datetime.datetime.strptime(actual_return_date, "%Y-%m-%d")
-            
-            if actual_date > return_date:
-                days_late = (actual_date - return_date).days
-                fine_amount = days_late * 2  # $2 per day
+        issue_data = dict(zip(["issue_id", "book_id", "student_id", "issue_date", "return_date",
+                               "actual_return_date", "fine_amount", "status"], issue))
+        BOOKS_RETURNED.inc()
+        print(f"Book ID {issue_data['book_id']} returned successfully.")
+        if issue_data['fine_amount'] > 0:
+            print(f"Fine: ${issue_data['fine_amount']}")
+        return issue_data
+    
+    def get_overdue_issues(self, as_of=None):
+        """Get all issued books whose return date has passed"""
+        as_of = as_of or datetime.datetime.now().strftime("%Y-%m-%d")
+        query = """
+        SELECT bi.issue_id, bi.book_id, b.title, bi.student_id, s.name,
+               bi.issue_date, bi.return_date,
+               CAST(julianday(?) - julianday(bi.return_date) AS INTEGER) AS days_overdue
+        FROM book_issues bi
+        JOIN books b ON bi.book_id = b.book_id
+        JOIN students s ON bi.student_id = s.student_id
+        WHERE bi.status = 'issued' AND bi.return_date < ?
+        ORDER BY bi.return_date
+        """
+        issues = self.db.fetch_all(query, (as_of, as_of))
+
+        columns = ["issue_id", "book_id", "title", "student_id", "student_name",
+                   "issue_date", "return_date", "days_overdue"]
+        # Fine accrues at the same $2 per day charged by return_book
+        return [dict(zip(columns, issue), fine_due=issue[7] * 2) for issue in issues]
 
-        # Update issue record
-        update_issue_query = """
-        UPDATE book_issues 
-        SET actual_return_date = ?, fine_amount = ?, status = 'returned'
-        WHERE issue_id = ?
+    def get_issue_history(self, student_id=None, book_id=None, include_archived=False):
+        """Get past and current issues for a student and/or book, newest first"""
+        conditions, params = [], []
+        if student_id is not None:
+            conditions.append("bi.student_id = ?")
+            params.append(student_id)
+        if book_id is not None:
+            conditions.append("bi.book_id = ?")
+            params.append(book_id)
+        query = f"""
+        SELECT bi.issue_id, bi.book_id, b.title, bi.student_id, s.name,
+               bi.issue_date, bi.return_date, bi.actual_return_date, bi.fine_amount, bi.status
+        FROM {tiered(self.db, "book_issues", include_archived)} bi
+        LEFT JOIN books b ON bi.book_id = b.book_id
+        LEFT JOIN students s ON bi.student_id = s.student_id
         """
-        if self.db.execute_query(update_issue_query, (actual_return_date, fine_amount, issue_id)):
-            # Update book availability
-            update_book_query = "UPDATE books SET available_copies = available_copies + 1 WHERE book_id = ?"
-            if self.db.execute_query(update_book_query, (issue_data['book_id'],)):
-                print(f"Book ID {issue_data['book_id']} returned successfully.")
-                if fine_amount > 0:
-                    print(f"Fine: ${fine_amount}")
-                return True
-        
-        return False
-    
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        issues = self.db.fetch_all(query + " ORDER BY bi.issue_date DESC, bi.issue_id DESC", tuple(params))
+
+        columns = ["issue_id", "book_id", "title", "student_id", "student_name", "issue_date",
+                   "return_date", "actual_return_date", "fine_amount", "status"]
+        return [dict(zip(columns, issue)) for issue in issues]
+
     def display_book(self, book_data):
         """Display book information in a formatted way"""
         if not book_data:
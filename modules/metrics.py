@@ -0,0 +1,247 @@
+import bisect
+import os
+import threading
+import time
+
+# Latency buckets in seconds, from 100µs (indexed lookups) to 10s (AI calls)
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class Metric:
+    """Base class holding one series per label combination"""
+
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.series = {}
+        if not self.labelnames:
+            # Unlabelled metrics are exported as 0 before their first event
+            self.series[()] = self._new_series()
+
+    def labels(self, *values):
+        """Return the series for these label values, creating it on first use"""
+        series = self.series.get(values)
+        if series is None:
+            with self.lock:
+                series = self.series.setdefault(values, self._new_series())
+        return series
+
+    def _new_series(self):
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            items = list(self.series.items())
+        for values, series in items:
+            lines.extend(series.render(self.name, self.labelnames, values))
+        return lines
+
+
+class _Value:
+    def __init__(self):
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def render(self, name, labelnames, values):
+        return [f"{name}{format_labels(labelnames, values)} {format_value(self.value)}"]
+
+
+class _GaugeValue(_Value):
+    def dec(self, amount=1):
+        with self.lock:
+            self.value -= amount
+
+    def set(self, value):
+        with self.lock:
+            self.value = value
+
+
+class _HistogramValue:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def render(self, name, labelnames, values):
+        with self.lock:
+            counts = list(self.counts)
+            total = self.sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            labels = format_labels(labelnames, values, [("le", format_value(bound))])
+            lines.append(f"{name}_bucket{labels} {cumulative}")
+        lines.append(f"{name}_sum{format_labels(labelnames, values)} {format_value(total)}")
+        lines.append(f"{name}_count{format_labels(labelnames, values)} {cumulative}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new_series(self):
+        return _Value()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def _new_series(self):
+        return _GaugeValue()
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def dec(self, amount=1):
+        self.labels().dec(amount)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help_text, labelnames)
+
+    def _new_series(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+
+class Registry:
+    def __init__(self):
+        """Initialize an empty metrics registry"""
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        with self.lock:
+            return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help_text, labelnames=()):
+        return self.register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self.register(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+DB_QUERY_SECONDS = REGISTRY.histogram("cms_db_query_seconds", "Latency of individual SQL statements.")
+DB_ERRORS = REGISTRY.counter("cms_db_errors_total", "SQL statements that raised an error.", ["operation"])
+OPERATIONS = REGISTRY.counter("cms_operations_total", "Module method calls.", ["module", "method", "outcome"])
+OPERATION_SECONDS = REGISTRY.histogram("cms_operation_seconds", "Latency of module method calls.", ["module"])
+OPERATION_EXCEPTIONS = REGISTRY.counter("cms_operation_exceptions_total",
+                                        "Module method calls that raised.", ["module"])
+BOOKS_ISSUED = REGISTRY.counter("cms_books_issued_total", "Books issued to students.")
+BOOKS_RETURNED = REGISTRY.counter("cms_books_returned_total", "Books returned.")
+STUDENTS_ADDED = REGISTRY.counter("cms_students_added_total", "Students added.")
+FEEDBACK_SUBMITTED = REGISTRY.counter("cms_feedback_submitted_total", "Feedback entries submitted.")
+EVENT_REGISTRATIONS = REGISTRY.counter("cms_event_registrations_total", "Event registrations by outcome.",
+                                       ["status"])
+BACKUPS = REGISTRY.counter("cms_backups_total", "Online backups by outcome.", ["outcome"])
+BACKUP_BYTES_PER_SECOND = REGISTRY.gauge("cms_backup_bytes_per_second", "Throughput of the last backup.")
+BACKUP_LONGEST_STEP = REGISTRY.gauge("cms_backup_longest_step_seconds",
+                                     "Longest single backup step, the longest the source was locked.")
+AI_REQUESTS = REGISTRY.counter("cms_ai_requests_total", "AI assistant requests.", ["outcome"])
+AI_SECONDS = REGISTRY.histogram("cms_ai_request_seconds", "AI assistant response time.")
+PROCESS_START = REGISTRY.gauge("cms_process_start_time_seconds", "Unix time the process started.")
+PROCESS_START.set(time.time())
+
+
+def observe_operation(record):
+    """Profiler listener turning timed module calls into metrics"""
+    if record["event"] != "call":
+        return
+    module = record["module"]
+    if record.get("error"):
+        OPERATION_EXCEPTIONS.labels(module).inc()
+    OPERATIONS.labels(module, record["method"], "ok" if record["ok"] else "failed").inc()
+    OPERATION_SECONDS.labels(module).observe(record["wall_ms"] / 1000)
+
+
+class MetricsFileExporter:
+    def __init__(self, path, interval=15.0, registry=REGISTRY):
+        """Write the registry to path every interval seconds from a daemon thread"""
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="cms-metrics-exporter", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        self.write()
+
+    def write(self):
+        """Replace the file atomically so scrapers never see a partial write"""
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(self.registry.render())
+        os.replace(temp_path, self.path)
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.write()
+            except OSError as e:
+                print(f"Metrics export error: {e}")
@@ -0,0 +1,171 @@
+import sqlite3
+import time
+
+from database import ROLLUP_WATERMARK
+from modules.archive import tiered
+
+GRAINS = ("day", "week", "month", "semester")
+
+# Bucket label for a YYYY-MM-DD value at each grain. Weeks are labelled by
+# their Monday; semesters are YYYY-S1 (January-June) and YYYY-S2.
+BUCKETS = {
+    "day": "date({0})",
+    "week": "date({0}, 'weekday 0', '-6 days')",
+    "month": "strftime('%Y-%m', {0})",
+    "semester": "strftime('%Y', {0}) || CASE WHEN strftime('%m', {0}) <= '06' THEN '-S1' ELSE '-S2' END",
+}
+
+# metric -> (table, id column, date column, value summed into total).
+# New rows are picked up by id above the source's watermark; updates and
+# deletes of rows already rolled up arrive through rollup_log (see database.py).
+SOURCES = {
+    "enrollments": ("students", "student_id", "enrollment_date", "1"),
+    "book_issues": ("book_issues", "issue_id", "issue_date", "1"),
+    "book_returns": ("book_issues", "issue_id", "actual_return_date", "1"),
+    "feedback": ("feedback", "feedback_id", "date_submitted", "rating"),
+}
+
+WATERMARK_PREFIX = "rollup_watermark:"
+# A read folds in at most about this many rows past the watermarks and log
+# entries on the fly; a longer tail is refreshed first, so reads stay fast
+# without a scheduled refresh
+REFRESH_THRESHOLD = 5000
+
+
+class Rollups:
+    def __init__(self, db):
+        """Initialize Rollups class with database connection"""
+        self.db = db
+
+    def refresh(self, include_archived=False):
+        """Fold rows added since the last refresh, and logged changes, into the rollup tables.
+
+        include_archived reads the source rows from both tiers, for a rebuild.
+        """
+        started = time.perf_counter()
+        try:
+            # Resolved (and the archive attached) before the transaction: ATTACH cannot run inside one
+            sources = {table: tiered(self.db, table, include_archived) for table, _, _, _ in SOURCES.values()}
+            targets, last_log = self._pending(self.db.cursor, sources)
+            if last_log is None and all(newest <= watermark for watermark, newest in targets.values()):
+                return {"rows": {}, "seconds": round(time.perf_counter() - started, 3)}
+
+            with self.db.transaction() as cursor:
+                # Take the write lock before reading so no change slips between
+                # the aggregation and the new watermark
+                cursor.execute("BEGIN IMMEDIATE")
+                targets, last_log = self._pending(cursor, sources)
+                cursor.execute("CREATE TEMP TABLE IF NOT EXISTS rollup_delta "
+                               "(metric TEXT, day TEXT, count INTEGER, total INTEGER)")
+                cursor.execute("DELETE FROM rollup_delta")
+                for metric, (table, id_column, date_column, value) in SOURCES.items():
+                    watermark, newest = targets[table]
+                    cursor.execute(f"""
+                        INSERT INTO rollup_delta (metric, day, count, total)
+                        SELECT ?, date({date_column}), COUNT(*), SUM({value}) FROM {sources[table]}
+                        WHERE {id_column} > ? AND {id_column} <= ? AND date({date_column}) IS NOT NULL
+                        GROUP BY date({date_column})
+                    """, (metric, watermark, newest))
+
+                # Changes to rows that were already rolled up
+                if last_log is not None:
+                    cursor.execute("""
+                        INSERT INTO rollup_delta (metric, day, count, total)
+                        SELECT metric, day, SUM(count), SUM(total) FROM rollup_log
+                        WHERE log_id <= ? AND day IS NOT NULL GROUP BY metric, day
+                    """, (last_log,))
+                    cursor.execute("DELETE FROM rollup_log WHERE log_id <= ?", (last_log,))
+                folded = dict(cursor.execute(
+                    "SELECT metric, SUM(count) FROM rollup_delta GROUP BY metric").fetchall())
+
+                for grain in GRAINS:
+                    bucket = BUCKETS[grain].format("day")
+                    cursor.execute(f"""
+                        INSERT INTO rollups (metric, grain, bucket, count, total)
+                        SELECT metric, ?, {bucket}, SUM(count), SUM(total) FROM rollup_delta
+                        WHERE true GROUP BY metric, {bucket}
+                        ON CONFLICT (metric, grain, bucket) DO UPDATE SET
+                            count = count + excluded.count, total = total + excluded.total
+                    """, (grain,))
+
+                # A watermark never moves back: after the newest rows are archived
+                # or deleted, MAX(id) can fall below rows already folded in
+                for table, (_, newest) in targets.items():
+                    cursor.execute("""
+                        INSERT INTO system_state (key, value) VALUES (?, ?)
+                        ON CONFLICT (key) DO UPDATE SET
+                            value = MAX(CAST(value AS INTEGER), CAST(excluded.value AS INTEGER))
+                    """, (WATERMARK_PREFIX + table, str(newest)))
+                cursor.execute("DELETE FROM rollups WHERE count = 0")
+                cursor.execute("DELETE FROM rollup_delta")
+        except sqlite3.Error as e:
+            print(f"Error refreshing rollups: {e}")
+            return None
+        return {"rows": folded, "seconds": round(time.perf_counter() - started, 3)}
+
+    def rebuild(self):
+        """Drop every rollup and watermark and recompute them from the source tables, archived rows included"""
+        try:
+            with self.db.transaction() as cursor:
+                cursor.execute("DELETE FROM rollups")
+                cursor.execute("DELETE FROM rollup_log")
+                cursor.execute("DELETE FROM system_state WHERE key LIKE ?", (WATERMARK_PREFIX + "%",))
+        except sqlite3.Error as e:
+            print(f"Error clearing rollups: {e}")
+            return None
+        result = self.refresh(include_archived=True)
+        if result is not None:
+            print(f"Rollups rebuilt in {result['seconds']}s.")
+        return result
+
+    def get_series(self, metric, grain="month", start=None, end=None):
+        """Return (bucket, count, total) rows for one metric at one grain, oldest first.
+
+        Normally a read only: rows past the watermark and pending rollup_log
+        entries are added to the stored buckets in the same statement, without
+        the write lock a refresh takes. Only a tail longer than
+        REFRESH_THRESHOLD is refreshed first.
+        """
+        if metric not in SOURCES or grain not in GRAINS:
+            print(f"Error: Unknown rollup {metric}/{grain}.")
+            return []
+        table, id_column, date_column, value = SOURCES[metric]
+        if self._backlog(table, id_column) > REFRESH_THRESHOLD:
+            self.refresh()
+        watermark = f"IFNULL({ROLLUP_WATERMARK.format(table=table)}, 0)"
+        query = f"""
+            SELECT bucket, SUM(count), SUM(total) FROM (
+                SELECT bucket, count, total FROM rollups WHERE metric = :metric AND grain = :grain
+                UNION ALL
+                SELECT {BUCKETS[grain].format(f"date({date_column})")}, 1, {value} FROM {table}
+                WHERE {id_column} > {watermark} AND date({date_column}) IS NOT NULL
+                UNION ALL
+                SELECT {BUCKETS[grain].format("day")}, count, total FROM rollup_log
+                WHERE metric = :metric AND day IS NOT NULL
+            )
+            WHERE (:start IS NULL OR bucket >= :start) AND (:end IS NULL OR bucket <= :end)
+            GROUP BY bucket HAVING SUM(count) != 0 ORDER BY bucket
+        """
+        return self.db.fetch_all(query, {"metric": metric, "grain": grain, "start": start, "end": end})
+
+    def _backlog(self, table, id_column):
+        """Ids past the table's watermark plus pending rollup_log entries: what a read would fold in (indexed)"""
+        row = self.db.fetch_one(f"""
+            SELECT IFNULL((SELECT MAX({id_column}) FROM {table}), 0) - IFNULL({ROLLUP_WATERMARK.format(table=table)}, 0),
+                   IFNULL((SELECT MAX(log_id) - MIN(log_id) + 1 FROM rollup_log), 0)
+        """)
+        return max(row[0], 0) + row[1] if row else 0
+
+    def _pending(self, cursor, sources):
+        """Per source table (watermark, newest id), and the newest rollup_log entry"""
+        targets = {}
+        for table, id_column, _, _ in SOURCES.values():
+            if table not in targets:
+                newest = cursor.execute(f"SELECT MAX({id_column}) FROM {sources[table]}").fetchone()[0] or 0
+                targets[table] = (self._watermark(cursor, table), newest)
+        last_log = cursor.execute("SELECT MAX(log_id) FROM rollup_log").fetchone()[0]
+        return targets, last_log
+
+    def _watermark(self, cursor, table):
+        row = cursor.execute("SELECT value FROM system_state WHERE key = ?", (WATERMARK_PREFIX + table,)).fetchone()
+        return int(row[0]) if row else 0
@@ -0,0 +1,231 @@
+import heapq
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from modules.college import College
+
+# Global ids carry the shard number above the local rowid: shard << 40 | id.
+# Shards are numbered from 1, so no global id equals a plain local id, and
+# ids stay below 2**53 (exact in JSON) for up to 8191 campuses.
+SHARD_BITS = 40
+LOCAL_MASK = (1 << SHARD_BITS) - 1
+
+# Metrics whose per-campus values simply add up: counts and {key: count} maps
+SUMMED_METRICS = {
+    "total_students", "total_courses", "total_teachers", "total_books", "total_borrowed_books",
+    "total_events", "students_by_course", "students_by_gender", "course_popularity",
+    "teachers_by_department", "student_enrollment_trends", "book_circulation_trends",
+}
+# Rating aggregates are merged from their running sums, never from averages
+RATING_PARTIALS = {
+    "course": "SELECT course, n, total FROM course_rating_stats WHERE n > 0",
+    "teacher": """
+        SELECT s.teacher_id, t.name, s.n, s.total
+        FROM teacher_rating_stats s
+        JOIN teachers t ON s.teacher_id = t.teacher_id
+        WHERE s.n > 0
+    """,
+}
+
+
+def load_campuses(path):
+    """Read a {"campus": "database file", ...} map from a JSON file"""
+    with open(path) as f:
+        campuses = json.load(f)
+    if not isinstance(campuses, dict) or not campuses:
+        raise ValueError(f"{path} must map campus names to database files")
+    return campuses
+
+
+def global_id(shard, local_id):
+    return shard << SHARD_BITS | local_id
+
+
+def split_id(gid):
+    """(shard number, local id) of a global id"""
+    return gid >> SHARD_BITS, gid & LOCAL_MASK
+
+
+def _add(total, value):
+    """Sum two counts, or two (possibly nested) {key: count} maps"""
+    if isinstance(value, dict):
+        merged = dict(total or {})
+        for key, item in value.items():
+            merged[key] = _add(merged.get(key), item)
+        return dict(sorted(merged.items(), key=lambda item: (item[0] is None, item[0])))
+    return (total or 0) + value
+
+
+def _claim(college, shard, campus):
+    """Record the shard number in the campus database, refusing a file that belongs to another shard"""
+    db = college.db
+    claimed = dict(db.fetch_all("SELECT key, value FROM system_state WHERE key IN ('shard_id', 'campus')"))
+    if not claimed:
+        with db.transaction() as cursor:
+            cursor.executemany("INSERT INTO system_state (key, value) VALUES (?, ?)",
+                               [("shard_id", shard), ("campus", campus)])
+    elif (int(claimed.get("shard_id", 0)), claimed.get("campus")) != (shard, campus):
+        raise ValueError(f"{db.db_name} is shard {claimed.get('shard_id')} ({claimed.get('campus')}), "
+                         f"not shard {shard} ({campus})")
+
+
+class _Shard:
+    """One campus database, used only from its own worker thread"""
+
+    def __init__(self, number, campus, db_name):
+        self.number = number
+        self.campus = campus
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"cms-shard-{campus}")
+        self.college = self.executor.submit(College, db_name).result()
+
+    def submit(self, function, *args, **kwargs):
+        return self.executor.submit(function, self.college, *args, **kwargs)
+
+    def close(self):
+        self.executor.submit(self.college.close).result()
+        self.executor.shutdown()
+
+
+class ShardedCollege:
+    def __init__(self, campuses):
+        """Open one database per campus; campuses maps names to files, in shard order"""
+        self.shards = {}
+        try:
+            for number, (campus, db_name) in enumerate(campuses.items(), 1):
+                self.shards[campus] = _Shard(number, campus, db_name)
+                self.shards[campus].submit(_claim, number, campus).result()
+        except Exception:
+            self.close()
+            raise
+        self.by_number = {shard.number: shard for shard in self.shards.values()}
+        self.analytics = ShardedAnalytics(self)
+
+    def global_id(self, campus, local_id):
+        """Global id of a row in one campus database"""
+        return global_id(self._shard(campus).number, local_id)
+
+    def locate(self, gid):
+        """(campus, local id) of a global id"""
+        number, local_id = split_id(gid)
+        if number not in self.by_number:
+            raise ValueError(f"Id {gid} does not belong to any campus")
+        return self.by_number[number].campus, local_id
+
+    def call(self, campus, module, method, *args, **kwargs):
+        """Run a module method on one campus, e.g. call('north', 'student', 'add_student', ...).
+
+        Local only: arguments and results use that campus's own ids; convert
+        them with global_id(campus, id) before mixing rows from several campuses.
+        """
+        return self._shard(campus).submit(_invoke, module, method, *args, **kwargs).result()
+
+    def call_by_id(self, gid, module, method, *args, **kwargs):
+        """Run a module method on the campus owning a global id, passing the local id first; results are local as in call()"""
+        campus, local_id = self.locate(gid)
+        return self.call(campus, module, method, local_id, *args, **kwargs)
+
+    def fan_out(self, function, *args, **kwargs):
+        """Run function(college, ...) on every campus in parallel; returns {campus: result}"""
+        futures = {campus: shard.submit(function, *args, **kwargs) for campus, shard in self.shards.items()}
+        return {campus: future.result() for campus, future in futures.items()}
+
+    def close(self):
+        """Close every campus database"""
+        for shard in self.shards.values():
+            shard.close()
+        self.shards = {}
+
+    def _shard(self, campus):
+        if campus not in self.shards:
+            raise ValueError(f"Unknown campus '{campus}'")
+        return self.shards[campus]
+
+
+def _invoke(college, module, method, *args, **kwargs):
+    return getattr(getattr(college, module), method)(*args, **kwargs)
+
+
+class ShardedAnalytics:
+    """The Analytics figures over every campus, merged from per-campus partial aggregates"""
+
+    def __init__(self, sharded):
+        self.sharded = sharded
+
+    def __getattr__(self, name):
+        metric = name[len("get_"):]
+        if not name.startswith("get_") or not (metric in SUMMED_METRICS or hasattr(self, f"_merge_{metric}")):
+            raise AttributeError(f"'ShardedAnalytics' object has no attribute '{name}'")
+        return lambda *args, **kwargs: self.get(metric, *args, **kwargs)
+
+    def get(self, metric, *args, **kwargs):
+        """One analytics figure for all campuses together"""
+        if metric in SUMMED_METRICS:
+            total = None
+            for value in self.sharded.fan_out(_invoke, "analytics", f"get_{metric}", *args, **kwargs).values():
+                total = _add(total, value)
+            return total
+        return getattr(self, f"_merge_{metric}")(*args, **kwargs)
+
+    def _merge_most_borrowed_books(self, limit=5):
+        # Books belong to one campus, so the overall top N is within the per-campus top Ns
+        partials = self.sharded.fan_out(_invoke, "analytics", "get_most_borrowed_books", limit)
+        rows = [(title, count) for books in partials.values() for title, count in books]
+        return sorted(rows, key=lambda book: book[1], reverse=True)[:limit]
+
+    def _merge_upcoming_events(self):
+        partials = self.sharded.fan_out(_invoke, "analytics", "get_upcoming_events")
+        return list(heapq.merge(*partials.values(), key=lambda event: event[1]))
+
+    def _merge_feedback_trends(self, grain="month"):
+        totals = {}
+        partials = self.sharded.fan_out(lambda college: college.analytics.rollups.get_series("feedback", grain))
+        for series in partials.values():
+            for period, count, total in series:
+                n, rating_sum = totals.get(period, (0, 0))
+                totals[period] = (n + count, rating_sum + total)
+        return {period: {"count": n, "average_rating": round(rating_sum / n, 2)}
+                for period, (n, rating_sum) in sorted(totals.items())}
+
+    def _merge_average_feedback_rating_by_course(self):
+        return {course: total / n for course, n, total in self._course_ratings()}
+
+    def _merge_average_feedback_rating_by_teacher(self):
+        # Keyed by global id: teachers on different campuses may share a name
+        return {gid: {"name": name, "campus": self.sharded.locate(gid)[0], "average_rating": total / n}
+                for gid, name, n, total in self._teacher_ratings()}
+
+    def _merge_teacher_rankings(self, limit=10, prior_weight=None):
+        return self._rank(self._teacher_ratings(), limit, prior_weight)
+
+    def _merge_course_rankings(self, limit=10, prior_weight=None):
+        return self._rank(self._course_ratings(), limit, prior_weight)
+
+    def _course_ratings(self):
+        """(course, n, total) summed over campuses"""
+        totals = {}
+        for rows in self._rating_partials("course").values():
+            for course, n, total in rows:
+                count, rating_sum = totals.get(course, (0, 0))
+                totals[course] = (count + n, rating_sum + total)
+        return [(course, n, total) for course, (n, total) in totals.items()]
+
+    def _teacher_ratings(self):
+        """(global teacher id, name, n, total) for every rated teacher"""
+        return [(self.sharded.global_id(campus, teacher_id), name, n, total)
+                for campus, rows in self._rating_partials("teacher").items()
+                for teacher_id, name, n, total in rows]
+
+    def _rating_partials(self, kind):
+        return self.sharded.fan_out(lambda college: college.db.fetch_all(RATING_PARTIALS[kind]))
+
+    def _rank(self, ratings, limit, prior_weight):
+        """Bayesian-adjusted ranking as in Analytics, with the prior taken over all campuses"""
+        if not ratings:
+            return []
+        count = sum(row[-2] for row in ratings)
+        mean = sum(row[-1] for row in ratings) / count
+        weight = prior_weight if prior_weight is not None else count / len(ratings)
+        ranked = [(*key, n, round(total / n, 2), round((weight * mean + total) / (weight + n), 4))
+                  for *key, n, total in ratings]
+        ranked.sort(key=lambda row: (row[-1], row[-3]), reverse=True)
+        return ranked[:limit]
@@ -1,5 +1,8 @@
-from database import Database
+from database import Database, WriteError
+from modules.integrity import IntegrityManager
+from modules.metrics import STUDENTS_ADDED
 import datetime
+import sqlite3
 
 class Student:
     def __init__(self, db):
@@ -7,68 +10,94 @@ class Student:
         self.db = db
     
     def add_student(self, name, age, gender, contact, email, address, course, semester):
-        """Add a new student to the database"""
+        """Add a new student; returns the created record, or a WriteError if the email is taken"""
         enrollment_date = datetime.datetime.now().strftime("%Y-%m-%d")
         
-        # Check if email already exists
-        exists = self.db.fetch_one("SELECT email FROM students WHERE email = ?", (email,))
-        if exists:
-            print(f"Error: Student with email {email} already exists.")
-            return False
-        
+        # The UNIQUE email constraint is the duplicate check: one statement, no race
         query = """
         INSERT INTO students (name, age, gender, contact, email, address, course, enrollment_date, semester)
         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (email) DO NOTHING
+        RETURNING *
         """
         params = (name, age, gender, contact, email, address, course, enrollment_date, semester)
         
-        if self.db.execute_query(query, params):
+        student = self.db.execute_returning(query, params)
+        if student is None:
+            return WriteError("duplicate", f"Student with email {email} already exists.").report()
+        if student:
+            STUDENTS_ADDED.inc()
             print(f"Student {name} added successfully.")
-            return True
-        return False
+        return student
     
+    def import_students(self, records):
+        """Add many students in a single transaction, skipping duplicate emails"""
+        enrollment_date = datetime.datetime.now().strftime("%Y-%m-%d")
+        query = """
+        INSERT OR IGNORE INTO students (name, age, gender, contact, email, address, course, enrollment_date, semester)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """
+        added = 0
+        skipped = []
+        try:
+            with self.db.transaction() as cursor:
+                for record in records:
+                    params = (record['name'], record.get('age'), record.get('gender'), record.get('contact'),
+                              record.get('email'), record.get('address'), record.get('course'),
+                              record.get('enrollment_date') or enrollment_date, record.get('semester'))
+                    cursor.execute(query, params)
+                    if cursor.rowcount:
+                        added += 1
+                    else:
+                        skipped.append(record.get('email'))
+        except (sqlite3.Error, KeyError) as e:
+            print(f"Import failed, no students were added: {e}")
+            return None
+
+        STUDENTS_ADDED.inc(added)
+        print(f"Imported {added} students ({len(skipped)} skipped as duplicates).")
+        return {"added": added, "skipped": skipped}
+
     def update_student(self, student_id, **kwargs):
-        """Update student information"""
+        """Update student information; returns the updated record or a WriteError"""
         valid_fields = ['name', 'age', 'gender', 'contact', 'email', 'address', 'course', 'semester']
         
         # Filter out invalid fields
         updates = {k: v for k, v in kwargs.items() if k in valid_fields and v is not None}
         
         if not updates:
-            print("No valid fields to update.")
-            return False
-
-        # Check if student_id exists before trying to update
-        check_exists = self.db.fetch_one("SELECT student_id FROM students WHERE student_id = ?", (student_id,))
-        if not check_exists:
-            print(f"Error: Student with ID {student_id} does not exist. Cannot update.")
-            return False
+            return WriteError("invalid", "No valid fields to update.").report()
         
-        # Construct update query
+        # Construct update query; no matching row means the student does not exist
         set_clause = ", ".join([f"{field} = ?" for field in updates.keys()])
-        query = f"UPDATE students SET {set_clause} WHERE student_id = ?"
+        query = f"UPDATE students SET {set_clause} WHERE student_id = ? RETURNING *"
         
         # Parameters for the query
         params = list(updates.values()) + [student_id]
         
-        if self.db.execute_query(query, tuple(params)):
+        student = self.db.execute_returning(query, tuple(params))
+        if student is None:
+            return WriteError("not_found", f"Student with ID {student_id} does not exist. Cannot update.").report()
+        if student:
             print(f"Student ID {student_id} updated successfully.")
-            return True
-        return False
+        return student
     
-    def delete_student(self, student_id):
-        """Delete a student from the database"""
-        # Check if student exists
-        exists = self.db.fetch_one("SELECT student_id FROM students WHERE student_id = ?", (student_id,))
-        if not exists:
-            print(f"Error: Student with ID {student_id} does not exist.")
+    def delete_student(self, student_id, policies=None):
+        """Delete a student, with their issues, feedback and enrollments handled by the integrity policies"""
+        report = IntegrityManager(self.db).delete("students", [student_id], policies)
+        if report is None:
             return False
-        
-        query = "DELETE FROM students WHERE student_id = ?"
-        if self.db.execute_query(query, (student_id,)):
-            print(f"Student ID {student_id} deleted successfully.")
-            return True
-        return False
+        if report["missing"]:
+            return WriteError("not_found", f"Student with ID {student_id} does not exist.").report()
+        print(f"Student ID {student_id} deleted successfully.")
+        return True
+
+    def delete_students(self, student_ids, policies=None):
+        """Delete many students in one transaction; returns the integrity report, or None if refused"""
+        report = IntegrityManager(self.db).delete("students", student_ids, policies)
+        if report is not None:
+            print(f"{report['deleted']} students deleted successfully.")
+        return report
     
     def get_student(self, student_id):
         """Get student details by ID"""
@@ -84,9 +113,14 @@ class Student:
                    "address", "course", "enrollment_date", "semester"]
         return dict(zip(columns, student))
     
-    def get_all_students(self):
+    def get_all_students(self, stream=False):
         """Get all students"""
         query = "SELECT * FROM students ORDER BY name"
+        columns = ["student_id", "name", "age", "gender", "contact", "email", 
+                   "address", "course", "enrollment_date", "semester"]
+        if stream:
+            # Read while the response is sent, not into one list first
+            return self.db.stream(columns, query)
         students = self.db.fetch_all(query)
         
         if not students:
@@ -94,10 +128,22 @@ class Student:
             return []
         
         # Convert to list of dictionaries
-        columns = ["student_id", "name", "age", "gender", "contact", "email", 
-                   "address", "course", "enrollment_date", "semester"]
         return [dict(zip(columns, student)) for student in students]
     
+    def get_courses(self, student_id, status="active"):
+        """List the courses a student is enrolled in (all statuses when status is None)"""
+        query = """
+        SELECT c.course_id, c.title, e.status, e.enrolled_on
+        FROM enrollments e
+        JOIN courses c ON c.course_id = e.course_id
+        WHERE e.student_id = ?
+        """
+        params = [student_id]
+        if status:
+            query += " AND e.status = ?"
+            params.append(status)
+        return self.db.fetch_all(query + " ORDER BY e.enrolled_on, c.title", tuple(params))
+    
     def search_students(self, search_term):
         """Search for students by name, email, or course"""
         query = """
@@ -1,4 +1,5 @@
-from database import Database
+from database import Database, WriteError
+from modules.integrity import IntegrityManager
 import datetime
 
 class Teacher:
@@ -7,71 +8,71 @@ class Teacher:
         self.db = db
 
     def add_teacher(self, name, gender, contact, email, department, qualification):
-        """Add a new teacher to the database"""
+        """Add a new teacher; returns the created record, or a WriteError if the email is taken"""
         date_joined = datetime.datetime.now().strftime("%Y-%m-%d")
 
-        # Check if email already exists
-        exists = self.db.fetch_one("SELECT email FROM teachers WHERE email = ?", (email,))
-        if exists:
-            print(f"❌ Error: Teacher with email {email} already exists.")
-            return False
-
+        # The UNIQUE email constraint is the duplicate check
         query = """
         INSERT INTO teachers (name, gender, contact, email, department, qualification, date_joined)
         VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (email) DO NOTHING
+        RETURNING *
         """
         params = (name, gender, contact, email, department, qualification, date_joined)
 
-        if self.db.execute_query(query, params):
+        teacher = self.db.execute_returning(query, params)
+        if teacher is None:
+            return WriteError("duplicate", f"Teacher with email {email} already exists.").report("❌ Error")
+        if teacher:
             print(f"✅ Teacher '{name}' added successfully!")
-            return True
-        print("❌ Failed to add teacher.")
-        return False
+        else:
+            print("❌ Failed to add teacher.")
+        return teacher
 
     def update_teacher(self, teacher_id, **kwargs):
-        """Update teacher information"""
+        """Update teacher information; returns the updated record or a WriteError"""
         valid_fields = ['name', 'gender', 'contact', 'email', 'department', 'qualification']
 
         # Filter out invalid fields
         updates = {k: v for k, v in kwargs.items() if k in valid_fields and v is not None}
 
         if not updates:
-            print("⚠️  No valid fields to update.")
-            return False
-
-        # Check if teacher_id exists before trying to update
-        check_exists = self.db.fetch_one("SELECT teacher_id FROM teachers WHERE teacher_id = ?", (teacher_id,))
-        if not check_exists:
-            print(f"❌ Error: Teacher with ID {teacher_id} does not exist. Cannot update.")
-            return False
+            return WriteError("invalid", "No valid fields to update.").report("⚠️  Error")
 
-        # Construct update query
+        # Construct update query; no matching row means the teacher does not exist
         set_clause = ", ".join([f"{field} = ?" for field in updates.keys()])
-        query = f"UPDATE teachers SET {set_clause} WHERE teacher_id = ?"
+        query = f"UPDATE teachers SET {set_clause} WHERE teacher_id = ? RETURNING *"
 
         # Parameters for the query
         params = list(updates.values()) + [teacher_id]
 
-        if self.db.execute_query(query, tuple(params)):
+        teacher = self.db.execute_returning(query, tuple(params))
+        if teacher is None:
+            message = f"Teacher with ID {teacher_id} does not exist. Cannot update."
+            return WriteError("not_found", message).report("❌ Error")
+        if teacher:
             print(f"✅ Teacher ID {teacher_id} updated successfully!")
-            return True
-        print("❌ Failed to update teacher.")
-        return False
-
-    def delete_teacher(self, teacher_id):
-        """Delete a teacher from the database"""
-        # Check if teacher exists
-        exists = self.db.fetch_one("SELECT teacher_id FROM teachers WHERE teacher_id = ?", (teacher_id,))
-        if not exists:
-            print(f"❌ Error: Teacher with ID {teacher_id} does not exist.")
+        else:
+            print("❌ Failed to update teacher.")
+        return teacher
+
+    def delete_teacher(self, teacher_id, policies=None):
+        """Delete a teacher, with their feedback, sections and availability handled by the integrity policies"""
+        report = IntegrityManager(self.db).delete("teachers", [teacher_id], policies)
+        if report is None:
+            print("❌ Failed to delete teacher.")
             return False
-
-        query = "DELETE FROM teachers WHERE teacher_id = ?"
-        if self.db.execute_query(query, (teacher_id,)):
-            print(f"🗑️  Teacher ID {teacher_id} deleted successfully.")
-            return True
-        print("❌ Failed to delete teacher.")
-        return False
+        if report["missing"]:
+            return WriteError("not_found", f"Teacher with ID {teacher_id} does not exist.").report("❌ Error")
+        print(f"🗑️  Teacher ID {teacher_id} deleted successfully.")
+        return True
+
+    def delete_teachers(self, teacher_ids, policies=None):
+        """Delete many teachers in one transaction; returns the integrity report, or None if refused"""
+        report = IntegrityManager(self.db).delete("teachers", teacher_ids, policies)
+        if report is not None:
+            print(f"🗑️  {report['deleted']} teachers deleted successfully.")
+        return report
 
     def get_teacher(self, teacher_id):
         """Get teacher details by ID"""
@@ -87,9 +88,14 @@ class Teacher:
                   "department", "qualification", "date_joined"]
         return dict(zip(columns, teacher))
 
-    def get_all_teachers(self):
+    def get_all_teachers(self, stream=False):
         """Get all teachers"""
         query = "SELECT * FROM teachers ORDER BY name"
+        columns = ["teacher_id", "name", "gender", "contact", "email",
+                  "department", "qualification", "date_joined"]
+        if stream:
+            # Read while the response is sent, not into one list first
+            return self.db.stream(columns, query)
         teachers = self.db.fetch_all(query)
 
         if not teachers:
@@ -97,8 +103,6 @@ class Teacher:
             return []
 
         # Convert to list of dictionaries
-        columns = ["teacher_id", "name", "gender", "contact", "email",
-                  "department", "qualification", "date_joined"]
         return [dict(zip(columns, teacher)) for teacher in teachers]
 
     def search_teachers(self, search_term):
@@ -0,0 +1,347 @@
+import collections
+import random
+import sqlite3
+import time
+
+DAY_NAMES = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+DEFAULT_DAYS = 5
+DEFAULT_PERIODS = 8
+
+# A hard-constraint violation (double booking, unavailable teacher, room too
+# small) outweighs any number of soft ones (two sessions of a section on one day)
+HARD = 1000
+# Probability of a random move in the local search, to escape plateaus
+NOISE = 0.02
+
+
+class Timetable:
+    def __init__(self, db, days=DEFAULT_DAYS, periods=DEFAULT_PERIODS):
+        """Initialize Timetable class with database connection and a days x periods slot grid"""
+        self.db = db
+        self.days = days
+        self.periods = periods
+
+    # ---------------------------------------------------------------- data
+
+    def add_venue(self, name, capacity=None):
+        """Add a room or venue that sessions can be placed in"""
+        if self.db.fetch_one("SELECT venue_id FROM venues WHERE name = ?", (name,)):
+            print(f"Error: Venue '{name}' already exists.")
+            return False
+        if self.db.execute_query("INSERT INTO venues (name, capacity) VALUES (?, ?)", (name, capacity)):
+            print(f"Venue '{name}' added successfully.")
+            return True
+        return False
+
+    def import_event_venues(self, capacity=None):
+        """Add every venue named in events.venue that is not a known venue yet"""
+        query = """
+        INSERT OR IGNORE INTO venues (name, capacity)
+        SELECT DISTINCT venue, ? FROM events WHERE venue IS NOT NULL AND venue != ''
+        """
+        before = self.db.fetch_one("SELECT COUNT(*) FROM venues")[0]
+        if not self.db.execute_query(query, (capacity,)):
+            return None
+        added = self.db.fetch_one("SELECT COUNT(*) FROM venues")[0] - before
+        print(f"Imported {added} venues from events.")
+        return added
+
+    def add_section(self, course_id, teacher_id, sessions_per_week=3, size=30, name=None):
+        """Add a teaching section of a course that needs sessions_per_week slots"""
+        if not self.db.fetch_one("SELECT course_id FROM courses WHERE course_id = ?", (course_id,)):
+            print(f"Error: Course with ID {course_id} does not exist.")
+            return False
+        if not self.db.fetch_one("SELECT teacher_id FROM teachers WHERE teacher_id = ?", (teacher_id,)):
+            print(f"Error: Teacher with ID {teacher_id} does not exist.")
+            return False
+        if not 1 <= sessions_per_week <= self.days * self.periods:
+            print("Error: Sessions per week must fit in the slot grid.")
+            return False
+        query = """
+        INSERT INTO course_sections (course_id, teacher_id, name, sessions_per_week, size)
+        VALUES (?, ?, ?, ?, ?)
+        """
+        if self.db.execute_query(query, (course_id, teacher_id, name, sessions_per_week, size)):
+            print(f"Section added for course ID {course_id}.")
+            return True
+        return False
+
+    def set_teacher_availability(self, teacher_id, slots):
+        """Replace a teacher's available (day, period) slots; an empty list means always available"""
+        slots = list(slots)
+        for day, period in slots:
+            if not (0 <= day < self.days and 0 <= period < self.periods):
+                print(f"Error: Slot ({day}, {period}) is outside the timetable grid.")
+                return False
+        try:
+            with self.db.transaction() as cursor:
+                cursor.execute("DELETE FROM teacher_availability WHERE teacher_id = ?", (teacher_id,))
+                cursor.executemany("INSERT OR IGNORE INTO teacher_availability (teacher_id, day, period) "
+                                   "VALUES (?, ?, ?)", [(teacher_id, day, period) for day, period in slots])
+        except sqlite3.Error as e:
+            print(f"Error saving availability: {e}")
+            return False
+        print(f"Availability saved for teacher ID {teacher_id} ({len(slots) or 'all'} slots).")
+        return True
+
+    # ---------------------------------------------------------------- manual edits
+
+    def check_placement(self, section_id, day, period, venue_id, session=None):
+        """List the clashes placing a section's session at (day, period) in a venue would cause"""
+        if not (0 <= day < self.days and 0 <= period < self.periods):
+            return [f"slot ({day}, {period}) is outside the timetable grid"]
+        section = self.db.fetch_one("SELECT teacher_id, size FROM course_sections WHERE section_id = ?",
+                                    (section_id,))
+        if not section:
+            return [f"section {section_id} does not exist"]
+        venue = self.db.fetch_one("SELECT name, capacity FROM venues WHERE venue_id = ?", (venue_id,))
+        if not venue:
+            return [f"venue {venue_id} does not exist"]
+        teacher_id, size = section
+        # The session being moved does not clash with itself
+        this = (section_id, session if session is not None else -1)
+
+        clashes = []
+        if venue[1] is not None and venue[1] < size:
+            clashes.append(f"{venue[0]} holds {venue[1]}, section has {size}")
+        taken = self.db.fetch_one("""
+            SELECT section_id, session FROM timetable WHERE venue_id = ? AND day = ? AND period = ?
+        """, (venue_id, day, period))
+        if taken and tuple(taken) != this:
+            clashes.append(f"{venue[0]} is booked by section {taken[0]} session {taken[1]}")
+        busy = self.db.fetch_one("""
+            SELECT section_id, session FROM timetable WHERE teacher_id = ? AND day = ? AND period = ?
+        """, (teacher_id, day, period))
+        if busy and tuple(busy) != this:
+            clashes.append(f"teacher {teacher_id} teaches section {busy[0]} session {busy[1]}")
+        availability = self.db.fetch_one("""
+            SELECT COUNT(*), SUM(day = ? AND period = ?) FROM teacher_availability WHERE teacher_id = ?
+        """, (day, period, teacher_id))
+        if availability and availability[0] and not availability[1]:
+            clashes.append(f"teacher {teacher_id} is not available then")
+        return clashes
+
+    def move_session(self, section_id, session, day, period, venue_id):
+        """Place or move one session by hand if it causes no clash"""
+        row = self.db.fetch_one("SELECT teacher_id, sessions_per_week FROM course_sections WHERE section_id = ?",
+                                (section_id,))
+        if not row:
+            print(f"Error: Section with ID {section_id} does not exist.")
+            return False
+        if not 1 <= session <= row[1]:
+            print(f"Error: Section {section_id} has sessions 1 to {row[1]}.")
+            return False
+        clashes = self.check_placement(section_id, day, period, venue_id, session)
+        if clashes:
+            for clash in clashes:
+                print(f"Clash: {clash}")
+            return False
+        query = """
+        INSERT INTO timetable (section_id, session, day, period, venue_id, teacher_id) VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (section_id, session) DO UPDATE SET
+            day = excluded.day, period = excluded.period, venue_id = excluded.venue_id, teacher_id = excluded.teacher_id
+        """
+        if self.db.execute_query(query, (section_id, session, day, period, venue_id, row[0])):
+            print(f"Section {section_id} session {session} placed on {DAY_NAMES[day]} period {period + 1}.")
+            return True
+        return False
+
+    def get_timetable(self, teacher_id=None, venue_id=None, course_id=None):
+        """List placed sessions as (day, period, section_id, session, course, teacher, venue)"""
+        query = """
+        SELECT tt.day, tt.period, tt.section_id, tt.session, c.title, t.name, v.name
+        FROM timetable tt
+        JOIN course_sections cs ON cs.section_id = tt.section_id
+        JOIN courses c ON c.course_id = cs.course_id
+        JOIN teachers t ON t.teacher_id = tt.teacher_id
+        JOIN venues v ON v.venue_id = tt.venue_id
+        WHERE 1 = 1
+        """
+        params = []
+        for column, value in (("tt.teacher_id", teacher_id), ("tt.venue_id", venue_id), ("cs.course_id", course_id)):
+            if value is not None:
+                query += f" AND {column} = ?"
+                params.append(value)
+        return self.db.fetch_all(query + " ORDER BY tt.day, tt.period, v.name", tuple(params))
+
+    # ---------------------------------------------------------------- solver
+
+    def generate(self, department=None, time_limit=10.0, seed=0, save=True):
+        """Place every session of the department's sections (all when None) without clashes"""
+        started = time.perf_counter()
+        query = "SELECT cs.section_id, cs.teacher_id, cs.sessions_per_week, cs.size FROM course_sections cs"
+        params = ()
+        if department:
+            query += " JOIN teachers t ON t.teacher_id = cs.teacher_id WHERE t.department = ?"
+            params = (department,)
+        sections = self.db.fetch_all(query + " ORDER BY cs.section_id", params)
+        if not sections:
+            print("No sections to schedule.")
+            return None
+        venues = self.db.fetch_all("SELECT venue_id, capacity FROM venues ORDER BY capacity, venue_id")
+        if not venues:
+            print("Error: No venues defined; add some or import them from events.")
+            return None
+
+        solver = _Solver(self.days, self.periods, sections, venues, random.Random(seed))
+        section_ids = {row[0] for row in sections}
+        teachers = {row[1] for row in sections}
+        for teacher_id, day, period in self.db.fetch_all("SELECT teacher_id, day, period FROM teacher_availability"):
+            if teacher_id in teachers:
+                solver.allow(teacher_id, day, period)
+        # Sessions of other sections stay where they are
+        for section_id, day, period, venue_id, teacher_id in self.db.fetch_all(
+                "SELECT section_id, day, period, venue_id, teacher_id FROM timetable"):
+            if section_id not in section_ids:
+                solver.block(day, period, venue_id, teacher_id)
+
+        iterations = solver.solve(started + time_limit)
+        conflicts = solver.conflicted_count()
+        saved = False
+        if conflicts:
+            print(f"{conflicts} sessions still clash after {time_limit}s; timetable not saved.")
+        elif save:
+            try:
+                with self.db.transaction() as cursor:
+                    cursor.executemany("DELETE FROM timetable WHERE section_id = ?",
+                                       [(section_id,) for section_id in section_ids])
+                    cursor.executemany("""
+                        INSERT INTO timetable (section_id, session, day, period, venue_id, teacher_id)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                    """, solver.placements())
+                saved = True
+            except sqlite3.Error as e:
+                print(f"Error saving timetable: {e}")
+                return None
+
+        seconds = round(time.perf_counter() - started, 3)
+        if saved:
+            print(f"Timetable generated: {len(solver.sessions)} sessions placed in {seconds}s.")
+        return {"sessions": len(solver.sessions), "conflicts": conflicts, "iterations": iterations,
+                "seconds": seconds, "saved": saved}
+
+
+class _Solver:
+    """Greedy construction followed by min-conflicts local search over (slot, venue) assignments"""
+
+    def __init__(self, days, periods, sections, venues, rng):
+        self.slots = [(day, period) for day in range(days) for period in range(periods)]
+        self.slot_index = {slot: i for i, slot in enumerate(self.slots)}
+        self.rng = rng
+        self.capacity = dict(venues)
+        self.sessions = [(section_id, n, teacher_id, size)
+                         for section_id, teacher_id, count, size in sections for n in range(1, count + 1)]
+        # Rooms big enough for each session; when none is, every room (and a violation)
+        self.venue_choices = []
+        for _, _, _, size in self.sessions:
+            fitting = [venue_id for venue_id, capacity in venues if capacity is None or capacity >= size]
+            self.venue_choices.append(fitting or [venue_id for venue_id, _ in venues])
+        self.available = {}
+        self.venue_blocked = set()
+        self.teacher_blocked = set()
+        self.venue_occ = collections.defaultdict(set)
+        self.teacher_occ = collections.defaultdict(set)
+        self.section_day = collections.Counter()
+        self.assignment = [None] * len(self.sessions)
+        self.conflicted = set()
+
+    def allow(self, teacher_id, day, period):
+        if (day, period) in self.slot_index:
+            self.available.setdefault(teacher_id, set()).add(self.slot_index[(day, period)])
+
+    def block(self, day, period, venue_id, teacher_id):
+        slot = self.slot_index.get((day, period))
+        if slot is not None:
+            self.venue_blocked.add((slot, venue_id))
+            self.teacher_blocked.add((slot, teacher_id))
+
+    def solve(self, deadline):
+        """Build a greedy timetable, then repair clashes until none remain or time runs out"""
+        order = sorted(range(len(self.sessions)), key=lambda i: (
+            len(self.available.get(self.sessions[i][2], self.slots)), len(self.venue_choices[i]),
+            -self.sessions[i][3]))
+        for i in order:
+            self._place(i, *self._best_move(i))
+        self.conflicted = {i for i in range(len(self.sessions)) if self._hard(i)}
+
+        iterations = 0
+        while self.conflicted and time.perf_counter() < deadline:
+            iterations += 1
+            i = self.rng.choice(tuple(self.conflicted))
+            old_slot, old_venue = self.assignment[i]
+            self._remove(i)
+            if self.rng.random() < NOISE:
+                move = (self.rng.randrange(len(self.slots)), self.rng.choice(self.venue_choices[i]))
+            else:
+                move = self._best_move(i)
+            self._place(i, *move)
+            self._refresh(i, old_slot, old_venue)
+        return iterations
+
+    def conflicted_count(self):
+        return len(self.conflicted)
+
+    def placements(self):
+        for i, (section_id, n, teacher_id, _) in enumerate(self.sessions):
+            slot, venue_id = self.assignment[i]
+            day, period = self.slots[slot]
+            yield section_id, n, day, period, venue_id, teacher_id
+
+    def _best_move(self, i):
+        section_id, _, teacher_id, size = self.sessions[i]
+        available = self.available.get(teacher_id)
+        best_cost, best = None, []
+        for slot, (day, _) in enumerate(self.slots):
+            base = (len(self.teacher_occ.get((slot, teacher_id), ())) + ((slot, teacher_id) in self.teacher_blocked)
+                    + (available is not None and slot not in available)) * HARD
+            base += self.section_day[(section_id, day)]
+            if best_cost is not None and base > best_cost:
+                continue
+            for venue_id in self.venue_choices[i]:
+                cost = base + (len(self.venue_occ.get((slot, venue_id), ())) + ((slot, venue_id) in self.venue_blocked)
+                               + self._too_small(venue_id, size)) * HARD
+                if best_cost is None or cost < best_cost:
+                    best_cost, best = cost, [(slot, venue_id)]
+                elif cost == best_cost:
+                    best.append((slot, venue_id))
+        return self.rng.choice(best)
+
+    def _too_small(self, venue_id, size):
+        capacity = self.capacity[venue_id]
+        return capacity is not None and capacity < size
+
+    def _hard(self, i):
+        """Hard violations of session i in its current place"""
+        _, _, teacher_id, size = self.sessions[i]
+        slot, venue_id = self.assignment[i]
+        available = self.available.get(teacher_id)
+        return (len(self.venue_occ[(slot, venue_id)]) - 1 + len(self.teacher_occ[(slot, teacher_id)]) - 1
+                + ((slot, venue_id) in self.venue_blocked) + ((slot, teacher_id) in self.teacher_blocked)
+                + (available is not None and slot not in available) + self._too_small(venue_id, size))
+
+    def _place(self, i, slot, venue_id):
+        section_id, _, teacher_id, _ = self.sessions[i]
+        self.assignment[i] = (slot, venue_id)
+        self.venue_occ[(slot, venue_id)].add(i)
+        self.teacher_occ[(slot, teacher_id)].add(i)
+        self.section_day[(section_id, self.slots[slot][0])] += 1
+
+    def _remove(self, i):
+        section_id, _, teacher_id, _ = self.sessions[i]
+        slot, venue_id = self.assignment[i]
+        self.venue_occ[(slot, venue_id)].discard(i)
+        self.teacher_occ[(slot, teacher_id)].discard(i)
+        self.section_day[(section_id, self.slots[slot][0])] -= 1
+        self.assignment[i] = None
+
+    def _refresh(self, i, old_slot, old_venue):
+        """Recompute the conflicted set for sessions sharing the old or new cells of session i"""
+        teacher_id = self.sessions[i][2]
+        slot, venue_id = self.assignment[i]
+        affected = ({i} | self.venue_occ[(old_slot, old_venue)] | self.teacher_occ[(old_slot, teacher_id)]
+                    | self.venue_occ[(slot, venue_id)] | self.teacher_occ[(slot, teacher_id)])
+        for j in affected:
+            if self._hard(j):
+                self.conflicted.add(j)
+            else:
+                self.conflicted.discard(j)
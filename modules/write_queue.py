@@ -0,0 +1,271 @@
+from database import Database
+from modules.metrics import BOOKS_ISSUED, EVENT_REGISTRATIONS, FEEDBACK_SUBMITTED, REGISTRY
+import datetime
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+BATCH_SIZE = REGISTRY.histogram("cms_write_queue_batch_size", "Writes applied per group commit.",
+                                buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000))
+COMMIT_SECONDS = REGISTRY.histogram("cms_write_queue_commit_seconds", "Time to apply and commit one batch.")
+
+
+class WriteRejected(ValueError):
+    """A queued write failed validation; the rest of its batch still commits"""
+
+
+# Operations run inside the writer's transaction. Each one gets the writer
+# cursor, raises WriteRejected to refuse the write, and returns its result.
+
+def insert_feedback(cursor, student_id, teacher_id, course, rating, comments):
+    """Validate and insert one feedback row, returning its feedback_id"""
+    if not (1 <= rating <= 5):
+        raise WriteRejected("Rating must be between 1 and 5.")
+    if not cursor.execute("SELECT 1 FROM students WHERE student_id = ?", (student_id,)).fetchone():
+        raise WriteRejected(f"Student with ID {student_id} does not exist.")
+    if not cursor.execute("SELECT 1 FROM teachers WHERE teacher_id = ?", (teacher_id,)).fetchone():
+        raise WriteRejected(f"Teacher with ID {teacher_id} does not exist.")
+    if cursor.execute("SELECT 1 FROM feedback WHERE student_id = ? AND teacher_id = ? AND course = ?",
+                      (student_id, teacher_id, course)).fetchone():
+        raise WriteRejected("Feedback already exists for this student-teacher-course combination.")
+    date_submitted = datetime.datetime.now().strftime("%Y-%m-%d")
+    cursor.execute("""
+        INSERT INTO feedback (student_id, teacher_id, course, rating, comments, date_submitted)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (student_id, teacher_id, course, rating, comments, date_submitted))
+    return cursor.lastrowid
+
+
+def issue_book(cursor, book_id, student_id):
+    """Take one copy of a book and record the issue, returning its issue_id"""
+    if not cursor.execute("SELECT 1 FROM students WHERE student_id = ?", (student_id,)).fetchone():
+        raise WriteRejected(f"Student with ID {student_id} does not exist.")
+    if cursor.execute("SELECT 1 FROM book_issues WHERE book_id = ? AND student_id = ? AND status = 'issued'",
+                      (book_id, student_id)).fetchone():
+        raise WriteRejected("This book is already issued to this student.")
+    # Conditional decrement: never lets available_copies go below zero
+    cursor.execute("UPDATE books SET available_copies = available_copies - 1 "
+                   "WHERE book_id = ? AND available_copies > 0", (book_id,))
+    if cursor.rowcount == 0:
+        raise WriteRejected(f"Book with ID {book_id} does not exist or has no copies available.")
+    today = datetime.datetime.now()
+    cursor.execute("""
+        INSERT INTO book_issues (book_id, student_id, issue_date, return_date, status)
+        VALUES (?, ?, ?, ?, 'issued')
+    """, (book_id, student_id, today.strftime("%Y-%m-%d"),
+          (today + datetime.timedelta(days=14)).strftime("%Y-%m-%d")))
+    return cursor.lastrowid
+
+
+def register_for_event(cursor, event_id, student_id, priority=0):
+    """Take a seat, or join the waitlist when the event is full; returns registration_id and status"""
+    event = cursor.execute("SELECT status, capacity FROM events WHERE event_id = ?", (event_id,)).fetchone()
+    if not event:
+        raise WriteRejected(f"Event with ID {event_id} does not exist.")
+    if event[0] not in ("upcoming", "ongoing"):
+        raise WriteRejected(f"Event with ID {event_id} is {event[0]}.")
+    if not cursor.execute("SELECT 1 FROM students WHERE student_id = ?", (student_id,)).fetchone():
+        raise WriteRejected(f"Student with ID {student_id} does not exist.")
+    existing = cursor.execute("SELECT status FROM event_registrations WHERE event_id = ? AND student_id = ?",
+                              (event_id, student_id)).fetchone()
+    if existing and existing[0] != "cancelled":
+        raise WriteRejected(f"Student {student_id} is already {existing[0]} for event {event_id}.")
+
+    # Conditional decrement, as for book copies: a seat is taken only if one is left
+    status = "registered"
+    if event[1] is not None:
+        cursor.execute("UPDATE events SET seats_available = seats_available - 1 "
+                       "WHERE event_id = ? AND seats_available > 0", (event_id,))
+        if cursor.rowcount == 0:
+            status = "waitlisted"
+    registered_at = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    registration_id = cursor.execute("""
+        INSERT INTO event_registrations (event_id, student_id, status, priority, registered_at)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (event_id, student_id) DO UPDATE SET
+            status = excluded.status, priority = excluded.priority, registered_at = excluded.registered_at
+        RETURNING registration_id
+    """, (event_id, student_id, status, priority, registered_at)).fetchone()[0]
+    return {"registration_id": registration_id, "status": status}
+
+
+def cancel_registration(cursor, event_id, student_id):
+    """Cancel a registration; a freed seat goes to the head of the waitlist, returns who was promoted"""
+    row = cursor.execute("SELECT status FROM event_registrations WHERE event_id = ? AND student_id = ?",
+                         (event_id, student_id)).fetchone()
+    if not row or row[0] == "cancelled":
+        raise WriteRejected(f"Student {student_id} is not registered for event {event_id}.")
+    cursor.execute("UPDATE event_registrations SET status = 'cancelled' WHERE event_id = ? AND student_id = ?",
+                   (event_id, student_id))
+    if row[0] != "registered":
+        return []
+    return release_seats(cursor, event_id)
+
+
+def release_seats(cursor, event_id, seats=1):
+    """Give back seats freed by cancelled or deleted registrations and fill them from the waitlist"""
+    cursor.execute("UPDATE events SET seats_available = seats_available + ? "
+                   "WHERE event_id = ? AND capacity IS NOT NULL", (seats, event_id))
+    return promote_waitlist(cursor, event_id)
+
+
+def promote_waitlist(cursor, event_id):
+    """Move waitlisted students (highest priority, then first come) into free seats; returns their ids"""
+    promoted = []
+    while True:
+        cursor.execute("UPDATE events SET seats_available = seats_available - 1 "
+                       "WHERE event_id = ? AND seats_available > 0", (event_id,))
+        if cursor.rowcount == 0:
+            return promoted
+        row = cursor.execute("""
+            UPDATE event_registrations SET status = 'registered'
+            WHERE registration_id = (
+                SELECT registration_id FROM event_registrations
+                WHERE event_id = ? AND status = 'waitlisted'
+                ORDER BY priority DESC, registration_id LIMIT 1
+            )
+            RETURNING student_id
+        """, (event_id,)).fetchone()
+        if row is None:
+            # Nobody waiting: give the seat back
+            cursor.execute("UPDATE events SET seats_available = seats_available + 1 WHERE event_id = ?",
+                           (event_id,))
+            return promoted
+        promoted.append(row[0])
+
+
+def execute(cursor, query, parameters=()):
+    """Run an arbitrary write such as an audit row insert, returning lastrowid"""
+    cursor.execute(query, parameters)
+    return cursor.lastrowid
+
+
+class WriteQueue:
+    def __init__(self, db_name="college_management.db", flush_interval_ms=5, max_batch=500):
+        """Collect writes from many threads and apply them in group commits"""
+        self.db_name = db_name
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_batch = max_batch
+        self.pending = queue.Queue()
+        self.stopping = threading.Event()
+        # Held while checking stopping and queueing, so nothing lands after the writer drains
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="cms-write-queue", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        self.ready.wait()
+        return self
+
+    def stop(self):
+        """Flush everything already submitted, then stop the writer"""
+        with self.lock:
+            self.stopping.set()
+        self.thread.join()
+        # Only left over if the writer died: fail them rather than leave them unresolved
+        while True:
+            try:
+                _, _, future = self.pending.get_nowait()
+            except queue.Empty:
+                break
+            future.set_exception(RuntimeError("Write queue is stopped."))
+
+    def submit(self, operation, *args):
+        """Queue operation(cursor, *args); the Future resolves after its batch commits"""
+        future = Future()
+        with self.lock:
+            if self.stopping.is_set():
+                raise RuntimeError("Write queue is stopped.")
+            self.pending.put((operation, args, future))
+        return future
+
+    def submit_feedback(self, student_id, teacher_id, course, rating, comments):
+        future = self.submit(insert_feedback, student_id, teacher_id, course, rating, comments)
+        future.add_done_callback(lambda f: f.exception() or FEEDBACK_SUBMITTED.inc())
+        return future
+
+    def issue_book(self, book_id, student_id):
+        future = self.submit(issue_book, book_id, student_id)
+        future.add_done_callback(lambda f: f.exception() or BOOKS_ISSUED.inc())
+        return future
+
+    def register_for_event(self, event_id, student_id, priority=0):
+        future = self.submit(register_for_event, event_id, student_id, priority)
+        future.add_done_callback(lambda f: f.exception() or EVENT_REGISTRATIONS.labels(f.result()["status"]).inc())
+        return future
+
+    def _run(self):
+        db = Database(self.db_name)
+        # Explicit BEGIN/COMMIT; FULL sync so a resolved future means durable
+        db.conn.isolation_level = None
+        db.cursor.execute("PRAGMA journal_mode = WAL")
+        db.cursor.execute("PRAGMA synchronous = FULL")
+        self.ready.set()
+        try:
+            while not (self.stopping.is_set() and self.pending.empty()):
+                batch = self._collect()
+                if batch:
+                    try:
+                        self._apply(db, batch)
+                    except Exception as e:
+                        # Whatever went wrong, the writer thread keeps serving later batches
+                        print(f"Write batch failed: {e}")
+                        if db.conn.in_transaction:
+                            db.cursor.execute("ROLLBACK")
+                        for _, _, future in batch:
+                            if not future.done():
+                                future.set_exception(e)
+        finally:
+            db.close()
+
+    def _collect(self):
+        """Wait for a first write, then gather more until the batch is full or the interval ends"""
+        try:
+            batch = [self.pending.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+        deadline = time.perf_counter() + self.flush_interval
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self.pending.get(timeout=remaining) if remaining > 0 else self.pending.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _apply(self, db, batch):
+        started = time.perf_counter()
+        cursor = db.cursor
+        outcomes = []
+        try:
+            cursor.execute("BEGIN IMMEDIATE")
+            for operation, args, future in batch:
+                # A savepoint per write lets one failure roll back alone
+                cursor.execute("SAVEPOINT queued_write")
+                try:
+                    outcomes.append((future, operation(cursor, *args), None))
+                    cursor.execute("RELEASE queued_write")
+                except Exception as e:
+                    # Bad arguments (a TypeError, say) fail only their own write
+                    cursor.execute("ROLLBACK TO queued_write")
+                    cursor.execute("RELEASE queued_write")
+                    outcomes.append((future, None, e))
+            cursor.execute("COMMIT")
+        except sqlite3.Error as e:
+            if db.conn.in_transaction:
+                cursor.execute("ROLLBACK")
+            print(f"Group commit failed: {e}")
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+
+        BATCH_SIZE.observe(len(batch))
+        COMMIT_SECONDS.observe(time.perf_counter() - started)
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
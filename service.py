@@ -0,0 +1,725 @@
+"""
+HTTP/JSON service mode for the College Management System.
+
+One process owns the database file and exposes the module operations as JSON
+endpoints, so kiosks and the web portal do not open the .db file themselves.
+Requests are handled by a fixed pool of worker threads; each worker keeps its
+own College (and so its own SQLite connection) for its whole lifetime.
+Connections are HTTP/1.1 keep-alive, list responses are streamed with chunked
+transfer encoding and every response carries X-Response-Time and
+Server-Timing headers. With --group-commit, feedback submissions and book
+issues go through a WriteQueue and are committed in batches.
+
+    python service.py serve --port 8080 --workers 16
+    python service.py loadtest --url http://127.0.0.1:8080/students --requests 5000
+"""
+import argparse
+import contextlib
+import http.client
+import json
+import os
+import re
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from cli import ANALYTICS_METRICS, analytics_value, rows_to_dicts
+from database import RowStream, WriteError
+from modules.backup import SnapshotThread
+from modules.college import College
+from modules.events import EventStatusThread
+from modules.instrumentation import TIMING_LOG_ENV
+from modules.metrics import REGISTRY, MetricsFileExporter
+from modules.write_queue import WriteQueue, WriteRejected
+
+STREAM_BATCH_SIZE = 200
+QUEUED_WRITE_TIMEOUT = 30
+# A keep-alive connection holds a pool worker while it waits for its next
+# request; idle ones are closed after this many seconds to free the worker
+IDLE_TIMEOUT = 10.0
+
+STUDENT_FIELDS = ["name", "age", "gender", "contact", "email", "address", "course", "semester"]
+TEACHER_FIELDS = ["name", "gender", "contact", "email", "department", "qualification"]
+BOOK_FIELDS = ["title", "author", "isbn", "publisher", "year_published", "total_copies"]
+EVENT_FIELDS = ["name", "description", "date", "time", "venue", "organizer"]
+WRITE_ERROR_STATUS = {"duplicate": 409, "not_found": 404, "invalid": 400, "error": 500}
+
+
+class HttpError(Exception):
+    """Raised by a route handler to answer with an error status"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def require(body, fields):
+    """Pick the listed fields from a JSON body, failing on missing ones"""
+    missing = [f for f in fields if f not in body]
+    if missing:
+        raise HttpError(400, f"Missing fields: {', '.join(missing)}")
+    return [body[f] for f in fields]
+
+
+def found(value, what):
+    if not value:
+        raise HttpError(404, f"{what} not found")
+    return value
+
+
+def done(ok, status=200):
+    """Answer a write: the record it returned, or the status matching its WriteError"""
+    if isinstance(ok, WriteError):
+        raise HttpError(WRITE_ERROR_STATUS[ok.kind], ok.message)
+    if not ok:
+        raise HttpError(409, "Operation rejected, see server log")
+    if isinstance(ok, dict):
+        return status, {"ok": True, **ok}
+    return status, {"ok": True}
+
+
+def queued(future, key):
+    """Wait for a group-committed write and answer with the id it created"""
+    try:
+        return 201, {"ok": True, key: future.result(timeout=QUEUED_WRITE_TIMEOUT)}
+    except WriteRejected as e:
+        raise HttpError(409, str(e))
+
+
+# ---------------------------------------------------------------- routes
+
+def list_students(college, match, query, body):
+    if "search" in query:
+        return 200, college.student.search_students(query["search"])
+    return 200, college.student.get_all_students(stream=True)
+
+
+def get_student(college, match, query, body):
+    return 200, found(college.student.get_student(int(match["id"])), "Student")
+
+
+def add_student(college, match, query, body):
+    return done(college.student.add_student(*require(body, STUDENT_FIELDS)), 201)
+
+
+def update_student(college, match, query, body):
+    return done(college.student.update_student(int(match["id"]), **body))
+
+
+def delete_student(college, match, query, body):
+    return done(college.student.delete_student(int(match["id"])))
+
+
+def student_courses(college, match, query, body):
+    columns = ["course_id", "title", "status", "enrolled_on"]
+    return 200, rows_to_dicts(columns, college.student.get_courses(int(match["id"]), query.get("status", "active")))
+
+
+def list_teachers(college, match, query, body):
+    if "search" in query:
+        return 200, college.teacher.search_teachers(query["search"])
+    return 200, college.teacher.get_all_teachers(stream=True)
+
+
+def get_teacher(college, match, query, body):
+    return 200, found(college.teacher.get_teacher(int(match["id"])), "Teacher")
+
+
+def add_teacher(college, match, query, body):
+    return done(college.teacher.add_teacher(*require(body, TEACHER_FIELDS)), 201)
+
+
+def teacher_rating(college, match, query, body):
+    teacher_id = int(match["id"])
+    stats = college.feedback.get_teacher_rating_stats(teacher_id) or {}
+    return 200, {"teacher_id": teacher_id, "average_rating": college.feedback.calculate_teacher_rating(teacher_id),
+                 **stats}
+
+
+def list_books(college, match, query, body):
+    if "search" in query:
+        return 200, college.library.search_books(query["search"])
+    return 200, college.library.get_all_books(stream=True)
+
+
+def get_book(college, match, query, body):
+    return 200, found(college.library.get_book(int(match["id"])), "Book")
+
+
+def add_book(college, match, query, body):
+    return done(college.library.add_book(*require(body, BOOK_FIELDS)), 201)
+
+
+def issue_book(college, match, query, body):
+    student_id, = require(body, ["student_id"])
+    if college.write_queue:
+        return queued(college.write_queue.issue_book(int(match["id"]), int(student_id)), "issue_id")
+    return done(college.library.issue_book(int(match["id"]), int(student_id)), 201)
+
+
+def return_book(college, match, query, body):
+    return done(college.library.return_book(int(match["id"])))
+
+
+def overdue_issues(college, match, query, body):
+    return 200, college.library.get_overdue_issues(query.get("as_of"))
+
+
+def list_events(college, match, query, body):
+    if "search" in query:
+        return 200, college.event.search_events(query["search"])
+    return 200, college.event.get_all_events(query.get("status"), query.get("from"), query.get("to"))
+
+
+def get_event(college, match, query, body):
+    return 200, found(college.event.get_event(int(match["id"])), "Event")
+
+
+def add_event(college, match, query, body):
+    return done(college.event.add_event(*require(body, EVENT_FIELDS), body.get("end_time"),
+                                        body.get("on_conflict", "reject"), body.get("capacity")), 201)
+
+
+def event_conflicts(college, match, query, body):
+    return 200, college.event.find_conflicts(query.get("from"), query.get("to"))
+
+
+def student_events(college, match, query, body):
+    return 200, college.event.get_student_registrations(int(match["id"]))
+
+
+def update_event(college, match, query, body):
+    return done(college.event.update_event(int(match["id"]), **body))
+
+
+def cancel_event(college, match, query, body):
+    return done(college.event.cancel_event(int(match["id"])))
+
+
+def event_registrations(college, match, query, body):
+    return 200, college.event.get_registrations(int(match["id"]), query.get("status"))
+
+
+def register_for_event(college, match, query, body):
+    student_id, = require(body, ["student_id"])
+    priority = int(body.get("priority", 0))
+    if college.write_queue:
+        future = college.write_queue.register_for_event(int(match["id"]), int(student_id), priority)
+        try:
+            return 201, {"ok": True, **future.result(timeout=QUEUED_WRITE_TIMEOUT)}
+        except WriteRejected as e:
+            raise HttpError(409, str(e))
+    result = college.event.register(int(match["id"]), int(student_id), priority)
+    if not result:
+        raise HttpError(409, "Operation rejected, see server log")
+    return 201, {"ok": True, **result}
+
+
+def cancel_registration(college, match, query, body):
+    student_id, = require(body, ["student_id"])
+    return done(college.event.cancel_registration(int(match["id"]), int(student_id)))
+
+
+def set_event_capacity(college, match, query, body):
+    capacity, = require(body, ["capacity"])
+    return done(college.event.set_capacity(int(match["id"]), None if capacity is None else int(capacity)))
+
+
+def list_feedback(college, match, query, body):
+    if "teacher_id" in query:
+        columns = ["feedback_id", "student_name", "course", "rating", "comments", "date_submitted"]
+        return 200, rows_to_dicts(columns, college.feedback.get_teacher_feedback(
+            int(query["teacher_id"]), query.get("sentiment"), query.get("topic")))
+    if "student_id" in query:
+        columns = ["feedback_id", "teacher_name", "course", "rating", "comments", "date_submitted"]
+        return 200, rows_to_dicts(columns, college.feedback.get_student_feedback(int(query["student_id"])))
+    if "course" in query:
+        columns = ["feedback_id", "student_name", "teacher_name", "rating", "comments", "date_submitted"]
+        return 200, rows_to_dicts(columns, college.feedback.get_course_feedback(
+            query["course"], query.get("sentiment"), query.get("topic")))
+    raise HttpError(400, "Filter by teacher_id, student_id or course")
+
+
+def feedback_tags(college, match, query, body):
+    if "teacher_id" in query:
+        return 200, found(college.feedback.get_tag_summary(teacher_id=int(query["teacher_id"])), "Tagged feedback")
+    if "course" in query:
+        return 200, found(college.feedback.get_tag_summary(course=query["course"]), "Tagged feedback")
+    raise HttpError(400, "Filter by teacher_id or course")
+
+
+def get_feedback(college, match, query, body):
+    return 200, found(college.feedback.get_feedback(int(match["id"])), "Feedback")
+
+
+def submit_feedback(college, match, query, body):
+    fields = require(body, ["student_id", "teacher_id", "course", "rating"])
+    if college.write_queue:
+        student_id, teacher_id, course, rating = fields
+        future = college.write_queue.submit_feedback(int(student_id), int(teacher_id), course, int(rating),
+                                                     body.get("comments", ""))
+        return queued(future, "feedback_id")
+    return done(college.feedback.submit_feedback(*fields, body.get("comments", "")), 201)
+
+
+def list_courses(college, match, query, body):
+    return 200, rows_to_dicts(["course_id", "title", "description", "duration"], college.course.get_all_courses())
+
+
+def get_course(college, match, query, body):
+    return 200, found(college.course.get_course(int(match["id"])), "Course")
+
+
+def add_course(college, match, query, body):
+    title, = require(body, ["title"])
+    return done(college.course.add_course(title, body.get("description"), body.get("duration")), 201)
+
+
+def course_roster(college, match, query, body):
+    columns = ["student_id", "name", "email", "status", "enrolled_on"]
+    return 200, rows_to_dicts(columns, college.course.get_roster(int(match["id"]), query.get("status", "active")))
+
+
+def enroll_student(college, match, query, body):
+    student_id, = require(body, ["student_id"])
+    return done(college.course.enroll_student(int(student_id), int(match["id"])), 201)
+
+
+def drop_student(college, match, query, body):
+    student_id, = require(body, ["student_id"])
+    return done(college.course.drop_student(int(student_id), int(match["id"])))
+
+
+def course_prerequisites(college, match, query, body):
+    transitive = query.get("transitive", "").lower() in ("1", "true", "yes")
+    return 200, rows_to_dicts(["course_id", "title"],
+                              college.course.get_prerequisites(int(match["id"]), transitive))
+
+
+def add_prerequisite(college, match, query, body):
+    prerequisite_id, = require(body, ["prerequisite_id"])
+    return done(college.course.add_prerequisite(int(match["id"]), int(prerequisite_id)), 201)
+
+
+def remove_prerequisite(college, match, query, body):
+    return done(college.course.remove_prerequisite(int(match["id"]), int(match["prerequisite_id"])))
+
+
+def eligible_courses(college, match, query, body):
+    return 200, rows_to_dicts(["course_id", "title"], college.course.eligible_courses(int(match["id"])))
+
+
+def complete_enrollment(college, match, query, body):
+    student_id, = require(body, ["student_id"])
+    return done(college.course.complete_enrollment(int(student_id), int(match["id"])))
+
+
+def analytics_metric(college, match, query, body):
+    metric = match["metric"]
+    if metric not in ANALYTICS_METRICS:
+        raise HttpError(404, f"Unknown metric '{metric}'")
+    return 200, {metric: analytics_value(college.analytics, metric)}
+
+
+def journal_changes(college, match, query, body):
+    tables = query["table"].split(",") if "table" in query else None
+    return 200, college.journal.read(int(query.get("after", 0)), int(query.get("limit", 1000)), tables)
+
+
+def journal_consumers(college, match, query, body):
+    return 200, college.journal.get_consumers()
+
+
+def journal_subscribe(college, match, query, body):
+    from_seq = body.get("from_seq")
+    last_seq = college.journal.subscribe(match["consumer"], None if from_seq is None else int(from_seq))
+    return 201, {"consumer": match["consumer"], "last_seq": last_seq}
+
+
+def journal_fetch(college, match, query, body):
+    found(college.journal.get_offset(match["consumer"]) is not None, "Consumer")
+    return 200, college.journal.fetch(match["consumer"], int(query.get("limit", 1000)))
+
+
+def journal_commit(college, match, query, body):
+    seq, = require(body, ["seq"])
+    return done(college.journal.commit(match["consumer"], int(seq)))
+
+
+def health(college, match, query, body):
+    return 200, {"status": "ok"}
+
+
+def metrics(college, match, query, body):
+    return 200, REGISTRY.render()
+
+
+ROUTES = [
+    ("GET", r"/health", health),
+    ("GET", r"/metrics", metrics),
+    ("GET", r"/students", list_students),
+    ("POST", r"/students", add_student),
+    ("GET", r"/students/(?P<id>\d+)", get_student),
+    ("PATCH", r"/students/(?P<id>\d+)", update_student),
+    ("DELETE", r"/students/(?P<id>\d+)", delete_student),
+    ("GET", r"/students/(?P<id>\d+)/courses", student_courses),
+    ("GET", r"/students/(?P<id>\d+)/eligible-courses", eligible_courses),
+    ("GET", r"/students/(?P<id>\d+)/events", student_events),
+    ("GET", r"/teachers", list_teachers),
+    ("POST", r"/teachers", add_teacher),
+    ("GET", r"/teachers/(?P<id>\d+)", get_teacher),
+    ("GET", r"/teachers/(?P<id>\d+)/rating", teacher_rating),
+    ("GET", r"/books", list_books),
+    ("POST", r"/books", add_book),
+    ("GET", r"/books/(?P<id>\d+)", get_book),
+    ("POST", r"/books/(?P<id>\d+)/issue", issue_book),
+    ("POST", r"/issues/(?P<id>\d+)/return", return_book),
+    ("GET", r"/issues/overdue", overdue_issues),
+    ("GET", r"/events", list_events),
+    ("POST", r"/events", add_event),
+    ("GET", r"/events/conflicts", event_conflicts),
+    ("GET", r"/events/(?P<id>\d+)", get_event),
+    ("PATCH", r"/events/(?P<id>\d+)", update_event),
+    ("POST", r"/events/(?P<id>\d+)/cancel", cancel_event),
+    ("GET", r"/events/(?P<id>\d+)/registrations", event_registrations),
+    ("POST", r"/events/(?P<id>\d+)/register", register_for_event),
+    ("POST", r"/events/(?P<id>\d+)/unregister", cancel_registration),
+    ("POST", r"/events/(?P<id>\d+)/capacity", set_event_capacity),
+    ("GET", r"/feedback", list_feedback),
+    ("POST", r"/feedback", submit_feedback),
+    ("GET", r"/feedback/tags", feedback_tags),
+    ("GET", r"/feedback/(?P<id>\d+)", get_feedback),
+    ("GET", r"/courses", list_courses),
+    ("POST", r"/courses", add_course),
+    ("GET", r"/courses/(?P<id>\d+)", get_course),
+    ("GET", r"/courses/(?P<id>\d+)/roster", course_roster),
+    ("POST", r"/courses/(?P<id>\d+)/enroll", enroll_student),
+    ("POST", r"/courses/(?P<id>\d+)/drop", drop_student),
+    ("POST", r"/courses/(?P<id>\d+)/complete", complete_enrollment),
+    ("GET", r"/courses/(?P<id>\d+)/prerequisites", course_prerequisites),
+    ("POST", r"/courses/(?P<id>\d+)/prerequisites", add_prerequisite),
+    ("DELETE", r"/courses/(?P<id>\d+)/prerequisites/(?P<prerequisite_id>\d+)", remove_prerequisite),
+    ("GET", r"/analytics/(?P<metric>\w+)", analytics_metric),
+    ("GET", r"/journal", journal_changes),
+    ("GET", r"/journal/consumers", journal_consumers),
+    ("POST", r"/journal/consumers/(?P<consumer>[\w.-]+)", journal_subscribe),
+    ("GET", r"/journal/consumers/(?P<consumer>[\w.-]+)/changes", journal_fetch),
+    ("POST", r"/journal/consumers/(?P<consumer>[\w.-]+)/commit", journal_commit),
+]
+COMPILED_ROUTES = [(method, re.compile(pattern + r"/?$"), handler) for method, pattern, handler in ROUTES]
+
+
+# ---------------------------------------------------------------- server
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """Dispatch JSON requests to the route table"""
+
+    protocol_version = "HTTP/1.1"  # keep-alive by default
+    server_version = "CollegeService/1.0"
+    # Buffer each response and flush it in one write; small unbuffered writes
+    # on a keep-alive socket stall on Nagle/delayed-ACK for ~40ms each
+    wbufsize = 64 * 1024
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        # Socket timeout read by StreamRequestHandler.setup: an idle keep-alive
+        # connection times out in handle_one_request and is closed
+        self.timeout = self.server.idle_timeout
+        super().setup()
+
+    def do_GET(self):
+        self.dispatch("GET")
+
+    def do_POST(self):
+        self.dispatch("POST")
+
+    def do_PATCH(self):
+        self.dispatch("PATCH")
+
+    def do_DELETE(self):
+        self.dispatch("DELETE")
+
+    def dispatch(self, method):
+        started = time.perf_counter()
+        url = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+        try:
+            body = self.read_body()
+            handler, match = self.resolve(method, url.path)
+            college = self.server.worker_college()
+            status, payload = handler(college, match, query, body)
+        except HttpError as e:
+            status, payload = e.status, {"error": e.message}
+        except (ValueError, TypeError) as e:
+            status, payload = 400, {"error": str(e)}
+        except Exception as e:
+            status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if isinstance(payload, (list, RowStream)):
+            self.send_stream(status, payload, elapsed_ms)
+        elif isinstance(payload, str):
+            self.send_text(status, payload, elapsed_ms)
+        else:
+            self.send_json(status, payload, elapsed_ms)
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        body = json.loads(self.rfile.read(length))
+        if not isinstance(body, dict):
+            raise HttpError(400, "Request body must be a JSON object")
+        return body
+
+    def resolve(self, method, path):
+        path_matched = False
+        for route_method, pattern, handler in COMPILED_ROUTES:
+            match = pattern.match(path)
+            if match:
+                if route_method == method:
+                    return handler, match.groupdict()
+                path_matched = True
+        if path_matched:
+            raise HttpError(405, f"Method {method} not allowed on {path}")
+        raise HttpError(404, f"No route for {path}")
+
+    def send_timing_headers(self, status, elapsed_ms, content_type="application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("X-Response-Time", f"{elapsed_ms:.3f}ms")
+        self.send_header("Server-Timing", f"app;dur={elapsed_ms:.3f}")
+
+    def send_json(self, status, payload, elapsed_ms):
+        data = json.dumps(payload, default=str).encode("utf-8")
+        self.send_timing_headers(status, elapsed_ms)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_text(self, status, text, elapsed_ms):
+        data = text.encode("utf-8")
+        self.send_timing_headers(status, elapsed_ms, "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_stream(self, status, items, elapsed_ms):
+        """Send a JSON array in chunks so large lists start arriving at once.
+
+        A RowStream is read from its cursor with fetchmany as the chunks go
+        out, so the full result is never held in memory.
+        """
+        self.send_timing_headers(status, elapsed_ms)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        if isinstance(items, RowStream):
+            batches = items.batches(STREAM_BATCH_SIZE)
+        else:
+            batches = (items[start:start + STREAM_BATCH_SIZE] for start in range(0, len(items), STREAM_BATCH_SIZE))
+        self.write_chunk(b"[")
+        # Closed even when the client goes away mid-stream, which releases the cursor
+        with contextlib.closing(batches):
+            separator = b""
+            for batch in batches:
+                text = ",".join(json.dumps(item, default=str) for item in batch)
+                self.write_chunk(separator + text.encode("utf-8"))
+                separator = b","
+        self.write_chunk(b"]")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def write_chunk(self, data):
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+class CollegeService(HTTPServer):
+    """HTTP server that hands connections to a fixed pool of worker threads"""
+
+    daemon_threads = True
+
+    def __init__(self, address, db_name="college_management.db", workers=16, quiet=False, write_queue=None,
+                 idle_timeout=IDLE_TIMEOUT):
+        super().__init__(address, RequestHandler)
+        self.db_name = db_name
+        self.idle_timeout = idle_timeout
+        self.quiet = quiet
+        self.write_queue = write_queue
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cms-worker")
+        self.local = threading.local()
+        self.colleges = []
+        self.colleges_lock = threading.Lock()
+
+    def worker_college(self):
+        """Return the College owned by the calling worker, opening it on first use"""
+        college = getattr(self.local, "college", None)
+        if college is None:
+            college = College(self.db_name)
+            # WAL lets readers in other workers proceed while one worker writes
+            college.db.execute_query("PRAGMA journal_mode=WAL")
+            college.write_queue = self.write_queue
+            self.local.college = college
+            with self.colleges_lock:
+                self.colleges.append(college)
+        return college
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=True)
+        with self.colleges_lock:
+            for college in self.colleges:
+                college.close()
+            self.colleges = []
+
+
+def serve(args):
+    # A line per call from every worker would serialize them on one file;
+    # the service reports timing in its headers and /metrics instead
+    os.environ.pop(TIMING_LOG_ENV, None)
+    write_queue = None
+    if args.group_commit:
+        write_queue = WriteQueue(args.db, args.flush_interval_ms, args.max_batch).start()
+    status_thread = EventStatusThread(args.db).start() if args.event_status_thread else None
+    snapshot_thread = None
+    if args.snapshot_interval:
+        snapshot_thread = SnapshotThread(args.db, args.snapshot_interval * 60, args.snapshot_keep).start()
+    service = CollegeService((args.host, args.port), args.db, args.workers, args.quiet, write_queue,
+                             args.idle_timeout)
+    print(f"Serving {args.db} on http://{args.host}:{args.port} with {args.workers} workers", file=sys.stderr)
+    stdout = open(os.devnull, "w") if args.quiet else sys.stdout
+    exporter = MetricsFileExporter(args.metrics_file, args.metrics_interval).start() if args.metrics_file else None
+    try:
+        with contextlib.redirect_stdout(stdout):
+            service.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.server_close()
+        if write_queue:
+            write_queue.stop()
+        if status_thread:
+            status_thread.stop()
+        if snapshot_thread:
+            snapshot_thread.stop()
+        if exporter:
+            exporter.stop()
+    return 0
+
+
+# ---------------------------------------------------------------- load test
+
+def loadtest(args):
+    """Hammer one URL over keep-alive connections and report throughput"""
+    url = urlsplit(args.url)
+    path = url.path + (f"?{url.query}" if url.query else "")
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    per_worker = args.requests // args.concurrency
+
+    def worker():
+        conn = http.client.HTTPConnection(url.hostname, url.port or 80)
+        local_latencies = []
+        local_errors = 0
+        for _ in range(per_worker):
+            started = time.perf_counter()
+            try:
+                conn.request(args.method, path, body=args.body,
+                             headers={"Content-Type": "application/json"} if args.body else {})
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 500:
+                    local_errors += 1
+            except (OSError, http.client.HTTPException):
+                local_errors += 1
+                conn.close()
+                conn = http.client.HTTPConnection(url.hostname, url.port or 80)
+            local_latencies.append((time.perf_counter() - started) * 1000)
+        conn.close()
+        with lock:
+            latencies.extend(local_latencies)
+            errors.append(local_errors)
+
+    threads = [threading.Thread(target=worker) for _ in range(args.concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    report = {
+        "requests": len(latencies),
+        "errors": sum(errors),
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(quantiles[49], 3),
+        "p95_ms": round(quantiles[94], 3),
+        "p99_ms": round(quantiles[98], 3),
+    }
+    print(json.dumps(report))
+    return 0 if not report["errors"] else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="College Management System HTTP service")
+    commands = parser.add_subparsers(dest="command", metavar="<command>")
+    commands.required = True
+
+    serve_parser = commands.add_parser("serve", help="run the JSON service")
+    serve_parser.add_argument("--db", default="college_management.db")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8080)
+    serve_parser.add_argument("--workers", type=int, default=16)
+    serve_parser.add_argument("--idle-timeout", type=float, default=IDLE_TIMEOUT, metavar="SECONDS",
+                              help="close keep-alive connections idle this long, freeing their worker")
+    serve_parser.add_argument("--quiet", action="store_true", help="silence module and access logs")
+    serve_parser.add_argument("--metrics-file", help="also write Prometheus metrics to this file")
+    serve_parser.add_argument("--metrics-interval", type=float, default=15.0)
+    serve_parser.add_argument("--group-commit", action="store_true",
+                              help="batch feedback and book issue writes through one writer thread")
+    serve_parser.add_argument("--flush-interval-ms", type=float, default=5.0)
+    serve_parser.add_argument("--max-batch", type=int, default=500)
+    serve_parser.add_argument("--event-status-thread", action="store_true",
+                              help="update event statuses in the background as events start and end")
+    serve_parser.add_argument("--snapshot-interval", type=float, metavar="MINUTES",
+                              help="take a compressed online backup this often")
+    serve_parser.add_argument("--snapshot-keep", type=int, default=7, help="snapshots to keep")
+    serve_parser.set_defaults(func=serve)
+
+    load_parser = commands.add_parser("loadtest", help="measure throughput of a running service")
+    load_parser.add_argument("--url", default="http://127.0.0.1:8080/health")
+    load_parser.add_argument("--method", default="GET")
+    load_parser.add_argument("--body", help="JSON request body")
+    load_parser.add_argument("--requests", type=int, default=2000)
+    load_parser.add_argument("--concurrency", type=int, default=8)
+    load_parser.set_defaults(func=loadtest)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())